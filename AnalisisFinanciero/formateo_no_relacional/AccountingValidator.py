@@ -0,0 +1,183 @@
+import json
+import logging
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+import pandas as pd
+import numpy as np
+from utils import *
+from WorkbookToJsonConverter import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES = Path(__file__).resolve().parent / "accounting_rules.json"
+
+CELL_COLUMNS = ["nit", "period", "report", "row_path", "col_path", "value"]
+
+_TAG_SEGMENT = re.compile(r"\[[^\]]*\]\s*$")  # "... [sinopsis]", "[partidas]", "[resumen]"
+
+
+def line_item_key(row_path: str) -> str:
+    """
+    The line item a flattened row stands for: its first path segment that is not a
+    taxonomy grouping ("[sinopsis]", "[partidas]", "[resumen]", ...). Forward-filled
+    headers often append stale segments after it, so later segments are ignored.
+    """
+    for seg in split_path(row_path):
+        if not _TAG_SEGMENT.search(seg):
+            return normalize_text(seg)
+    return normalize_text(row_path)
+
+
+# ----------------- Cell Loading -----------------
+def load_cells_from_store(db_path: Path) -> pd.DataFrame:
+    """Numeric cells from a SqliteCellStore database (fast path)."""
+    with sqlite3.connect(str(db_path)) as conn:
+        df = pd.read_sql_query(
+            "SELECT nit, period, report, row_path, col_path, value FROM cells_v "
+            "WHERE typeof(value) IN ('integer', 'real')",
+            conn,
+        )
+    return df
+
+
+def load_cells_from_dir(input_dir: Path) -> pd.DataFrame:
+    """Numeric cells from a directory of flattened (cleaned) workbooks."""
+    reader = WorkbookToJsonConverter()
+    frames = []
+    for f in sorted(p for p in Path(input_dir).iterdir() if p.is_file() and is_excel_file(p)):
+        info = parse_filing_name(f.name)
+        if info is None:
+            logger.warning(f"Skipping {f.name}: name does not match <NIT>_<YYYY-MM-DD>_<Report>")
+            continue
+        xl = pd.ExcelFile(f, engine="openpyxl")
+        for sheet in xl.sheet_names:
+            df = reader.read_sheet(f, sheet, xl=xl)
+            if df.index.name != "Index" and "Index" in df.columns:
+                df = df.set_index("Index")
+            df.index = df.index.map(str)
+            df.columns = df.columns.map(str)
+            long = pd.to_numeric(df.stack(), errors="coerce").dropna()
+            if long.empty:
+                continue
+            frames.append(pd.DataFrame({
+                "nit": info["nit"], "period": info["period"], "report": info["report"],
+                "row_path": long.index.get_level_values(0),
+                "col_path": long.index.get_level_values(1),
+                "value": long.to_numpy(dtype=float),
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CELL_COLUMNS)
+
+
+# ----------------- Validator -----------------
+class AccountingValidator:
+    """
+    Checks declarative accounting identities over a whole corpus in batched array passes.
+
+    A rule says sum(lhs) == sum(rhs) within tolerance, per (filing, column), for the
+    rows of one report. Each lhs/rhs term is a line-item label, or a list of
+    alternative labels where the first one present in the filing is used. Labels are
+    compared accent- and case-insensitively against line_item_key(row_path).
+
+    A (filing, column) is only checked when every term is present; the residual
+    lhs - rhs is a violation when |residual| > abs_tol + rel_tol * |lhs|.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        if rules is None:
+            rules = json.loads(DEFAULT_RULES.read_text(encoding="utf-8"))
+        self.rules = rules
+
+    @classmethod
+    def from_file(cls, path: Path) -> "AccountingValidator":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def _term_table(self) -> pd.DataFrame:
+        """One row per (rule, term, alternative label) with its sign and priority."""
+        rows = []
+        for r_idx, rule in enumerate(self.rules):
+            terms = [(t, 1.0) for t in rule["lhs"]] + [(t, -1.0) for t in rule["rhs"]]
+            for t_idx, (term, sign) in enumerate(terms):
+                alternatives = term if isinstance(term, list) else [term]
+                for priority, label in enumerate(alternatives):
+                    rows.append({
+                        "rule": r_idx, "report": rule["report"], "term": t_idx, "sign": sign,
+                        "priority": priority, "item": normalize_text(label),
+                    })
+        return pd.DataFrame(rows)
+
+    def validate(self, cells: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run every rule over a long cell table (nit, period, report, row_path, col_path, value).
+        Returns one row per violation.
+        """
+        out_cols = ["nit", "period", "report", "rule", "col_path", "lhs", "rhs", "residual", "tolerance"]
+        if cells.empty or not self.rules:
+            return pd.DataFrame(columns=out_cols)
+
+        terms = self._term_table()
+        cells = cells[cells["report"].isin(terms["report"].unique())].copy()
+        if cells.empty:
+            return pd.DataFrame(columns=out_cols)
+
+        # Derive line-item keys once per distinct row path, then broadcast
+        row_paths = pd.Categorical(cells["row_path"])
+        keys = np.array([line_item_key(p) for p in row_paths.categories], dtype=object)
+        cells["item"] = keys[row_paths.codes]
+        cells["value"] = pd.to_numeric(cells["value"], errors="coerce")
+
+        hits = cells.merge(terms, on=["report", "item"], how="inner")
+        if hits.empty:
+            return pd.DataFrame(columns=out_cols)
+
+        group = ["rule", "nit", "period", "report", "col_path"]
+        # Keep the highest-priority alternative present for each term
+        best = hits.groupby(group + ["term"])["priority"].transform("min")
+        hits = hits[hits["priority"] == best]
+        hits = hits.assign(signed=hits["value"] * hits["sign"],
+                           lhs=np.where(hits["sign"] > 0, hits["value"], 0.0),
+                           rhs=np.where(hits["sign"] < 0, hits["value"], 0.0))
+
+        agg = hits.groupby(group, sort=True).agg(
+            residual=("signed", "sum"), lhs=("lhs", "sum"), rhs=("rhs", "sum"), n_terms=("term", "nunique"),
+        ).reset_index()
+
+        n_terms = np.array([len(r["lhs"]) + len(r["rhs"]) for r in self.rules])
+        abs_tol = np.array([float(r.get("abs_tol", 1)) for r in self.rules])
+        rel_tol = np.array([float(r.get("rel_tol", 0)) for r in self.rules])
+        rule_idx = agg["rule"].to_numpy()
+
+        complete = agg["n_terms"].to_numpy() == n_terms[rule_idx]
+        tolerance = abs_tol[rule_idx] + rel_tol[rule_idx] * np.abs(agg["lhs"].to_numpy())
+        violated = complete & (np.abs(agg["residual"].to_numpy()) > tolerance)
+
+        result = agg.loc[violated].assign(tolerance=tolerance[violated])
+        result["rule"] = [self.rules[i]["name"] for i in result["rule"]]
+        return result[out_cols].reset_index(drop=True)
+
+    def checked_filings(self, cells: pd.DataFrame) -> pd.DataFrame:
+        """Filings that contain at least one report covered by a rule."""
+        reports = {r["report"] for r in self.rules}
+        return (cells.loc[cells["report"].isin(reports), ["nit", "period", "report"]]
+                .drop_duplicates().sort_values(["nit", "period", "report"]).reset_index(drop=True))
+
+    @staticmethod
+    def report(violations: pd.DataFrame, checked: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Per-filing violation report (filings with no violations are listed as passed)."""
+        out = []
+        by_filing = {k: g for k, g in violations.groupby(["nit", "period", "report"])} if len(violations) else {}
+        for nit, period, report in checked.itertuples(index=False):
+            g = by_filing.get((nit, period, report))
+            entry = {"nit": nit, "period": period, "report": report,
+                     "status": "failed" if g is not None else "passed", "violations": []}
+            if g is not None:
+                entry["violations"] = [
+                    {"rule": v.rule, "column": v.col_path, "lhs": float(v.lhs), "rhs": float(v.rhs),
+                     "residual": float(v.residual), "tolerance": float(v.tolerance)}
+                    for v in g.itertuples(index=False)
+                ]
+            out.append(entry)
+        return out
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+SUCCESS_STATUSES = ("success", "ok")  # summaries without a status (flattening stage) count as success
+
+
+# ----------------- Batch Journal -----------------
+class BatchJournal:
+    """
+    Append-only JSONL journal of per-file results for a batch run.
+
+    Every processed file is recorded (and fsync'ed) as soon as it finishes, keyed
+    by input path and fingerprinted by size/mtime. With resume=True, files journaled
+    as succeeded are skipped while their fingerprint is unchanged and their output
+    still exists, so a crashed run only redoes the files that were in flight,
+    failed or were skipped. The final summary is rebuilt from the journal.
+    """
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if resume:
+            self.entries = self._load()
+            if self.entries:
+                done = sum(self.succeeded(e["summary"]) for e in self.entries.values())
+                logger.info(f"Resuming from {self.path} ({done} of {len(self.entries)} journaled file(s) done)")
+        elif self.path.exists():
+            self.path.unlink()  # fresh run
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return entries
+        for line in text.splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            entries[entry["input"]] = entry
+        if text and not text.endswith("\n"):
+            # Terminate the torn line so the next record starts on its own line
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n")
+        return entries
+
+    @staticmethod
+    def fingerprint(file_path: Path) -> Dict[str, int]:
+        st = Path(file_path).stat()
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    @staticmethod
+    def succeeded(summary: Optional[Dict[str, Any]]) -> bool:
+        """True for the summary of a file that was processed and whose output still exists."""
+        if not summary or summary.get("status", "success") not in SUCCESS_STATUSES or not summary.get("output"):
+            return False
+        return Path(summary["output"]).exists()
+
+    def is_done(self, file_path: Path) -> bool:
+        """True if file_path was journaled as succeeded, has not changed since and its output is still there."""
+        entry = self.entries.get(str(file_path))
+        return (entry is not None and entry["fingerprint"] == self.fingerprint(file_path)
+                and self.succeeded(entry["summary"]))
+
+    def record(self, file_path: Path, summary: Optional[Dict[str, Any]]):
+        """Durably append the result for one file (summary None = file was skipped)."""
+        entry = {"input": str(file_path), "fingerprint": self.fingerprint(file_path), "summary": summary}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[entry["input"]] = entry
+
+    def summaries(self, files: List[Path]) -> List[Dict[str, Any]]:
+        """Journaled summaries for `files`, in the given order (skipped files omitted)."""
+        out = []
+        for f in files:
+            entry = self.entries.get(str(f))
+            if entry is not None and entry["summary"] is not None:
+                out.append(entry["summary"])
+        return out
@@ -0,0 +1,214 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+import numpy as np
+from utils import *
+from NestedDictBuilder import *
+from SheetToJsonConverter import *
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+SCHEMAS = ("nested", "columnar")
+COLUMNAR_SCHEMA = "columnar"
+COLUMNAR_VERSION = 1
+DENSE_MIN_FILL = 0.5  # a numeric sheet at least this full stores a matrix, otherwise triplets
+
+
+# ----------------- Columnar Sheets -----------------
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+class PathTable:
+    """
+    Row and column paths of one sheet as a trie: node k is (parent[k], labels[label[k]]),
+    parent -1 being the root. Shared prefixes and repeated segment names are stored once,
+    which is what keeps the paths from dominating the file.
+    """
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.parent: List[int] = []
+        self.label: List[int] = []
+        self._label_ids: Dict[str, int] = {}
+        self._nodes: Dict[tuple, int] = {}
+
+    def add(self, segments: List[str]) -> int:
+        """Node id of a path (-1 for the empty path), creating missing prefixes."""
+        node = -1
+        for seg in segments:
+            label = self._label_ids.setdefault(seg, len(self._label_ids))
+            if label == len(self.labels):
+                self.labels.append(seg)
+            key = (node, label)
+            if key not in self._nodes:
+                self._nodes[key] = len(self.parent)
+                self.parent.append(node)
+                self.label.append(label)
+            node = self._nodes[key]
+        return node
+
+    def to_json(self) -> Dict[str, List]:
+        return {"labels": self.labels, "parent": self.parent, "label": self.label}
+
+    @staticmethod
+    def expand(table: Dict[str, List]) -> List[List[str]]:
+        """Segments of every node; parents always precede their children."""
+        labels = table["labels"]
+        paths = []
+        for parent, label in zip(table["parent"], table["label"]):
+            paths.append((paths[parent] if parent >= 0 else []) + [labels[label]])
+        return paths
+
+
+def sheet_to_columnar(df, sheet_name: str = "") -> Dict[str, Any]:
+    """
+    Column-oriented form of one flattened sheet (DataFrame or FlatSheet):
+        {"sheet", "paths": PathTable, "row_paths": [node], "col_paths": [node],
+         "layout": "dense"|"sparse", ...}
+    Paths are stored once per row/column instead of once per cell.
+    dense:  "values" is the row-major matrix (null = empty), used when every value is
+            a number and at least DENSE_MIN_FILL of the cells are filled;
+    sparse: "num" and "other" hold {"rows", "cols", "values"} triplets in row-major
+            order, numbers and everything else (text, booleans) apart, so the numeric
+            part loads straight into float arrays.
+    """
+    row_labels, col_labels, values = SheetToJsonConverter.sheet_arrays(df)
+    paths = PathTable()
+    row_paths = [paths.add(split_path(r)) for r in row_labels]
+    col_paths = [paths.add(split_path(str(c)) or ["value"]) for c in col_labels]
+
+    num = {"rows": [], "cols": [], "values": []}
+    other = {"rows": [], "cols": [], "values": []}
+    for i in range(len(row_paths)):
+        for j, val in enumerate(values[i]):
+            safe_val = json_safe_scalar(val)
+            if safe_val is None:
+                continue
+            part = num if _is_number(safe_val) else other
+            part["rows"].append(i)
+            part["cols"].append(j)
+            part["values"].append(safe_val)
+
+    sheet = {"sheet": str(sheet_name), "paths": paths.to_json(), "row_paths": row_paths, "col_paths": col_paths}
+    size = len(row_paths) * len(col_paths)
+    if size and not other["values"] and len(num["values"]) >= DENSE_MIN_FILL * size:
+        matrix = [[None] * len(col_paths) for _ in row_paths]
+        for i, j, v in zip(num["rows"], num["cols"], num["values"]):
+            matrix[i][j] = v
+        sheet.update(layout="dense", values=matrix)
+    else:
+        sheet.update(layout="sparse", num=num, other=other)
+    return sheet
+
+
+def columnar_document(sheets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"schema": COLUMNAR_SCHEMA, "version": COLUMNAR_VERSION, "sheets": sheets}
+
+
+def is_columnar(doc: Any) -> bool:
+    return isinstance(doc, dict) and doc.get("schema") == COLUMNAR_SCHEMA and "sheets" in doc
+
+
+# ----------------- Loading -----------------
+def sheet_arrays(sheet: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    NumPy view of a columnar sheet: {"row_paths", "col_paths", "rows", "cols", "values"}
+    for the numeric cells (int32 indices, float64 values) and "other" as a
+    {"rows", "cols", "values"} dict of the remaining cells. No per-key work: paths are
+    expanded once per row/column (dot-joined, as in the flattened workbooks).
+    """
+    nodes = [".".join(p) for p in PathTable.expand(sheet["paths"])]
+    row_paths = [nodes[k] if k >= 0 else "" for k in sheet["row_paths"]]
+    col_paths = [nodes[k] for k in sheet["col_paths"]]
+    if sheet["layout"] == "dense":
+        matrix = np.array(sheet["values"], dtype=np.float64).reshape(len(sheet["row_paths"]), len(sheet["col_paths"]))
+        rows, cols = np.nonzero(~np.isnan(matrix))
+        values = matrix[rows, cols]
+        other = {"rows": np.empty(0, np.int32), "cols": np.empty(0, np.int32), "values": np.empty(0, object)}
+    else:
+        num = sheet["num"]
+        rows = np.asarray(num["rows"], dtype=np.int32)
+        cols = np.asarray(num["cols"], dtype=np.int32)
+        values = np.asarray(num["values"], dtype=np.float64)
+        o = sheet["other"]
+        other = {"rows": np.asarray(o["rows"], dtype=np.int32), "cols": np.asarray(o["cols"], dtype=np.int32),
+                 "values": np.asarray(o["values"], dtype=object)}
+    return {"row_paths": row_paths, "col_paths": col_paths,
+            "rows": rows.astype(np.int32), "cols": cols.astype(np.int32), "values": values, "other": other}
+
+
+def _cells_by_row(sheet: Dict[str, Any]):
+    """(row, [(col, value), ...]) for every row, in row-major order, with original Python scalars."""
+    n_rows = len(sheet["row_paths"])
+    if sheet["layout"] == "dense":
+        for i, row in enumerate(sheet["values"]):
+            yield i, [(j, v) for j, v in enumerate(row) if v is not None]
+        return
+    cells = [[] for _ in range(n_rows)]
+    for part in (sheet["num"], sheet["other"]):
+        for i, j, v in zip(part["rows"], part["cols"], part["values"]):
+            cells[i].append((j, v))
+    for i in range(n_rows):
+        row = cells[i]
+        if len(row) > 1:
+            row.sort(key=lambda c: c[0])  # numbers and text were stored apart
+        yield i, row
+
+
+def sheet_to_tree(sheet: Dict[str, Any]) -> Dict[str, Any]:
+    """Nested tree of one columnar sheet, identical to SheetToJsonConverter.convert()."""
+    nodes = PathTable.expand(sheet["paths"])
+    col_paths = [nodes[k] for k in sheet["col_paths"]]
+    result = {}
+    for i, row in _cells_by_row(sheet):
+        row_node = sheet["row_paths"][i]
+        row_branch = NestedDictBuilder.ensure_path(result, nodes[row_node]) if row_node >= 0 else result
+        for j, v in row:
+            NestedDictBuilder.set_value(row_branch, col_paths[j], v)
+    return result
+
+
+def columnar_to_tree(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Merged nested tree of a columnar document (sheets merged in order, like WorkbookToJsonConverter)."""
+    if doc.get("version", 0) > COLUMNAR_VERSION:
+        raise ValueError(f"Columnar schema version {doc['version']} is newer than supported ({COLUMNAR_VERSION})")
+    merged = {}
+    for sheet in doc["sheets"]:
+        NestedDictBuilder.deep_merge(merged, sheet_to_tree(sheet))
+    return merged
+
+
+# ----------------- Pretty Output -----------------
+class PrettyColumnarCodec(JsonCodec):
+    """
+    The "pretty" codec for columnar documents: objects are indented like JsonCodec,
+    but arrays of values (path tables, indices, matrix rows) stay on one line. With
+    one line per element, indentation would make columnar output larger than the
+    nested tree it replaces.
+    """
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._format(obj, 0).encode("utf-8")
+
+    @classmethod
+    def _format(cls, obj: Any, level: int) -> str:
+        pad = "  " * (level + 1)
+        if isinstance(obj, dict) and obj:
+            items = [f"{pad}{json.dumps(str(k), ensure_ascii=False)}: {cls._format(v, level + 1)}" for k, v in obj.items()]
+            return "{\n" + ",\n".join(items) + "\n" + "  " * level + "}"
+        if isinstance(obj, list) and any(isinstance(v, dict) for v in obj):
+            return "[\n" + ",\n".join(pad + cls._format(v, level + 1) for v in obj) + "\n" + "  " * level + "]"
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_arrays(path: PathLike) -> List[Dict[str, Any]]:
+    """sheet_arrays() of every sheet of a columnar file (any codec), without building the tree."""
+    doc = load_any(path, raw=True)
+    if not is_columnar(doc):
+        raise ValueError(f"{Path(path).name} is not a columnar JSON file")
+    return [sheet_arrays(sheet) for sheet in doc["sheets"]]
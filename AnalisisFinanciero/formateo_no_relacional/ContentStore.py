@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Union
+from utils import *
+from NestedDictBuilder import *
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+STORE_SCHEMA = "cas"
+STORE_VERSION = 1
+OBJECTS_DIR = "objects"  # <digest> → encoded sheet tree / columnar sheet / file tree
+KEYS_DIR = "keys"        # <sheet content key> → <digest> of its converted form
+
+
+# ----------------- Canonical Hashes -----------------
+def _hex(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _tagged(value: Any) -> str:
+    return f"{type(value).__name__}:{value}"
+
+
+def content_digest(obj: Any) -> str:
+    """
+    Hash of a JSON value as compact UTF-8 JSON in document order. Key order is part
+    of the content, so a resolved reference is identical to the tree it replaced.
+    """
+    return _hex(json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_tagged).encode("utf-8"))
+
+
+def sheet_key(row_labels, col_labels, values, *salt: Any) -> str:
+    """
+    Hash of one flattened sheet's content (labels and values, types included), salted
+    with whatever else its converted form depends on (schema, sheet name).
+    """
+    payload = [STORE_VERSION, list(salt), list(row_labels), list(col_labels),
+               values.tolist() if hasattr(values, "tolist") else values]
+    return _hex(json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_tagged).encode("utf-8"))
+
+
+# ----------------- Content Store -----------------
+class ContentStore:
+    """
+    Content-addressed store for stage outputs.
+
+    Objects (sheet trees, columnar sheets, whole file trees) are written once under
+    objects/<ab>/<digest>, encoded with any JsonCodec (the digest is of the content,
+    not of the bytes). Per-filing outputs become small manifests referencing them:
+        {"schema": "cas", "version": 1, "kind": "nested"|"columnar"|"tree",
+         "store": <store path relative to the manifest>, "sheets": [{"sheet", "ref"}]}
+    load_any() resolves manifests transparently. keys/ maps a sheet's content hash
+    to the digest of its converted form, so identical sheets are converted only once.
+    Writes are atomic and idempotent, so concurrent workers may share a store.
+    """
+
+    def __init__(self, root: PathLike, codec: Union[str, JsonCodec, None] = None):
+        self.root = Path(root).resolve()
+        self.codec = get_codec(codec)
+
+    def _path(self, folder: str, digest: str) -> Path:
+        return self.root / folder / digest[:2] / digest[2:]
+
+    def object_path(self, digest: str) -> Path:
+        return self._path(OBJECTS_DIR, digest)
+
+    def put(self, obj: Any) -> Tuple[str, bool]:
+        """Store obj unless already present; returns (digest, newly written)."""
+        digest = content_digest(obj)
+        path = self.object_path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_output(path) as tmp:
+            self.codec.dump(obj, tmp)
+        return digest, True
+
+    def get(self, digest: str) -> Any:
+        """A fresh copy of a stored object (callers may mutate it)."""
+        path = self.object_path(digest)
+        if not path.exists():
+            raise FileNotFoundError(f"Object {digest} missing from content store {self.root}")
+        return load_any(path, raw=True)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Digest previously recorded for a sheet content key, if its object still exists."""
+        try:
+            digest = self._path(KEYS_DIR, key).read_text(encoding="ascii").strip()
+        except OSError:
+            return None
+        return digest if self.object_path(digest).exists() else None
+
+    def remember(self, key: str, digest: str):
+        path = self._path(KEYS_DIR, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_output(path) as tmp:
+            tmp.write_text(digest, encoding="ascii")
+
+    def manifest(self, kind: str, refs: List[Tuple[str, str]], output_dir: PathLike) -> Dict[str, Any]:
+        """Manifest for a file written to output_dir, referencing (sheet name, digest) pairs."""
+        return {
+            "schema": STORE_SCHEMA,
+            "version": STORE_VERSION,
+            "kind": kind,
+            "store": Path(os.path.relpath(self.root, Path(output_dir).resolve())).as_posix(),
+            "sheets": [{"sheet": sheet, "ref": digest} for sheet, digest in refs],
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """{"objects": n, "bytes": n} currently in the store."""
+        folder = self.root / OBJECTS_DIR
+        files = [f for f in folder.rglob("*") if f.is_file() and not f.name.startswith("~$")] if folder.is_dir() else []
+        return {"objects": len(files), "bytes": sum(f.stat().st_size for f in files)}
+
+
+# ----------------- Resolving -----------------
+def is_manifest(doc: Any) -> bool:
+    return isinstance(doc, dict) and doc.get("schema") == STORE_SCHEMA and "sheets" in doc and "store" in doc
+
+
+def rebase_manifest(doc: Dict[str, Any], base: PathLike, new_base: PathLike) -> Dict[str, Any]:
+    """Copy of a manifest read from `base`, with its store path made relative to `new_base`."""
+    root = (Path(base) / doc["store"]).resolve()
+    return dict(doc, store=Path(os.path.relpath(root, Path(new_base).resolve())).as_posix())
+
+
+def resolve_manifest(doc: Dict[str, Any], base: PathLike) -> Any:
+    """
+    Document a manifest stands for (base: the manifest's folder): the merged tree
+    for "nested" (sheets merged in order, as WorkbookToJsonConverter.convert does),
+    the columnar document for "columnar", the stored tree itself for "tree".
+    """
+    if doc.get("version", 0) > STORE_VERSION:
+        raise ValueError(f"Content store manifest version {doc['version']} is newer than supported ({STORE_VERSION})")
+    store = ContentStore(Path(base) / doc["store"])
+    objects = [store.get(s["ref"]) for s in doc["sheets"]]
+    kind = doc.get("kind", "nested")
+    if kind == "tree":
+        return objects[0] if objects else {}
+    if kind == "columnar":
+        from ColumnarJson import columnar_document  # imports this module's dependencies
+        return columnar_document(objects)
+    merged = {}
+    for tree in objects:
+        NestedDictBuilder.deep_merge(merged, tree)
+    return merged
+
+
+def resolve_refs(doc: Any, base: PathLike) -> Any:
+    """Resolve a manifest, or the manifests held by a bundle ({file key: manifest})."""
+    if is_manifest(doc):
+        return resolve_manifest(doc, base)
+    if isinstance(doc, dict) and any(is_manifest(v) for v in doc.values()):
+        return {k: resolve_manifest(v, base) if is_manifest(v) else v for k, v in doc.items()}
+    return doc
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Union
+import pandas as pd
+from utils import *
+from JsonCodec import *
+from JsonFrameLoader import tree_to_frame
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+VALIDATION_MODES = ("mtime", "hash")
+MANIFEST_FILES = ("conversion_summary.json", "conversion_journal.jsonl")  # ExcelToJSONBatchProcessor outputs
+_MISSING = object()
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _leaves(node: Any, prefix: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """{'a.b.c': value} for every leaf under node (a leaf itself maps from its prefix)."""
+    if not isinstance(node, dict):
+        return {".".join(prefix): node}
+    out = {}
+    stack = [(prefix, iter(node.items()))]
+    while stack:
+        path, items = stack[-1]
+        for k, v in items:
+            if isinstance(v, dict):
+                stack.append((path + (k,), iter(v.items())))
+                break
+            out[".".join(path + (k,))] = v
+        else:
+            stack.pop()
+    return out
+
+
+# ----------------- Corpus -----------------
+class Corpus:
+    """
+    Lazy, memoized view over a directory of JSON-stage outputs (any codec), meant
+    for notebooks where cells are re-executed over and over.
+
+    - filings() lists the corpus from file names (nit/period/report) and the batch
+      manifests (conversion_summary.json / conversion_journal.jsonl) without
+      opening any output file; the listing is rebuilt only when the directory changes.
+    - tree(), frame() and panel() compute on first access and memoize the result
+      in one LRU (max_entries results in total, across kinds).
+    - A memoized result is reused while its source files are unchanged. With
+      validate="mtime" a file counts as changed when its (mtime_ns, size) moves;
+      with validate="hash" a moved file is re-hashed and only a different content
+      hash invalidates, so re-running the conversion on the same inputs keeps
+      the cache warm.
+    """
+
+    def __init__(self, json_dir: Union[str, Path], max_entries: int = 128, validate: str = "mtime"):
+        if validate not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation '{validate}'. Available: {', '.join(VALIDATION_MODES)}")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.json_dir = Path(json_dir)
+        if not self.json_dir.is_dir():
+            raise FileNotFoundError(f"JSON directory not found: {self.json_dir}")
+        self.max_entries = max_entries
+        self.validate = validate
+        self._memo: "OrderedDict[Tuple, Tuple[Tuple, Any]]" = OrderedDict()
+        self._stats: Dict[Path, Tuple[int, int]] = {}
+        self._digests: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self._listing: Dict[str, Dict[str, Any]] = {}
+        self._listing_key: Optional[Tuple] = None
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+
+    # -- listing --
+    def _listing_fingerprint(self) -> Tuple:
+        key = [self.json_dir.stat().st_mtime_ns]
+        for name in MANIFEST_FILES:
+            try:
+                st = (self.json_dir / name).stat()
+                key.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                key.append(None)
+        return tuple(key)
+
+    def _manifest_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Batch summaries by output file name; journal records (newer) override the summary."""
+        entries = {}
+        try:
+            summaries = json.loads((self.json_dir / MANIFEST_FILES[0]).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            summaries = []
+        try:
+            lines = (self.json_dir / MANIFEST_FILES[1]).read_text(encoding="utf-8").splitlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            try:
+                summaries.append(json.loads(line).get("summary"))
+            except (ValueError, AttributeError):
+                continue  # torn last line of an interrupted run
+        for s in summaries:
+            if isinstance(s, dict) and s.get("output"):
+                # Outputs may have been written on another OS; keep only the file name
+                entries[s["output"].replace("\\", "/").rsplit("/", 1)[-1]] = s
+        return entries
+
+    def filings(self) -> Dict[str, Dict[str, Any]]:
+        """{stem: {file, nit, period, report, [status, codec, cells, elapsed_s, input]}}; no file is opened."""
+        with self._lock:
+            key = self._listing_fingerprint()
+            if key != self._listing_key:
+                manifest = self._manifest_entries()
+                listing = {}
+                for f in sorted(self.json_dir.iterdir()):
+                    if not f.is_file() or not is_codec_file(f) or f.name.startswith(".") or f.name.endswith("_summary.json"):
+                        continue
+                    stem = strip_codec_suffix(f.name)
+                    info = {"file": f, **(parse_filing_name(stem) or {})}
+                    m = manifest.get(f.name, {})
+                    info.update({k: m[k] for k in ("status", "codec", "cells", "elapsed_s", "input") if k in m})
+                    listing[stem] = info
+                self._listing, self._listing_key = listing, key
+            return self._listing
+
+    def select(self, report: Optional[str] = None, nit: Optional[str] = None,
+               period: Optional[str] = None) -> List[str]:
+        """Stems of the filings matching every given filter."""
+        wanted = {k: v for k, v in (("report", report), ("nit", nit), ("period", period)) if v is not None}
+        return [s for s, info in self.filings().items() if all(info.get(k) == v for k, v in wanted.items())]
+
+    def listing(self) -> pd.DataFrame:
+        """filings() as a DataFrame indexed by stem."""
+        rows = {s: {k: (v.name if k == "file" else v) for k, v in info.items()} for s, info in self.filings().items()}
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def _file(self, stem: str) -> Path:
+        info = self.filings().get(stem)
+        if info is None:
+            raise KeyError(f"Unknown filing: {stem}")
+        return info["file"]
+
+    # -- memoization --
+    def _version(self, path: Path) -> Any:
+        """What must stay equal for results built from `path` to be reused."""
+        st = path.stat()
+        stat = (st.st_mtime_ns, st.st_size)
+        if self.validate == "mtime":
+            return stat
+        cached = self._digests.get(path)
+        if cached is None or cached[0] != stat:
+            cached = self._digests[path] = (stat, _file_digest(path))
+        return cached[1]
+
+    def _memoized(self, key: Tuple, files: List[Path], compute):
+        with self._lock:
+            versions = tuple(self._version(f) for f in files)
+            entry = self._memo.get(key)
+            if entry is not None and entry[0] == versions:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            value = compute()
+            self._memo[key] = (versions, value)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+                self.evictions += 1
+            return value
+
+    # -- lazy accessors --
+    def tree(self, stem: str) -> Dict[str, Any]:
+        """Parsed tree of one filing (shared; do not mutate)."""
+        path = self._file(stem)
+        return self._memoized(("tree", stem), [path], lambda: load_any(path))
+
+    def frame(self, stem: str) -> pd.DataFrame:
+        """Long-format frame of one filing (see JsonFrameLoader.tree_to_frame)."""
+        path = self._file(stem)
+        return self._memoized(("frame", stem), [path], lambda: tree_to_frame(self.tree(stem), stem))
+
+    def panel(self, path: Union[str, List[str]], report: Optional[str] = None, nit: Optional[str] = None,
+              period: Optional[str] = None) -> pd.DataFrame:
+        """
+        One subtree across filings: rows are filings (nit, period, report), columns the
+        dot-joined leaf paths below `path` ("A.B" or ["A", "B"]). Filings without the
+        subtree are left out.
+        """
+        keys = tuple(split_path(path) if isinstance(path, str) else path)
+        stems = self.select(report, nit, period)
+        files = [self._file(s) for s in stems]
+
+        def compute():
+            rows, index = [], []
+            for stem in stems:
+                node = self.tree(stem)
+                for k in keys:
+                    node = node.get(k, _MISSING) if isinstance(node, dict) else _MISSING
+                if node is _MISSING:
+                    continue
+                info = self.filings()[stem]
+                index.append((info.get("nit"), info.get("period"), info.get("report")))
+                rows.append(_leaves(node))
+            return pd.DataFrame(rows, index=pd.MultiIndex.from_tuples(index, names=["nit", "period", "report"])
+                                if index else None)
+
+        return self._memoized(("panel", keys, report, nit, period, tuple(stems)), files, compute)
+
+    # -- housekeeping --
+    def invalidate(self, stem: Optional[str] = None):
+        """Drop memoized results of one filing (including panels over it), or everything."""
+        with self._lock:
+            if stem is None:
+                self._memo.clear()
+                return
+            for key in [k for k in self._memo if (k[0] != "panel" and k[1] == stem) or (k[0] == "panel" and stem in k[-1])]:
+                del self._memo[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "filings": len(self._listing),
+                "entries": len(self._memo),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self.filings())
+
+    def __iter__(self):
+        return iter(self.filings())
+
+    def __contains__(self, stem) -> bool:
+        return stem in self.filings()
+
+    def __repr__(self) -> str:
+        return f"Corpus({str(self.json_dir)!r}, {len(self._listing)} filings, {len(self._memo)} cached)"
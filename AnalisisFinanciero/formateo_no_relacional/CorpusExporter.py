@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Tuple
+import pandas as pd
+import numpy as np
+from utils import *
+from JsonCodec import *
+from WorkbookToJsonConverter import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa  # optional, only needed for Parquet output
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+COLUMNS = ["nit", "period", "report", "row_path", "col_path", "value", "value_num"]
+FORMATS = ("csv", "parquet")
+PARTITIONS = ("report", "period", "nit", "none")
+
+Row = Tuple[str, str, str, str, str, Any]
+
+
+# ----------------- Row Sources -----------------
+def iter_workbook_rows(file_path: Path, info: Dict[str, str],
+                       reader: Optional[WorkbookToJsonConverter] = None) -> Iterator[Row]:
+    """Non-null cells of a flattened workbook, sheet by sheet."""
+    reader = reader or WorkbookToJsonConverter()
+    xl = pd.ExcelFile(file_path, engine="openpyxl")
+    for sheet in xl.sheet_names:
+        df = reader.read_sheet(file_path, sheet, xl=xl)
+        if df.index.name != "Index" and "Index" in df.columns:
+            df = df.set_index("Index")
+        row_labels = [str(r) for r in df.index]
+        col_labels = [str(c) for c in df.columns]
+        values = df.to_numpy(dtype=object)
+        rows, cols = np.nonzero(pd.notna(values))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            v = json_safe_scalar(values[i, j])
+            if v is not None:
+                yield info["nit"], info["period"], info["report"], row_labels[i], col_labels[j], v
+
+
+def iter_tree_rows(tree: Any, info: Dict[str, str]) -> Iterator[Row]:
+    """
+    Leaves of a JSON-stage tree. Trees do not record where the row path ends, so the
+    leaf key is used as col_path and the keys above it as row_path.
+    """
+    stack = [([], tree)]
+    while stack:
+        path, node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        for k, v in reversed(list(node.items())):
+            if isinstance(v, dict):
+                stack.append((path + [k], v))
+            elif v is not None:
+                yield info["nit"], info["period"], info["report"], ".".join(path), k, v
+
+
+def iter_corpus_rows(files: Iterable[Path]) -> Iterator[Row]:
+    """Rows of every filing, one file at a time (flattened workbooks or JSON outputs)."""
+    reader = WorkbookToJsonConverter()
+    for f in files:
+        info = parse_filing_name(f.name)
+        if info is None:
+            logger.warning(f"Skipping {f.name}: name does not match <NIT>_<YYYY-MM-DD>_<Report>")
+            continue
+        try:
+            if is_excel_file(f):
+                yield from iter_workbook_rows(f, info, reader)
+            else:
+                yield from iter_tree_rows(load_any(f), info)
+        except Exception as e:
+            logger.error(f"Failed to export {f.name}: {e}")
+
+
+def chunked(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ----------------- Partition Writers -----------------
+class _PartitionWriter:
+    """Appends row groups to one CSV or Parquet file; calls are serialized by a lock."""
+
+    def __init__(self, path: Path, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self.lock = threading.Lock()
+        self._parquet = None
+        self._tmp = path.with_name(f"~${path.name}")  # renamed into place on close()
+        self._started = False
+
+    def write(self, frame: pd.DataFrame):
+        with self.lock:
+            if self.fmt == "csv":
+                frame.to_csv(self._tmp, mode="a" if self._started else "w", header=not self._started,
+                             index=False, encoding="utf-8")
+            else:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if self._parquet is None:
+                    self._parquet = pq.ParquetWriter(str(self._tmp), table.schema, compression="zstd")
+                self._parquet.write_table(table)  # one row group per chunk
+            self._started = True
+
+    def close(self):
+        with self.lock:
+            if self._parquet is not None:
+                self._parquet.close()
+            if self._started:
+                self._tmp.replace(self.path)
+
+
+class CorpusExporter:
+    """
+    Streams a corpus into partitioned CSV or Parquet files with bounded memory.
+
+    Filings are read one at a time and their cells flow through generators into
+    per-partition buffers; every `row_group_size` rows a buffer becomes one row
+    group (a CSV append or a Parquet row group) written by a pool of `writers`
+    threads. Producers block once `max_pending` row groups are waiting. The buffers
+    together hold at most `max_buffered_rows` rows: when they reach it, the largest
+    ones are written early (smaller row groups) until half of that is left. Memory
+    therefore stays around max_buffered_rows + max_pending × row_group_size rows
+    regardless of corpus size and of the number of partitions.
+    Output layout: <output_dir>/<partition>=<value>/part.<fmt>.
+    """
+
+    def __init__(self, output_dir: Path, fmt: str = "csv", partition_by: str = "report",
+                 row_group_size: int = 100_000, writers: int = 1, max_pending: Optional[int] = None,
+                 max_buffered_rows: Optional[int] = None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'. Available: {', '.join(FORMATS)}")
+        if partition_by not in PARTITIONS:
+            raise ValueError(f"Unknown partition '{partition_by}'. Available: {', '.join(PARTITIONS)}")
+        if fmt == "parquet" and pa is None:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.output_dir = Path(output_dir)
+        self.fmt = fmt
+        self.partition_by = partition_by
+        self.row_group_size = row_group_size
+        self.writers = max(1, writers)
+        self.max_pending = max_pending or 2 * self.writers
+        self.max_buffered_rows = max(row_group_size, max_buffered_rows or 4 * row_group_size)
+
+    def _partition_of(self, row: Row) -> str:
+        if self.partition_by == "none":
+            return ""
+        return row[COLUMNS.index(self.partition_by)]
+
+    def _writer_for(self, partitions: Dict[str, _PartitionWriter], key: str) -> _PartitionWriter:
+        w = partitions.get(key)
+        if w is None:
+            folder = self.output_dir / (f"{self.partition_by}={key}" if key else "")
+            folder.mkdir(parents=True, exist_ok=True)
+            w = partitions[key] = _PartitionWriter(folder / f"part.{self.fmt}", self.fmt)
+        return w
+
+    @staticmethod
+    def _frame(rows: List[Row]) -> pd.DataFrame:
+        df = pd.DataFrame.from_records(rows, columns=COLUMNS[:-1])
+        df["value_num"] = pd.to_numeric(df["value"], errors="coerce")
+        df["value"] = df["value"].map(str)  # one column type per file
+        return df
+
+    def export(self, files: Iterable[Path]) -> Dict[str, Any]:
+        """Export every file; returns {'rows', 'row_groups', 'partitions', 'elapsed_s', 'rows_per_s'}."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        partitions: Dict[str, _PartitionWriter] = {}
+        buffers: Dict[str, List[Row]] = {}
+        slots = threading.BoundedSemaphore(self.max_pending)
+        futures = []
+        n_rows = n_groups = buffered = 0
+        t0 = time.perf_counter()
+
+        def write(writer: _PartitionWriter, rows: List[Row]):
+            try:
+                writer.write(self._frame(rows))
+            finally:
+                slots.release()
+
+        def flush(key: str):
+            nonlocal n_groups, buffered
+            rows = buffers.pop(key)
+            buffered -= len(rows)
+            slots.acquire()  # back-pressure: wait while max_pending groups are queued
+            futures.append(pool.submit(write, self._writer_for(partitions, key), rows))
+            n_groups += 1
+
+        with ThreadPoolExecutor(max_workers=self.writers) as pool:
+            for chunk in chunked(iter_corpus_rows(files), self.row_group_size):
+                for row in chunk:
+                    key = self._partition_of(row)
+                    buf = buffers.setdefault(key, [])
+                    buf.append(row)
+                    buffered += 1
+                    if len(buf) >= self.row_group_size:
+                        flush(key)
+                    elif buffered >= self.max_buffered_rows:
+                        # Many partitions: write the largest buffers early instead of growing
+                        for big in sorted(buffers, key=lambda k: len(buffers[k]), reverse=True):
+                            flush(big)
+                            if buffered <= self.max_buffered_rows // 2:
+                                break
+                n_rows += len(chunk)
+                for f in futures:
+                    if f.done():
+                        f.result()  # surface writer errors early
+                futures = [f for f in futures if not f.done()]
+            for key in list(buffers):
+                flush(key)
+            for f in futures:
+                f.result()  # surface writer errors
+
+        for w in partitions.values():
+            w.close()
+
+        elapsed = time.perf_counter() - t0
+        return {
+            "rows": n_rows,
+            "row_groups": n_groups,
+            "partitions": len(partitions),
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(n_rows / elapsed) if elapsed > 0 else None,
+        }
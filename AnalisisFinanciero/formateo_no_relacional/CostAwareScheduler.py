@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import re
+import statistics
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil  # optional, more portable RSS readings
+except ImportError:  # pragma: no cover
+    psutil = None
+
+
+# ----------------- Memory Probes -----------------
+def process_rss_mb(pid: Optional[int] = None) -> float:
+    """Resident set size of a process in MiB (0.0 if it cannot be read)."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2**20
+        except psutil.Error:
+            return 0.0
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def count_sheets(path: Path) -> int:
+    """Number of sheets declared in an xlsx workbook.xml, without loading the workbook."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return max(1, len(re.findall(rb"<(?:\w+:)?sheet\b", zf.read("xl/workbook.xml"))))
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return 1
+
+
+# ----------------- Worker Side -----------------
+_worker_fn: Optional[Callable] = None
+
+
+def _init_worker(fn: Callable):
+    """Install the per-file function once per worker instead of pickling it per task."""
+    global _worker_fn
+    _worker_fn = fn
+
+
+def _run_measured(fn: Optional[Callable], path: Path) -> Tuple[Any, float, int, float]:
+    fn = fn or _worker_fn
+    t0 = time.perf_counter()
+    result = fn(path)
+    return result, time.perf_counter() - t0, os.getpid(), process_rss_mb()
+
+
+# ----------------- Scheduler -----------------
+class CostAwareScheduler:
+    """
+    Runs a per-file function over many files, longest-job-first, with memory-adaptive concurrency.
+
+    Cost estimate per file: the elapsed time recorded for it in previous summaries
+    ("elapsed_s") when available; otherwise size × learned seconds-per-byte, inflated
+    by sheet count. Files are dispatched in decreasing cost so the long ones start
+    first and the tail of the run is made of short jobs.
+
+    When memory_budget_mb is set, a new job is only admitted if the sampled RSS of
+    the workers plus the estimated footprint of the running and next job fit the
+    budget; otherwise the scheduler waits for a job to finish (concurrency drops).
+    At least one job always runs.
+
+    If a worker process dies (e.g. killed by the OOM killer), the files that were
+    in flight are retried one at a time in a new pool with half the workers; only
+    a file that kills its worker while running alone is reported failed.
+    """
+
+    SHEET_WEIGHT = 0.05        # +5% cost per extra sheet
+    DEFAULT_MEM_FACTOR = 40.0  # in-memory footprint ≈ 40× the compressed xlsx size
+
+    def __init__(self, workers: int = 1, memory_budget_mb: Optional[float] = None,
+                 history: Optional[Dict[str, float]] = None, mem_factor: float = DEFAULT_MEM_FACTOR):
+        self.workers = max(1, int(workers or 1))
+        self.memory_budget_mb = memory_budget_mb
+        self.history = history or {}
+        self.mem_factor = mem_factor
+        self.peak_rss_mb = 0.0
+        self.min_concurrency = self.workers
+
+    # -- history --
+    @staticmethod
+    def load_history(*sources: Path) -> Dict[str, float]:
+        """
+        Read {file name: elapsed_s} from previous summary JSON files and/or journals.
+        Missing or unreadable sources are ignored.
+        """
+        history: Dict[str, float] = {}
+        for src in sources:
+            src = Path(src)
+            try:
+                text = src.read_text(encoding="utf-8")
+            except OSError:
+                continue
+            if src.suffix == ".jsonl":
+                records = []
+                for line in text.splitlines():
+                    try:
+                        records.append(json.loads(line).get("summary"))
+                    except json.JSONDecodeError:
+                        continue
+            else:
+                try:
+                    records = json.loads(text)
+                except json.JSONDecodeError:
+                    continue
+            for r in records or []:
+                if isinstance(r, dict) and r.get("elapsed_s") is not None and r.get("input"):
+                    history[Path(r["input"]).name] = float(r["elapsed_s"])
+        return history
+
+    # -- estimates --
+    def estimate(self, files: List[Path]) -> Dict[Path, Dict[str, float]]:
+        """Return {path: {'cost': seconds-ish, 'mem_mb': estimated extra MiB}}."""
+        sizes = {f: f.stat().st_size for f in files}
+        rates = [self.history[f.name] / sizes[f] for f in files if f.name in self.history and sizes[f]]
+        sec_per_byte = statistics.median(rates) if rates else 1e-6
+
+        out = {}
+        for f in files:
+            sheets = count_sheets(f)
+            if f.name in self.history:
+                cost = self.history[f.name]
+            else:
+                cost = sizes[f] * sec_per_byte * (1 + self.SHEET_WEIGHT * (sheets - 1))
+            out[f] = {"cost": cost, "mem_mb": sizes[f] * self.mem_factor / 2**20, "sheets": sheets}
+        return out
+
+    def order(self, files: List[Path]) -> List[Path]:
+        """Files sorted longest-first (ties broken by name for determinism)."""
+        est = self.estimate(files)
+        return sorted(files, key=lambda f: (-est[f]["cost"], f.name))
+
+    # -- execution --
+    def run(self, fn: Callable[[Path], Any], files: List[Path]) -> Iterator[Tuple[Path, Any, Optional[BaseException], Dict]]:
+        """
+        Yield (path, result, error, stats) as files complete. stats has 'elapsed_s' and 'rss_mb'.
+        fn must be picklable when workers > 1 (e.g. a bound method of a picklable object).
+        """
+        files = list(files)
+        if self.workers <= 1 or len(files) <= 1:
+            for f in files:
+                try:
+                    result, elapsed, _, rss = _run_measured(fn, f)
+                    error = None
+                except Exception as e:
+                    result, elapsed, rss, error = None, 0.0, process_rss_mb(), e
+                self.peak_rss_mb = max(self.peak_rss_mb, rss)
+                yield f, result, error, {"elapsed_s": round(elapsed, 4), "rss_mb": round(rss, 1)}
+            return
+
+        est = self.estimate(files)
+        queue = deque(sorted(files, key=lambda f: (-est[f]["cost"], f.name)))
+        suspects: deque = deque()  # in flight when a worker died; each is retried alone
+        worker_pids: set = set()
+        workers = self.workers
+
+        while queue or suspects:
+            running: Dict[Any, Path] = {}
+            alone: Optional[Path] = None
+            lost: List[Path] = []  # died with the pool without being the cause
+            broken = False
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(fn,)) as ex:
+                while (queue or suspects or running) and not broken:
+                    try:
+                        if suspects:
+                            if not running:
+                                fut = ex.submit(_run_measured, None, suspects[0])
+                                running[fut] = alone = suspects.popleft()
+                        else:
+                            while queue and len(running) < workers and self._admit(est, queue[0], running, worker_pids):
+                                fut = ex.submit(_run_measured, None, queue[0])
+                                running[fut] = queue.popleft()
+                    except BrokenProcessPool:
+                        broken = True
+                        break
+                    if queue:  # concurrency is only "lowered" while work is waiting
+                        self.min_concurrency = min(self.min_concurrency, len(running))
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        f = running.pop(fut)
+                        try:
+                            result, elapsed, pid, rss = fut.result()
+                            worker_pids.add(pid)
+                            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+                            yield f, result, None, {"elapsed_s": round(elapsed, 4), "rss_mb": round(rss, 1)}
+                        except BrokenProcessPool as e:
+                            broken = True
+                            if f == alone:  # it ran by itself, so it is the one that killed its worker
+                                logger.error(f"{f.name} killed its worker process")
+                                yield f, None, e, {"elapsed_s": None, "rss_mb": None}
+                            else:
+                                lost.append(f)
+                        except Exception as e:
+                            yield f, None, e, {"elapsed_s": None, "rss_mb": None}
+
+            if broken:
+                worker_pids.clear()
+                lost.extend(running.values())
+            if lost:
+                # Every job still in flight died with the pool: retry each alone in a new,
+                # smaller pool, so only the file that kills its worker is reported failed
+                suspects.extend(lost)
+                workers = max(1, workers // 2)
+                self.min_concurrency = min(self.min_concurrency, workers)
+                logger.warning(f"A worker process died; retrying {len(suspects)} file(s) one at a time, "
+                               f"then continuing with {workers} worker(s)")
+
+    def _admit(self, est: Dict[Path, Dict[str, float]], f: Path, running: Dict[Any, Path], worker_pids: set) -> bool:
+        """Memory admission check for the next job."""
+        if not self.memory_budget_mb or not running:
+            return True
+        sampled = sum(process_rss_mb(pid) for pid in worker_pids)
+        self.peak_rss_mb = max(self.peak_rss_mb, sampled)
+        in_flight = sum(est[r]["mem_mb"] for r in running.values())
+        # Sampled RSS already contains part of the running jobs' footprint; use the larger view
+        fits = max(sampled, in_flight) + est[f]["mem_mb"] <= self.memory_budget_mb
+        if not fits:
+            logger.debug(f"Memory budget: holding {f.name} ({len(running)} running, ~{sampled:.0f} MiB RSS)")
+        return fits
@@ -11,6 +11,13 @@ from utils import *
 from NestedDictBuilder import *
 from SheetToJsonConverter import *
 from WorkbookToJsonConverter import *
+from JsonCodec import *
+from BatchJournal import *
+from CostAwareScheduler import *
+from RunMetrics import *
+from FilingSelection import *
+from ColumnarJson import *
+from ContentStore import *
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -21,7 +28,17 @@ logger = logging.getLogger(__name__)
 class ExcelToJSONBatchProcessor:
     """Batch process all Excel files in a folder to JSON."""
 
-    def __init__(self, input_dir: Path, output_dir: Path):
+    JOURNAL_NAME = "conversion_journal.jsonl"
+    SUMMARY_NAME = "conversion_summary.json"
+
+    def __init__(self, input_dir: Path, output_dir: Path, codec: str = "pretty",
+                 sheet_workers: int = 1, sheet_executor: str = "thread", resume: bool = False,
+                 workers: int = 1, memory_budget_mb: Optional[float] = None, engine: str = "openpyxl",
+                 metrics_dir: Optional[Path] = None, metrics_interval: float = 10.0, progress: bool = False,
+                 selection: Optional[FilingSelection] = None, schema: str = "nested",
+                 store_dir: Optional[Path] = None):
+        if schema not in SCHEMAS:
+            raise ValueError(f"Unknown schema '{schema}'. Available: {', '.join(SCHEMAS)}")
         self.input_dir = input_dir.resolve()
         self.output_dir = output_dir.resolve()
 
@@ -31,7 +48,30 @@ class ExcelToJSONBatchProcessor:
             raise NotADirectoryError(f"Input path is not a directory: {self.input_dir}")
 
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.converter = WorkbookToJsonConverter()
+        # Report/NIT/period predicates prune files here; sheets and rows are pruned by the converter
+        self.selection = selection or FilingSelection()
+        self.converter = WorkbookToJsonConverter(sheet_workers, sheet_executor, engine, self.selection)
+        self.codec = get_codec(codec)
+        # "nested": one merged tree per workbook; "columnar": per-sheet path/value arrays (ColumnarJson.py)
+        self.schema = schema
+        if schema == "columnar" and type(self.codec) is JsonCodec:
+            self.codec = PrettyColumnarCodec()  # one line per array, not per element
+        # Sheets are stored once in a content store (ContentStore.py); outputs become manifests
+        self.store = ContentStore(store_dir, self.codec) if store_dir is not None else None
+        # A shard (--shard i/N) keeps its summary and journal under output_dir/shards/
+        self.summary_path = self.selection.run_file(self.output_dir, self.SUMMARY_NAME)
+        journal_path = self.selection.run_file(self.output_dir, self.JOURNAL_NAME)
+        journal_path.parent.mkdir(parents=True, exist_ok=True)
+        # Timings from the previous run drive longest-first scheduling; read them before
+        # the journal is reset for a fresh run (a merged summary covers every shard)
+        self.history = CostAwareScheduler.load_history(self.output_dir / self.SUMMARY_NAME, journal_path)
+        self.journal = BatchJournal(journal_path, resume=resume)
+        self.scheduler = CostAwareScheduler(workers, memory_budget_mb, self.history)
+        # Throughput/latency metrics; created per run in run()
+        self.metrics_dir = metrics_dir
+        self.metrics_interval = metrics_interval
+        self.progress = progress
+        self.metrics = None
 
     def run(self) -> List[Dict[str, Any]]:
         """
@@ -42,34 +82,69 @@ class ExcelToJSONBatchProcessor:
             logger.info(f"No Excel files found in {self.input_dir}")
             return []
 
-        logger.info(f"Processing {len(files)} Excel file(s)...")
-        summaries = []
+        candidates = sorted(files)
+        files = self.selection.select_files(candidates)
+        self.selection.write_manifest(self.output_dir, "conversion", candidates, files)
+        pending = [f for f in files if not self.journal.is_done(f)]
+        logger.info(f"Processing {len(pending)} Excel file(s)...")
+        self.metrics = RunMetrics("json", len(pending), self.metrics_dir, self.metrics_interval, self.progress)
+        self.metrics.tick(force=True)
+
+        try:
+            for file_path, summary, error, stats in self.scheduler.run(self._process_file, pending):
+                if error is not None:
+                    logger.error(f"Failed to process {file_path.name}: {error}")
+                    summary = {"input": str(file_path), "output": None, "status": "failed", "error": str(error)}
+                if summary is not None:
+                    summary["elapsed_s"] = stats["elapsed_s"]
+                self.journal.record(file_path, summary)
+                self.metrics.observe_file(file_path, summary, error, stats["elapsed_s"])
+        finally:
+            self.converter.close()
+            self.metrics.close()
 
-        for file_path in sorted(files):
-            try:
-                tree = self.converter.convert(file_path)
-                if tree is None:
-                    continue  # Error already logged
+        return self.journal.summaries(files)
 
-                output_path = self.output_dir / f"{file_path.stem}.json"
-                with open(output_path, "w", encoding="utf-8") as f:
-                    json.dump(tree, f, ensure_ascii=False, indent=2)
+    def _process_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """Convert and write one workbook; returns its summary (None if it could not be opened)."""
+        try:
+            stats = {}
+            if self.store is not None:
+                refs = self.converter.convert_stored(file_path, self.store, self.schema, stats)
+                tree = None if refs is None else self.store.manifest(self.schema, refs, self.output_dir)
+            else:
+                convert = self.converter.convert_columnar if self.schema == "columnar" else self.converter.convert
+                tree = convert(file_path, stats)
+            if tree is None:
+                return None  # Error already logged
+            if not stats["sheets"]:
+                logger.info(f"Skipping {file_path.name}: no sheet matches the selection")
+                return {"input": str(file_path), "output": None, "status": "skipped",
+                        "stages": {k: round(v, 4) for k, v in stats["stages"].items()}}
 
-                summary = {
-                    "input": str(file_path),
-                    "output": str(output_path),
-                    "status": "success"
-                }
-                logger.info(f"✔ JSON saved: {output_path}")
-            except Exception as e:
-                logger.error(f"Failed to process {file_path.name}: {e}")
-                summary = {
-                    "input": str(file_path),
-                    "output": None,
-                    "status": "failed",
-                    "error": str(e)
-                }
+            output_path = self.output_dir / f"{file_path.stem}{self.codec.suffix}"
+            with stage_timer(stats["stages"], "encode"), atomic_output(output_path) as tmp_path:
+                self.codec.dump(tree, tmp_path)
 
-            summaries.append(summary)
+            summary = {
+                "input": str(file_path),
+                "output": str(output_path),
+                "codec": self.codec.name,
+                "schema": self.schema,
+                "status": "success",
+                "cells": stats["cells"],
+                "stages": {k: round(v, 4) for k, v in stats["stages"].items()},
+            }
+            if self.store is not None:
+                summary.update(store=str(self.store.root), reused=stats["reused"], stored=stats["stored"])
+            logger.info(f"✔ JSON saved: {output_path}")
+        except Exception as e:
+            logger.error(f"Failed to process {file_path.name}: {e}")
+            summary = {
+                "input": str(file_path),
+                "output": None,
+                "status": "failed",
+                "error": str(e)
+            }
 
-        return summaries
\ No newline at end of file
+        return summary
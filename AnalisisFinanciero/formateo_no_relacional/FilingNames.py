@@ -0,0 +1,24 @@
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+
+FILING_NAME_RE = re.compile(
+    r"^(?P<nit>\d+)_(?P<period>\d{4}-\d{2}-\d{2})_(?P<report>.+?)(?:_traduccion)?(?:_flattened)?$"
+)
+
+
+# ----------------- Filing Names -----------------
+def parse_filing_name(name: str) -> Optional[Dict[str, str]]:
+    """
+    Parse '<NIT>_<YYYY-MM-DD>_<Report>[_traduccion][_flattened]' (extension allowed).
+
+    Returns {'nit', 'period', 'report'} or None if the name does not follow the
+    Supersociedades convention. The report name is NFC-normalized so that
+    decomposed accents in file names compare equal to composed ones.
+    """
+    stem = Path(str(name)).name.split(".")[0]
+    m = FILING_NAME_RE.match(unicodedata.normalize("NFC", stem))
+    if not m:
+        return None
+    return {"nit": m["nit"], "period": m["period"], "report": m["report"]}
@@ -0,0 +1,258 @@
+import argparse
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Iterable, Optional, Tuple
+import numpy as np
+from FilingNames import parse_filing_name
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+FLATTENED_PREFIX = "flattened_"  # sheet names written by the flattening stage
+SHARDS_DIR = "shards"  # per-shard summaries, journals and manifests (combined by merge_shards.py)
+
+
+def _norm(s: str) -> str:
+    """Lowercase, strip accents, '_' → ' ' and collapse whitespace (so names match file names)."""
+    s = unicodedata.normalize("NFKD", str(s).replace("_", " "))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.lower().split())
+
+
+def _pattern(s: str) -> str:
+    """Only * and ? are wildcards: labels are full of literal brackets ("[sinopsis]", "[miembro]")."""
+    return s.replace("[", "[[]")
+
+
+def _split_path(label: str) -> List[str]:
+    return [p.strip() for p in str(label).split(".") if p.strip()]
+
+
+def _read_nit_file(path: Path) -> List[str]:
+    """NITs from a text/CSV file: first field of each line, lines without a numeric first field skipped."""
+    nits = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        field = re.split(r"[,;\t]", line.strip(), maxsplit=1)[0].strip().strip('"')
+        if field.isdigit():
+            nits.append(field)
+    return nits
+
+
+# ----------------- Sharding -----------------
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'i/N' → (i, N); shards are numbered 1..N."""
+    m = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", str(spec))
+    if not m or not 1 <= int(m[1]) <= int(m[2]):
+        raise argparse.ArgumentTypeError(f"Invalid shard '{spec}': expected i/N with 1 <= i <= N")
+    return int(m[1]), int(m[2])
+
+
+def shard_key(path: Path) -> str:
+    """
+    What a file is partitioned by: the NIT, so every period and report of a company
+    lands on the same shard in every stage; names without one fall back to the
+    stem without the stage suffix.
+    """
+    parsed = parse_filing_name(path)
+    if parsed:
+        return parsed["nit"]
+    return re.sub(r"(_flattened)+$", "", unicodedata.normalize("NFC", Path(path).name.split(".")[0]))
+
+
+def shard_of(key: str, count: int) -> int:
+    """Shard (1..count) of a key; stable across processes and machines, unlike hash()."""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+# ----------------- Filing Selection -----------------
+class FilingSelection:
+    """
+    Predicates that restrict a batch run to part of the corpus.
+
+    - reports/nits/periods are checked against the file name
+      (<NIT>_<YYYY-MM-DD>_<Report>...), so files are pruned before they are opened;
+      names that do not follow the convention are left out while any of them is set.
+    - sheets is checked against the sheet names of an open workbook before any
+      sheet is parsed ("flattened_<name>" sheets of later stages also match <name>).
+    - row_prefixes keep the rows whose dot-separated row path starts with one of
+      the prefixes ("A.B" keeps "A.B" and "A.B.C", not "A.BC").
+    - shard (i, N) keeps the files whose NIT hashes to shard i of N, so N processes
+      (on one machine or several) split a run without coordinating. Each shard keeps
+      its summary, journal and manifest under <output>/shards/.
+
+    Report, sheet and row-path matching ignores case, accents and '_' vs ' ', and
+    accepts * and ? wildcards ("Notas_*", "*patrimonio*"); nits and periods accept
+    them too ("2024-*"). Unset predicates accept everything.
+    """
+
+    def __init__(self, reports: Optional[Iterable[str]] = None, nits: Optional[Iterable[str]] = None,
+                 periods: Optional[Iterable[str]] = None, sheets: Optional[Iterable[str]] = None,
+                 row_prefixes: Optional[Iterable[str]] = None, shard: Optional[Tuple[int, int]] = None):
+        self.reports = [_pattern(_norm(r)) for r in reports or []]
+        self.nits = [str(n).strip() for n in nits or []]
+        self.periods = [_pattern(str(p).strip()) for p in periods or []]
+        self.sheets = [_pattern(_norm(s)) for s in sheets or []]
+        self.row_prefixes = [[_pattern(_norm(p)) for p in _split_path(prefix)] for prefix in row_prefixes or []]
+        # Plain NITs (possibly thousands, from --nit_file) are looked up in a set
+        self._nit_set = {n for n in self.nits if not any(ch in n for ch in "*?")}
+        self._nit_patterns = [_pattern(n) for n in self.nits if n not in self._nit_set]
+        self.shard = tuple(shard) if shard else None
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "FilingSelection":
+        nits = list(args.nits or [])
+        if args.nit_file:
+            nits += _read_nit_file(args.nit_file)
+        return cls(args.reports, nits, args.periods, args.sheets, args.row_prefixes, args.shard)
+
+    @staticmethod
+    def add_arguments(parser: argparse.ArgumentParser):
+        group = parser.add_argument_group("selection (files are pruned before they are opened)")
+        group.add_argument("--reports", nargs="+", metavar="REPORT",
+                           help='Report types from the file name, e.g. "Estado de cambios en el patrimonio" "Notas_*".')
+        group.add_argument("--nits", nargs="+", metavar="NIT", help="Only these companies.")
+        group.add_argument("--nit_file", type=str,
+                           help="File with one NIT per line (first CSV field), e.g. the companies of a CIIU sector.")
+        group.add_argument("--periods", nargs="+", metavar="YYYY-MM-DD", help='Period end dates, e.g. 2024-12-31 or "2024-*".')
+        group.add_argument("--sheets", nargs="+", metavar="SHEET", help="Only these sheets (wildcards allowed).")
+        group.add_argument("--row_prefixes", nargs="+", metavar="PATH",
+                           help='Keep rows whose row path starts with one of these, e.g. "Estado de cambios en el patrimonio [sinopsis]".')
+        group.add_argument("--shard", type=parse_shard, metavar="i/N",
+                           help="Process only shard i of N (files partitioned by a stable hash of the NIT); "
+                                "combine the shards with merge_shards.py.")
+
+    @property
+    def active(self) -> bool:
+        return bool(self.reports or self.nits or self.periods or self.sheets or self.row_prefixes or self.shard)
+
+    @property
+    def filters_files(self) -> bool:
+        return bool(self.reports or self.nits or self.periods or self.shard)
+
+    @staticmethod
+    def _matches(value: str, patterns: List[str]) -> bool:
+        return any(fnmatch.fnmatchcase(value, p) for p in patterns)
+
+    # -- files --
+    def accepts_file(self, path: Path, ignore_shard: bool = False) -> bool:
+        """Decide from the file name alone."""
+        if self.shard and not ignore_shard and shard_of(shard_key(path), self.shard[1]) != self.shard[0]:
+            return False
+        if not (self.reports or self.nits or self.periods):
+            return True
+        m = parse_filing_name(path)
+        if not m:
+            logger.debug(f"Skipping {Path(path).name}: name does not identify NIT/period/report")
+            return False
+        if self.nits and m["nit"] not in self._nit_set and not self._matches(m["nit"], self._nit_patterns):
+            return False
+        if self.periods and not self._matches(m["period"], self.periods):
+            return False
+        return not self.reports or self._matches(_norm(m["report"]), self.reports)
+
+    def select_files(self, files: Iterable[Path]) -> List[Path]:
+        files = list(files)
+        if not self.filters_files:
+            return files
+        selected = [f for f in files if self.accepts_file(f)]
+        shard = f" (shard {self.shard[0]}/{self.shard[1]})" if self.shard else ""
+        logger.info(f"Selection: {len(selected)} of {len(files)} file(s){shard}")
+        return selected
+
+    # -- shard bookkeeping --
+    def run_file(self, out_dir: Path, name: str) -> Path:
+        """
+        Path of a run-level file (summary, journal, manifest): out_dir/name, or
+        out_dir/shards/<stem>.<i>-of-<N><ext> for a shard, so that shards writing to
+        the same output directory never overwrite each other's bookkeeping.
+        """
+        if not self.shard:
+            return Path(out_dir) / name
+        base, dot, ext = name.partition(".")
+        return Path(out_dir) / SHARDS_DIR / f"{base}.{self.shard[0]}-of-{self.shard[1]}{dot}{ext}"
+
+    def write_manifest(self, out_dir: Path, stage: str, candidates: Iterable[Path], files: Iterable[Path]):
+        """
+        Record which files this shard owns (nothing when not sharded). "selected" is the
+        size of the whole selection, identical for every shard of a run, which lets
+        merge_shards.py check that the shards cover it exactly once.
+        """
+        if not self.shard:
+            return None
+        path = self.run_file(out_dir, f"{stage}_manifest.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "stage": stage,
+            "shard": list(self.shard),
+            "selected": sum(1 for f in candidates if self.accepts_file(f, ignore_shard=True)),
+            "files": [str(f) for f in files],
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    # -- sheets --
+    def accepts_sheet(self, sheet_name: str) -> bool:
+        if not self.sheets:
+            return True
+        name = str(sheet_name)
+        if name.startswith(FLATTENED_PREFIX):
+            name = name[len(FLATTENED_PREFIX):]
+        return self._matches(_norm(name), self.sheets) or self._matches(_norm(sheet_name), self.sheets)
+
+    def select_sheets(self, sheet_names: Iterable[str]) -> List[str]:
+        return [s for s in sheet_names if self.accepts_sheet(s)]
+
+    # -- rows --
+    def accepts_row(self, label: str) -> bool:
+        if not self.row_prefixes:
+            return True
+        path = [_norm(p) for p in _split_path(label)]
+        return any(
+            len(path) >= len(prefix) and all(fnmatch.fnmatchcase(seg, p) for seg, p in zip(path, prefix))
+            for prefix in self.row_prefixes
+        )
+
+    def row_mask(self, labels: Iterable[str]) -> np.ndarray:
+        """Boolean mask over row labels (all True when no row prefix is set)."""
+        labels = list(labels)
+        if not self.row_prefixes:
+            return np.ones(len(labels), dtype=bool)
+        # Labels repeat (forward-filled headers); decide each distinct label once
+        decided: Dict[str, bool] = {}
+        mask = np.empty(len(labels), dtype=bool)
+        for i, label in enumerate(labels):
+            label = str(label)
+            keep = decided.get(label)
+            if keep is None:
+                keep = decided[label] = self.accepts_row(label)
+            mask[i] = keep
+        return mask
+
+    def select_rows(self, table):
+        """
+        Keep the selected rows of a FlatSheet or a flattened DataFrame (row paths in
+        its "Index" index or column); tables without row paths are returned as is.
+        """
+        if not self.row_prefixes:
+            return table
+        if hasattr(table, "take_rows"):  # FlatSheet
+            return table.take_rows(self.row_mask(table.row_labels))
+        if table.index.name == "Index":
+            labels = table.index
+        elif "Index" in table.columns:
+            labels = table["Index"]
+        else:
+            return table
+        mask = self.row_mask(labels.astype(str))
+        return table if mask.all() else table[mask]
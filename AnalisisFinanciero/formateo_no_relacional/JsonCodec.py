@@ -0,0 +1,354 @@
+import gzip
+import json
+import logging
+import lzma
+import struct
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack  # optional, faster binary payload
+except ImportError:  # pragma: no cover - stdlib fallback is always available
+    msgpack = None
+
+PathLike = Union[str, Path]
+
+GZIP_MAGIC = b"\x1f\x8b"
+LZMA_MAGIC = b"\xfd7zXZ\x00"
+KEYDICT_MAGIC = b"AFKD\x01"
+
+
+# ----------------- Text Codecs -----------------
+class JsonCodec:
+    """Pretty-printed UTF-8 JSON (indent=2). This is the historical output format."""
+
+    name = "pretty"
+    suffix = ".json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data.decode("utf-8"))
+
+    def dump(self, obj: Any, path: PathLike):
+        """Serialize obj and write it to path."""
+        Path(path).write_bytes(self.dumps(obj))
+
+    def load(self, path: PathLike) -> Any:
+        """Read path and deserialize it with this codec."""
+        return self.loads(Path(path).read_bytes())
+
+
+class CompactJsonCodec(JsonCodec):
+    """UTF-8 JSON without indentation or spaces after separators."""
+
+    name = "compact"
+    suffix = ".json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class GzipJsonCodec(CompactJsonCodec):
+    """Compact JSON wrapped in a gzip stream."""
+
+    name = "gzip"
+    suffix = ".json.gz"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def dumps(self, obj: Any) -> bytes:
+        # mtime=0 keeps the output byte-identical across runs
+        return gzip.compress(super().dumps(obj), compresslevel=self.level, mtime=0)
+
+    def loads(self, data: bytes) -> Any:
+        return super().loads(gzip.decompress(data))
+
+
+class LzmaJsonCodec(CompactJsonCodec):
+    """Compact JSON wrapped in an xz (LZMA2) stream."""
+
+    name = "lzma"
+    suffix = ".json.xz"
+
+    def __init__(self, preset: int = 6):
+        self.preset = preset
+
+    def dumps(self, obj: Any) -> bytes:
+        return lzma.compress(super().dumps(obj), format=lzma.FORMAT_XZ, preset=self.preset)
+
+    def loads(self, data: bytes) -> Any:
+        return super().loads(lzma.decompress(data))
+
+
+# ----------------- Binary Codec -----------------
+class KeyDictBinaryCodec(JsonCodec):
+    """
+    Binary encoding with a key dictionary.
+
+    Every distinct dict key is stored once in a table; the tree refers to keys
+    by index. The payload is msgpack when it is installed, otherwise a small
+    tagged stdlib format.
+
+    Layout:
+        KEYDICT_MAGIC | flavor (1 byte: 0=stdlib, 1=msgpack) | payload
+    """
+
+    name = "binary"
+    suffix = ".afkd"
+
+    FLAVOR_STDLIB = 0
+    FLAVOR_MSGPACK = 1
+
+    T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_LIST, T_DICT, T_BIGINT = range(9)
+
+    def __init__(self, use_msgpack: Optional[bool] = None):
+        self.use_msgpack = (msgpack is not None) if use_msgpack is None else use_msgpack
+        if self.use_msgpack and msgpack is None:
+            raise ImportError("msgpack is not installed; use use_msgpack=False")
+
+    # -- key table --
+    @staticmethod
+    def _collect_keys(obj: Any) -> List[str]:
+        """Collect distinct dict keys in first-seen order (iterative walk)."""
+        index: Dict[str, int] = {}
+        stack = [obj]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for k, v in node.items():
+                    if k not in index:
+                        index[k] = len(index)
+                    stack.append(v)
+            elif isinstance(node, list):
+                stack.extend(node)
+        return list(index)
+
+    def dumps(self, obj: Any) -> bytes:
+        keys = self._collect_keys(obj)
+        key_index = {k: i for i, k in enumerate(keys)}
+
+        if self.use_msgpack:
+            payload = msgpack.packb([keys, self._index_keys(obj, key_index)], use_bin_type=True)
+            return KEYDICT_MAGIC + bytes([self.FLAVOR_MSGPACK]) + payload
+
+        out = bytearray(KEYDICT_MAGIC)
+        out.append(self.FLAVOR_STDLIB)
+        self._write_varint(out, len(keys))
+        for k in keys:
+            raw = str(k).encode("utf-8")
+            self._write_varint(out, len(raw))
+            out += raw
+        self._encode(obj, key_index, out)
+        return bytes(out)
+
+    def loads(self, data: bytes) -> Any:
+        if not data.startswith(KEYDICT_MAGIC):
+            raise ValueError("Not a key-dictionary binary payload")
+        flavor = data[len(KEYDICT_MAGIC)]
+        body = memoryview(data)[len(KEYDICT_MAGIC) + 1:]
+
+        if flavor == self.FLAVOR_MSGPACK:
+            if msgpack is None:
+                raise ImportError("Payload was written with msgpack, which is not installed")
+            keys, tree = msgpack.unpackb(body, raw=False, strict_map_key=False)
+            return self._restore_keys(tree, keys)
+
+        pos = 0
+        n_keys, pos = self._read_varint(body, pos)
+        keys = []
+        for _ in range(n_keys):
+            n, pos = self._read_varint(body, pos)
+            keys.append(str(body[pos:pos + n], "utf-8"))
+            pos += n
+        value, _ = self._decode(body, pos, keys)
+        return value
+
+    # -- msgpack flavor helpers --
+    def _index_keys(self, obj: Any, key_index: Dict[str, int]) -> Any:
+        if isinstance(obj, dict):
+            return {key_index[k]: self._index_keys(v, key_index) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self._index_keys(v, key_index) for v in obj]
+        return obj
+
+    def _restore_keys(self, obj: Any, keys: List[str]) -> Any:
+        if isinstance(obj, dict):
+            return {keys[k]: self._restore_keys(v, keys) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self._restore_keys(v, keys) for v in obj]
+        return obj
+
+    # -- stdlib flavor helpers --
+    @staticmethod
+    def _write_varint(out: bytearray, n: int):
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    @staticmethod
+    def _read_varint(buf, pos: int):
+        shift = result = 0
+        while True:
+            b = buf[pos]
+            pos += 1
+            result |= (b & 0x7F) << shift
+            if b < 0x80:
+                return result, pos
+            shift += 7
+
+    def _encode(self, obj: Any, key_index: Dict[str, int], out: bytearray):
+        if obj is None:
+            out.append(self.T_NONE)
+        elif obj is True:
+            out.append(self.T_TRUE)
+        elif obj is False:
+            out.append(self.T_FALSE)
+        elif isinstance(obj, int):
+            if -(1 << 63) <= obj < (1 << 63):
+                out.append(self.T_INT)
+                self._write_varint(out, (obj << 1) ^ (obj >> 63))  # zigzag
+            else:
+                raw = str(obj).encode("ascii")
+                out.append(self.T_BIGINT)
+                self._write_varint(out, len(raw))
+                out += raw
+        elif isinstance(obj, float):
+            out.append(self.T_FLOAT)
+            out += struct.pack("<d", obj)
+        elif isinstance(obj, str):
+            raw = obj.encode("utf-8")
+            out.append(self.T_STR)
+            self._write_varint(out, len(raw))
+            out += raw
+        elif isinstance(obj, (list, tuple)):
+            out.append(self.T_LIST)
+            self._write_varint(out, len(obj))
+            for v in obj:
+                self._encode(v, key_index, out)
+        elif isinstance(obj, dict):
+            out.append(self.T_DICT)
+            self._write_varint(out, len(obj))
+            for k, v in obj.items():
+                self._write_varint(out, key_index[k])
+                self._encode(v, key_index, out)
+        else:
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _decode(self, buf, pos: int, keys: List[str]):
+        tag = buf[pos]
+        pos += 1
+        if tag == self.T_DICT:
+            n, pos = self._read_varint(buf, pos)
+            d = {}
+            for _ in range(n):
+                k, pos = self._read_varint(buf, pos)
+                d[keys[k]], pos = self._decode(buf, pos, keys)
+            return d, pos
+        if tag == self.T_STR:
+            n, pos = self._read_varint(buf, pos)
+            return str(buf[pos:pos + n], "utf-8"), pos + n
+        if tag == self.T_INT:
+            z, pos = self._read_varint(buf, pos)
+            return (z >> 1) ^ -(z & 1), pos
+        if tag == self.T_FLOAT:
+            return struct.unpack_from("<d", buf, pos)[0], pos + 8
+        if tag == self.T_LIST:
+            n, pos = self._read_varint(buf, pos)
+            items = []
+            for _ in range(n):
+                v, pos = self._decode(buf, pos, keys)
+                items.append(v)
+            return items, pos
+        if tag == self.T_NONE:
+            return None, pos
+        if tag == self.T_TRUE:
+            return True, pos
+        if tag == self.T_FALSE:
+            return False, pos
+        if tag == self.T_BIGINT:
+            n, pos = self._read_varint(buf, pos)
+            return int(str(buf[pos:pos + n], "ascii")), pos + n
+        raise ValueError(f"Unknown tag {tag} at offset {pos - 1}")
+
+
+# ----------------- Registry & Detection -----------------
+CODECS = {
+    "pretty": JsonCodec,
+    "compact": CompactJsonCodec,
+    "gzip": GzipJsonCodec,
+    "lzma": LzmaJsonCodec,
+    "binary": KeyDictBinaryCodec,
+}
+
+CODEC_SUFFIXES = sorted({c.suffix for c in CODECS.values()}, key=len, reverse=True)
+
+
+def get_codec(codec: Union[str, JsonCodec, None] = None) -> JsonCodec:
+    """Resolve a codec name (or instance) to a codec instance. None → 'pretty'."""
+    if codec is None:
+        return JsonCodec()
+    if isinstance(codec, JsonCodec):
+        return codec
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError(f"Unknown codec '{codec}'. Choose one of: {', '.join(CODECS)}")
+
+
+def detect_codec(data: bytes) -> JsonCodec:
+    """Pick the codec that produced data by looking at its leading bytes."""
+    if data.startswith(GZIP_MAGIC):
+        return GzipJsonCodec()
+    if data.startswith(LZMA_MAGIC):
+        return LzmaJsonCodec()
+    if data.startswith(KEYDICT_MAGIC):
+        return KeyDictBinaryCodec(use_msgpack=data[len(KEYDICT_MAGIC)] == KeyDictBinaryCodec.FLAVOR_MSGPACK)
+    return JsonCodec()
+
+
+def loads_any(data: bytes, raw: bool = False, base: Optional[PathLike] = None) -> Any:
+    """
+    Decode bytes written by any registered codec. Column-oriented documents
+    (ColumnarJson.py) come back as their nested tree unless raw=True. Content store
+    manifests (ContentStore.py) are resolved against `base`, the folder they were
+    read from; load_any() passes it.
+    """
+    obj = detect_codec(data).loads(data)
+    if isinstance(obj, dict) and base is not None:
+        from ContentStore import resolve_refs  # imports this module
+        obj = resolve_refs(obj, base)
+    elif isinstance(obj, dict) and obj.get("schema") == "cas":
+        raise ValueError("A content store manifest needs its location; read it with load_any(path)")
+    if not raw and isinstance(obj, dict) and obj.get("schema") == "columnar":
+        from ColumnarJson import is_columnar, columnar_to_tree  # imports this module
+        if is_columnar(obj):
+            return columnar_to_tree(obj)
+    return obj
+
+
+def load_any(path: PathLike, raw: bool = False) -> Any:
+    """Read a file written by any registered codec (see loads_any for `raw`)."""
+    return loads_any(Path(path).read_bytes(), raw, Path(path).parent)
+
+
+def is_codec_file(path: Path) -> bool:
+    """True if the file name ends with a suffix produced by one of the codecs."""
+    name = path.name.lower()
+    return any(name.endswith(s) for s in CODEC_SUFFIXES)
+
+
+def strip_codec_suffix(name: str) -> str:
+    """'a.json.gz' → 'a', 'a.afkd' → 'a', 'a.json' → 'a'."""
+    lower = name.lower()
+    for s in CODEC_SUFFIXES:
+        if lower.endswith(s):
+            return name[: -len(s)]
+    return name
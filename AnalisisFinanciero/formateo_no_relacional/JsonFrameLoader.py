@@ -0,0 +1,164 @@
+import logging
+from array import array
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Union
+import pandas as pd
+import numpy as np
+from utils import *
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, Path]
+
+
+# ----------------- Tree Walker -----------------
+class _ColumnBuilder:
+    """
+    Accumulates leaves of many trees straight into column arrays.
+
+    Every label (source, path segment, leaf key) is interned once into a shared
+    code table and leaf paths are appended to one flat int32 array; the per-level
+    code columns (-1 where a path is shorter) are cut from it with numpy at the
+    end and become categoricals without materializing per-row strings.
+    """
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.sources = array("i")
+        self.depths = array("i")
+        self.path_codes = array("i")  # paths of all leaves, concatenated
+        self.keys = array("i")
+        self.values: List[Any] = []
+
+    def intern(self, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.codes)
+        return code
+
+    def add_tree(self, tree: Any, source: str):
+        """Iterative depth-first walk; dict keys above a leaf are its path levels."""
+        if not isinstance(tree, dict):
+            return
+        codes = self.codes
+        src = self.intern(source)
+        sources, depths, path_codes = self.sources.append, self.depths.append, self.path_codes.extend
+        keys, values = self.keys.append, self.values.append
+        path: List[int] = []
+        stack = [iter(tree.items())]
+        while stack:
+            for k, v in stack[-1]:
+                code = codes.get(k)
+                if code is None:
+                    code = codes[k] = len(codes)
+                if isinstance(v, dict):
+                    path.append(code)
+                    stack.append(iter(v.items()))
+                    break
+                sources(src)
+                depths(len(path))
+                path_codes(path)
+                keys(code)
+                values(v)
+            else:
+                stack.pop()
+                if path:  # the finished dict's own key (the root has none)
+                    path.pop()
+
+    def level_codes(self) -> List[np.ndarray]:
+        """Split the concatenated paths into one code array per depth (-1 where absent)."""
+        depths = np.frombuffer(self.depths, dtype=np.int32)
+        flat = np.frombuffer(self.path_codes, dtype=np.int32)
+        starts = np.concatenate(([0], np.cumsum(depths)[:-1])) if len(depths) else depths
+        levels = []
+        for d in range(int(depths.max()) if len(depths) else 0):
+            codes = np.full(len(depths), -1, dtype=np.int32)
+            has = depths > d
+            codes[has] = flat[starts[has] + d]
+            levels.append(codes)
+        return levels
+
+    def frame(self) -> pd.DataFrame:
+        categories = pd.Index(list(self.codes), dtype=object)
+
+        def categorical(codes) -> pd.Categorical:
+            return pd.Categorical.from_codes(
+                np.asarray(codes, dtype=np.int32), categories=categories
+            ).remove_unused_categories()
+
+        columns = {"source": categorical(np.frombuffer(self.sources, dtype=np.int32))}
+        for depth, lvl in enumerate(self.level_codes()):
+            columns[f"level_{depth}"] = categorical(lvl)
+        columns["key"] = categorical(np.frombuffer(self.keys, dtype=np.int32))
+        columns["value"] = pd.Series(self.values, dtype=object if not self.values else None)
+        return pd.DataFrame(columns)
+
+
+# ----------------- Public API -----------------
+def is_bundle(data: Any) -> bool:
+    """True for bundle_json_files() output: every top-level key is a filing file stem."""
+    return (
+        isinstance(data, dict) and bool(data)
+        and all(isinstance(v, dict) and parse_filing_name(str(k).split("#")[0]) for k, v in data.items())
+    )
+
+
+def tree_to_frame(tree: Dict, source: str = "") -> pd.DataFrame:
+    """Long-format frame of a single WorkbookToJsonConverter tree."""
+    builder = _ColumnBuilder()
+    builder.add_tree(tree, source)
+    return builder.frame()
+
+
+def load_frame(inputs: Union[PathLike, Iterable[PathLike]], bundle: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Load JSON-stage outputs into one long-format DataFrame.
+
+    Args:
+        inputs: A file, a directory of ExcelToJSONBatchProcessor outputs (any codec),
+                a bundle written by bundle_json_files, or a list of those.
+        bundle: Treat files as bundles (True), single trees (False) or detect (None).
+
+    Returns:
+        DataFrame with columns source, level_0..level_N, key, value — one row per
+        leaf. source/level_*/key are categoricals; shallower paths have NaN in the
+        deeper levels. For bundles, source is the bundle key (the file stem).
+    """
+    if isinstance(inputs, (str, Path)):
+        inputs = [inputs]
+
+    files: List[Path] = []
+    for p in map(Path, inputs):
+        if p.is_dir():
+            files += sorted(
+                f for f in p.iterdir()
+                if f.is_file() and is_codec_file(f)
+                and not f.name.startswith(".") and not f.name.endswith("_summary.json")
+            )
+        else:
+            files.append(p)
+
+    builder = _ColumnBuilder()
+    for f in files:
+        data = load_any(f)
+        if bundle or (bundle is None and is_bundle(data)):
+            for source, tree in data.items():
+                builder.add_tree(tree, source)
+        else:
+            builder.add_tree(data, strip_codec_suffix(f.name))
+    return builder.frame()
+
+
+def with_filing_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add categorical nit/period/report columns parsed from `source` (NaN if it does not parse)."""
+    sources = df["source"].cat.categories
+    parsed = [parse_filing_name(str(s)) or {} for s in sources]
+    codes = df["source"].cat.codes
+    out = df.copy()
+    for field in ("nit", "period", "report"):
+        labels = pd.Series([p.get(field) for p in parsed], dtype=object)
+        out[field] = pd.Categorical(labels.to_numpy()[codes])
+    return out
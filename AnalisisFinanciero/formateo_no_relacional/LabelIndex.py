@@ -0,0 +1,277 @@
+import logging
+import math
+import pickle
+import re
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Set, Tuple
+import pandas as pd
+import numpy as np
+from utils import *
+from WorkbookToJsonConverter import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = ".label_index.pkl"
+INDEX_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent/case-normalized word tokens."""
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def trigrams(token: str) -> Set[str]:
+    """Character trigrams of a token, padded so short tokens and prefixes still match."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ----------------- Label Index -----------------
+class LabelIndex:
+    """
+    Inverted index over the row and column paths seen in the flattened filings.
+
+    Each distinct (report, kind, path) — kind is "row" or "col" — is one entry and
+    remembers the filings ("<NIT>_<period>") that contain it. Paths are indexed by
+    normalized word token; the token vocabulary is indexed by character trigram,
+    so a misspelled or partially typed query token is first resolved to similar
+    vocabulary tokens and then to paths through their postings. Only postings of
+    matching tokens are touched, which keeps lookups fast on large corpora.
+
+    Sources (flattened workbooks) are tracked by size/mtime: update() adds new
+    files, re-indexes changed ones and drops removed ones.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str, str]] = []          # id → (report, kind, path)
+        self.entry_ids: Dict[Tuple[str, str, str], int] = {}
+        self.entry_filings: List[Set[str]] = []                # id → filings containing it
+        self.postings: Dict[str, Set[int]] = defaultdict(set)  # token → entry ids
+        self.grams: Dict[str, Set[str]] = defaultdict(set)     # trigram → tokens
+        self.sources: Dict[str, Dict[str, Any]] = {}           # file name → {size, mtime, filing, entries}
+        self._posting_arrays: Dict[str, np.ndarray] = {}      # lookup caches, rebuilt lazily
+        self._columns: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    # -- building --
+    def _entry_id(self, key: Tuple[str, str, str]) -> int:
+        eid = self.entry_ids.get(key)
+        if eid is None:
+            eid = len(self.entries)
+            self.entries.append(key)
+            self.entry_ids[key] = eid
+            self.entry_filings.append(set())
+            for tok in set(tokenize(key[2])):
+                if tok not in self.postings:
+                    for g in trigrams(tok):
+                        self.grams[g].add(tok)
+                self.postings[tok].add(eid)
+                self._posting_arrays.pop(tok, None)
+            self._columns = None
+        return eid
+
+    def _posting_array(self, token: str) -> np.ndarray:
+        arr = self._posting_arrays.get(token)
+        if arr is None:
+            arr = self._posting_arrays[token] = np.fromiter(self.postings[token], dtype=np.int64)
+        return arr
+
+    def _entry_columns(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(report, kind) of every entry as arrays, for vectorized filtering."""
+        if self._columns is None:
+            self._columns = (
+                np.array([e[0] for e in self.entries], dtype=object),
+                np.array([e[1] for e in self.entries], dtype=object),
+            )
+        return self._columns
+
+    def add_filing(self, filing: str, report: str, row_paths: Iterable[str], col_paths: Iterable[str]) -> List[int]:
+        """Register the paths of one filing; returns the entry ids it touches."""
+        ids = []
+        for kind, paths in (("row", row_paths), ("col", col_paths)):
+            for p in dict.fromkeys(str(p) for p in paths):
+                eid = self._entry_id((report, kind, p))
+                self.entry_filings[eid].add(filing)
+                ids.append(eid)
+        return ids
+
+    def remove_filing(self, filing: str, entry_ids: Iterable[int]):
+        """Forget a filing. Entries stay in the vocabulary but no longer list it."""
+        for eid in entry_ids:
+            self.entry_filings[eid].discard(filing)
+
+    def add_workbook(self, file_path: Path, reader: Optional[WorkbookToJsonConverter] = None):
+        """Index every sheet of one flattened workbook named <NIT>_<YYYY-MM-DD>_<Report>..."""
+        file_path = Path(file_path)
+        info = parse_filing_name(file_path.name)
+        if info is None:
+            logger.warning(f"Skipping {file_path.name}: name does not match <NIT>_<YYYY-MM-DD>_<Report>")
+            return
+        reader = reader or WorkbookToJsonConverter()
+        filing = f"{info['nit']}_{info['period']}"
+
+        old = self.sources.pop(file_path.name, None)
+        if old:
+            self.remove_filing(old["filing"], old["entries"])
+
+        xl = pd.ExcelFile(file_path, engine="openpyxl")
+        entries = []
+        for sheet in xl.sheet_names:
+            df = reader.read_sheet(file_path, sheet, xl=xl)
+            rows = df.index if df.index.name == "Index" or "Index" not in df.columns else df["Index"]
+            cols = [c for c in df.columns if c != "Index"]
+            entries += self.add_filing(filing, info["report"], rows, cols)
+
+        st = file_path.stat()
+        self.sources[file_path.name] = {
+            "size": st.st_size, "mtime": st.st_mtime, "filing": filing, "entries": sorted(set(entries)),
+        }
+
+    def update(self, input_dir: Path) -> Dict[str, int]:
+        """Bring the index in line with a directory of flattened workbooks."""
+        files = {p.name: p for p in sorted(Path(input_dir).iterdir()) if p.is_file() and is_excel_file(p)}
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+        for name in list(self.sources):
+            if name not in files:
+                old = self.sources.pop(name)
+                self.remove_filing(old["filing"], old["entries"])
+                counts["removed"] += 1
+
+        reader = WorkbookToJsonConverter()
+        for name, path in files.items():
+            st = path.stat()
+            src = self.sources.get(name)
+            if src and src["size"] == st.st_size and src["mtime"] == st.st_mtime:
+                counts["unchanged"] += 1
+                continue
+            try:
+                self.add_workbook(path, reader)
+            except Exception as e:
+                logger.error(f"Failed to index {name}: {e}")
+                continue
+            counts["updated" if src else "added"] += 1
+        return counts
+
+    def add_store(self, db_path: Path):
+        """Index every filing of a SqliteCellStore database (no source tracking)."""
+        with sqlite3.connect(str(db_path)) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT nit, period, report, row_path, col_path FROM cells_v"
+            ).fetchall()
+        by_filing = defaultdict(lambda: (set(), set()))
+        for nit, period, report, r, c in rows:
+            key = (f"{nit}_{period}", report)
+            by_filing[key][0].add(r)
+            by_filing[key][1].add(c)
+        for (filing, report), (r, c) in by_filing.items():
+            self.add_filing(filing, report, sorted(r), sorted(c))
+
+    # -- persistence --
+    def save(self, path: Path):
+        state = {
+            "version": INDEX_VERSION, "entries": self.entries, "entry_filings": self.entry_filings,
+            "postings": dict(self.postings), "grams": dict(self.grams), "sources": self.sources,
+        }
+        with atomic_output(Path(path)) as tmp, open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: Path) -> "LabelIndex":
+        """Load a saved index; a missing or outdated file gives an empty index."""
+        index = cls()
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return index
+        if state.get("version") != INDEX_VERSION:
+            return index
+        index.entries = state["entries"]
+        index.entry_ids = {key: i for i, key in enumerate(index.entries)}
+        index.entry_filings = state["entry_filings"]
+        index.postings = defaultdict(set, state["postings"])
+        index.grams = defaultdict(set, state["grams"])
+        index.sources = state["sources"]
+        return index
+
+    # -- lookup --
+    def similar_tokens(self, token: str, min_similarity: float = 0.4) -> Dict[str, float]:
+        """Vocabulary tokens resembling `token`, scored by trigram Jaccard similarity."""
+        if token in self.postings:
+            return {token: 1.0}
+        q = trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for g in q:
+            for tok in self.grams.get(g, ()):
+                shared[tok] += 1
+        out = {}
+        for tok, n in shared.items():
+            sim = n / (len(q) + len(tok) + 1 - n)  # len(trigrams(tok)) == len(tok) + 1
+            if sim >= min_similarity:
+                out[tok] = sim
+        return out
+
+    def search(self, query: str, report: Optional[str] = None, kind: Optional[str] = None,
+               limit: int = 10, min_similarity: float = 0.4) -> List[Dict[str, Any]]:
+        """
+        Ranked fuzzy lookup. Each query token contributes idf × similarity of its best
+        matching token in the path; paths are ranked by total score, then by how few
+        extra tokens they carry, then by how many filings contain them.
+        """
+        q_tokens = list(dict.fromkeys(tokenize(query)))
+        if not q_tokens:
+            return []
+        n_entries = len(self.entries)
+        if not n_entries:
+            return []
+        scores = np.zeros(n_entries)
+
+        for qt in q_tokens:
+            best = np.zeros(n_entries)
+            for tok, sim in self.similar_tokens(qt, min_similarity).items():
+                posting = self._posting_array(tok)
+                weight = sim * math.log(1 + n_entries / len(posting))
+                best[posting] = np.maximum(best[posting], weight)  # ids are unique within a posting
+            scores += best
+
+        if report or kind:
+            reports, kinds = self._entry_columns()
+            if report:
+                scores[reports != report] = 0.0
+            if kind:
+                scores[kinds != kind] = 0.0
+
+        hits = np.flatnonzero(scores)
+        shortlist = min(len(hits), limit * 20)
+        if shortlist < len(hits):
+            hits = hits[np.argpartition(-scores[hits], shortlist - 1)[:shortlist]]
+
+        # Re-rank the shortlist with the (costlier) phrase and length checks
+        phrase = " ".join(q_tokens)
+        ranked = []
+        for eid in hits.tolist():
+            if not self.entry_filings[eid]:
+                continue
+            score = float(scores[eid])
+            norm = " ".join(tokenize(self.entries[eid][2]))
+            if phrase in norm:
+                score *= 1.5
+            ranked.append((-score, len(norm), -len(self.entry_filings[eid]), eid))
+        ranked.sort()
+
+        return [
+            {
+                "report": self.entries[eid][0], "kind": self.entries[eid][1], "path": self.entries[eid][2],
+                "score": round(-neg, 4), "filings": sorted(self.entry_filings[eid]),
+            }
+            for neg, _, _, eid in ranked[:limit]
+        ]
+
+    def __len__(self):
+        return len(self.entries)
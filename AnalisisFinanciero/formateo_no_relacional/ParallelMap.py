@@ -0,0 +1,39 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# ----------------- Parallel Map -----------------
+# Shared by the three stages: their utils.py re-export these names.
+def _call_captured(fn, *args):
+    """Run fn(*args) and return (result, None), or (None, exception) if it raised."""
+    try:
+        return fn(*args), None
+    except Exception as e:
+        return None, e
+
+
+def make_executor(workers, kind="thread"):
+    """Return a thread/process pool for workers > 1, or None for sequential mode."""
+    if not workers or workers <= 1:
+        return None
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor kind '{kind}' (use 'thread' or 'process')")
+
+
+def ordered_map(fn, *iterables, executor=None):
+    """
+    Apply fn across the iterables and return [(result, error), ...] in input order.
+    Exceptions are captured per item so one bad sheet does not abort the rest.
+    Runs sequentially when executor is None.
+    """
+    if executor is None:
+        return [_call_captured(fn, *args) for args in zip(*iterables)]
+    return list(executor.map(partial(_call_captured, fn), *iterables))
@@ -0,0 +1,48 @@
+import json
+from typing import Dict, List, Any, Optional
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+
+# ----------------- Query Client -----------------
+class QueryClient:
+    """
+    Thin client for QueryServer (standard library only, safe to import from a notebook).
+
+    Example:
+        client = QueryClient()
+        client.filing("890903939_2024-12-31_Caratula_traduccion_flattened", ["Carátula", "Datos básicos"])
+        client.across(["Estado de cambios en el patrimonio [sinopsis]"], report="Estado_de_cambios_en_el_patrimonio")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, timeout: float = 60.0):
+        self.base = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _get(self, endpoint: str, **params) -> Any:
+        query = urlencode({k: v for k, v in params.items() if v is not None}, doseq=True)
+        try:
+            with urlopen(f"{self.base}{endpoint}?{query}", timeout=self.timeout) as resp:
+                return json.loads(resp.read().decode("utf-8"))
+        except HTTPError as e:
+            message = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+            if e.code == 404:
+                raise KeyError(message) from None
+            raise RuntimeError(f"{e.code}: {message}") from None
+
+    def filings(self, report: Optional[str] = None, nit: Optional[str] = None,
+                period: Optional[str] = None) -> List[Dict[str, str]]:
+        return self._get("/filings", report=report, nit=nit, period=period)
+
+    def filing(self, name: str, path: Optional[List[str]] = None) -> Any:
+        """Subtree of one filing (KeyError if the filing or path does not exist)."""
+        return self._get("/filing", name=name, path=path or [])
+
+    def across(self, path: List[str], report: Optional[str] = None, nit: Optional[str] = None,
+               period: Optional[str] = None) -> Dict[str, Any]:
+        """{filing: subtree} for every matching filing that has `path`."""
+        return self._get("/across", path=path, report=report, nit=nit, period=period)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._get("/stats")
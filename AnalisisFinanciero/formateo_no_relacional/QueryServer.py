@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+from utils import *
+from JsonCodec import *
+from TreeCache import TreeCache
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class QueryError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def descend(tree: Any, path: List[str]) -> Any:
+    """Subtree at `path` (list of keys), or _MISSING."""
+    node = tree
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return _MISSING
+        node = node[key]
+    return node
+
+
+# ----------------- Query Server -----------------
+class QueryServer:
+    """
+    Local HTTP/JSON service over a directory of JSON-stage outputs (any codec).
+
+    Trees are parsed on first use and kept in a memory-bounded TreeCache shared by
+    all requests, so repeated queries from notebooks and scripts skip parsing and
+    the corpus lives in one process. Files are parsed in a small thread pool while
+    the asyncio loop keeps serving other connections.
+
+    Endpoints (GET, JSON responses; `path` is repeated once per key level):
+        /filings?report=&nit=&period=            list of filings
+        /filing?name=<stem>&path=..&path=..      subtree of one filing
+        /across?report=&nit=&period=&path=..     {stem: subtree} for every matching filing
+        /stats                                   cache counters
+    """
+
+    def __init__(self, json_dir: Path, cache_bytes: int = 512 * 2**20, load_workers: int = 4):
+        self.json_dir = Path(json_dir)
+        self.cache = TreeCache(max_bytes=cache_bytes)
+        self.pool = ThreadPoolExecutor(max_workers=load_workers)
+        self._listing: Dict[str, Dict[str, Any]] = {}
+        self._listing_mtime: Optional[int] = None
+
+    # -- corpus listing --
+    def filings(self) -> Dict[str, Dict[str, Any]]:
+        """{stem: {file, nit, period, report}}, rescanned when the directory changes."""
+        mtime = self.json_dir.stat().st_mtime_ns
+        if mtime != self._listing_mtime:
+            listing = {}
+            for f in sorted(self.json_dir.iterdir()):
+                if not f.is_file() or not is_codec_file(f) or f.name.startswith(".") or f.name.endswith("_summary.json"):
+                    continue
+                stem = strip_codec_suffix(f.name)
+                listing[stem] = {"file": f, **(parse_filing_name(stem) or {})}
+            self._listing, self._listing_mtime = listing, mtime
+        return self._listing
+
+    def _select(self, params: Dict[str, List[str]]) -> List[str]:
+        wanted = {k: params[k][0] for k in ("report", "nit", "period") if k in params}
+        return [s for s, info in self.filings().items() if all(info.get(k) == v for k, v in wanted.items())]
+
+    async def _tree(self, stem: str) -> Any:
+        info = self.filings().get(stem)
+        if info is None:
+            raise QueryError(404, f"Unknown filing: {stem}")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, self.cache.get, info["file"])
+
+    # -- handlers --
+    async def handle_filings(self, params):
+        return [
+            {"name": s, **{k: v for k, v in self.filings()[s].items() if k != "file"}}
+            for s in self._select(params)
+        ]
+
+    async def handle_filing(self, params):
+        if "name" not in params:
+            raise QueryError(400, "Missing 'name'")
+        node = descend(await self._tree(params["name"][0]), params.get("path", []))
+        if node is _MISSING:
+            raise QueryError(404, "Path not found")
+        return node
+
+    async def handle_across(self, params):
+        if "path" not in params:
+            raise QueryError(400, "Missing 'path'")
+        stems = self._select(params)
+        trees = await asyncio.gather(*(self._tree(s) for s in stems))
+        out = {}
+        for stem, tree in zip(stems, trees):
+            node = descend(tree, params["path"])
+            if node is not _MISSING:
+                out[stem] = node
+        return out
+
+    async def handle_stats(self, params):
+        return {"filings": len(self.filings()), **self.cache.stats()}
+
+    ROUTES = {
+        "/filings": handle_filings,
+        "/filing": handle_filing,
+        "/across": handle_across,
+        "/stats": handle_stats,
+    }
+
+    # -- HTTP plumbing --
+    async def dispatch(self, method: str, target: str) -> Tuple[int, Any]:
+        if method != "GET":
+            return 405, {"error": "Only GET is supported"}
+        url = urlsplit(target)
+        handler = self.ROUTES.get(url.path)
+        if handler is None:
+            return 404, {"error": f"Unknown endpoint: {url.path}"}
+        try:
+            return 200, await handler(self, parse_qs(url.query, keep_blank_values=True))
+        except QueryError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"Query failed: {target}")
+            return 500, {"error": str(e)}
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # headers are not needed
+            if len(request_line) < 2:
+                return
+            status, payload = await self.dispatch(request_line[0], request_line[1])
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        logger.info(f"Serving {self.json_dir} on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown()
@@ -0,0 +1,291 @@
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a tiny sheet up to a pathological workbook
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+@contextmanager
+def stage_timer(timings: Dict[str, float], stage: str):
+    """Add the wall time of the block to timings[stage] (seconds)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t0
+
+
+def _fmt_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s" if seconds >= 60 else f"{seconds}s"
+
+
+def _fmt_rate(rate: float) -> str:
+    if rate >= 1e6:
+        return f"{rate / 1e6:.1f}M"
+    return f"{rate / 1e3:.1f}k" if rate >= 1e3 else f"{rate:.1f}"
+
+
+# ----------------- Histogram -----------------
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout (fixed buckets, O(log b) observe)."""
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 4),
+        }
+
+    def prometheus(self, name: str, labels: str = "") -> List[str]:
+        sep = "," if labels else ""
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        tag = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{tag} {self.sum:.6f}")
+        lines.append(f"{name}_count{tag} {self.count}")
+        return lines
+
+
+# ----------------- Run Metrics -----------------
+class RunMetrics:
+    """
+    Counters and latency histograms for one batch run, exported while it runs.
+
+    The batch loop calls observe_file() once per finished file with its summary;
+    summaries may carry "stages" ({stage: seconds}, see stage_timer) and "cells".
+    Nothing runs in the background: every `interval` seconds observe_file() also
+    rewrites the Prometheus textfile (<metrics_dir>/<name>.prom, for the node
+    exporter's textfile collector) and a JSON snapshot (<name>.json), and refreshes
+    the progress line. Per-file cost is a few dict updates and bisects.
+    """
+
+    def __init__(self, name: str, total_files: int = 0, metrics_dir: Optional[Path] = None,
+                 interval: float = 10.0, progress: bool = False):
+        self.name = name
+        self.prefix = f"analisis_{name}"
+        self.total_files = total_files
+        self.metrics_dir = Path(metrics_dir) if metrics_dir else None
+        self.interval = interval
+        self.progress = progress
+        self.lock = threading.Lock()
+
+        self.files_ok = 0
+        self.files_failed = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.cells = 0
+        self.file_seconds = Histogram()
+        self.stage_seconds: Dict[str, Histogram] = {}
+
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._last_export = self._t0
+        self._tty = sys.stderr.isatty()
+        if self.metrics_dir:
+            self.metrics_dir.mkdir(parents=True, exist_ok=True)
+
+    # -- recording --
+    def observe_file(self, input_path: Path, summary: Optional[Dict[str, Any]], error: Optional[BaseException],
+                     elapsed_s: Optional[float], output_path: Optional[Path] = None):
+        """Record one finished file (failed if error is set or the summary says so)."""
+        failed = error is not None or summary is None or summary.get("status") == "failed"
+        with self.lock:
+            if failed:
+                self.files_failed += 1
+            else:
+                self.files_ok += 1
+            if elapsed_s is not None:
+                self.file_seconds.observe(elapsed_s)
+            self.bytes_read += _file_size(input_path)
+            output_path = output_path or (summary or {}).get("output")
+            if not failed and output_path:
+                self.bytes_written += _file_size(Path(output_path))
+            for stage, seconds in ((summary or {}).get("stages") or {}).items():
+                hist = self.stage_seconds.get(stage)
+                if hist is None:
+                    hist = self.stage_seconds[stage] = Histogram()
+                hist.observe(seconds)
+            self.cells += int((summary or {}).get("cells") or 0)
+        self.tick()
+
+    def tick(self, force: bool = False):
+        """Export and refresh the progress line if `interval` has elapsed (or force=True)."""
+        now = time.perf_counter()
+        if not force and now - self._last_export < self.interval:
+            if self.progress and self._tty:
+                self._print_progress()  # cheap; keeps the line live on a terminal
+            return
+        self._last_export = now
+        self.export()
+        if self.progress:
+            self._print_progress()
+
+    # -- derived values --
+    @property
+    def files_done(self) -> int:
+        return self.files_ok + self.files_failed
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            elapsed = time.perf_counter() - self._t0
+            done = self.files_done
+            remaining = max(0, self.total_files - done)
+            files_per_s = done / elapsed if elapsed > 0 else 0.0
+            return {
+                "run": self.name,
+                "started": self.started,
+                "updated": time.time(),
+                "elapsed_s": round(elapsed, 3),
+                "files_total": self.total_files,
+                "files_ok": self.files_ok,
+                "files_failed": self.files_failed,
+                "queue_depth": remaining,
+                "failure_rate": round(self.files_failed / done, 4) if done else 0.0,
+                "files_per_s": round(files_per_s, 4),
+                "cells": self.cells,
+                "cells_per_s": round(self.cells / elapsed, 1) if elapsed > 0 else 0.0,
+                "bytes_read": self.bytes_read,
+                "bytes_written": self.bytes_written,
+                "eta_s": round(remaining / files_per_s, 1) if files_per_s > 0 else None,
+                "file_seconds": self.file_seconds.to_dict(),
+                "stage_seconds": {k: h.to_dict() for k, h in sorted(self.stage_seconds.items())},
+            }
+
+    def progress_line(self, snap: Optional[Dict[str, Any]] = None) -> str:
+        s = snap or self.snapshot()
+        total = s["files_total"] or 1
+        done = s["files_ok"] + s["files_failed"]
+        return (
+            f"[{done}/{s['files_total']}] {100 * done / total:5.1f}% | "
+            f"{s['files_per_s']:.2f} files/s | {_fmt_rate(s['cells_per_s'])} cells/s | "
+            f"{s['files_failed']} failed | ETA {_fmt_duration(s['eta_s'])}"
+        )
+
+    def _print_progress(self):
+        line = self.progress_line()
+        if self._tty:
+            sys.stderr.write("\r" + line.ljust(80))
+            sys.stderr.flush()
+        else:
+            logger.info(line)
+
+    # -- export --
+    def prometheus(self, snap: Optional[Dict[str, Any]] = None) -> str:
+        s = snap or self.snapshot()
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_files_total Files finished, by status.",
+            f"# TYPE {p}_files_total counter",
+            f'{p}_files_total{{status="ok"}} {s["files_ok"]}',
+            f'{p}_files_total{{status="failed"}} {s["files_failed"]}',
+            f"# TYPE {p}_files_planned gauge",
+            f"{p}_files_planned {s['files_total']}",
+            f"# TYPE {p}_queue_depth gauge",
+            f"{p}_queue_depth {s['queue_depth']}",
+            f"# TYPE {p}_cells_total counter",
+            f"{p}_cells_total {s['cells']}",
+            f"# TYPE {p}_bytes_read_total counter",
+            f"{p}_bytes_read_total {s['bytes_read']}",
+            f"# TYPE {p}_bytes_written_total counter",
+            f"{p}_bytes_written_total {s['bytes_written']}",
+            f"# TYPE {p}_files_per_second gauge",
+            f"{p}_files_per_second {s['files_per_s']}",
+            f"# TYPE {p}_cells_per_second gauge",
+            f"{p}_cells_per_second {s['cells_per_s']}",
+            f"# TYPE {p}_eta_seconds gauge",
+            f"{p}_eta_seconds {s['eta_s'] if s['eta_s'] is not None else 'NaN'}",
+            f"# TYPE {p}_last_update_timestamp_seconds gauge",
+            f"{p}_last_update_timestamp_seconds {s['updated']:.3f}",
+            f"# HELP {p}_file_seconds Wall time per file.",
+            f"# TYPE {p}_file_seconds histogram",
+        ]
+        with self.lock:
+            lines += self.file_seconds.prometheus(f"{p}_file_seconds")
+            if self.stage_seconds:
+                lines += [f"# HELP {p}_stage_seconds Wall time per file and stage.",
+                          f"# TYPE {p}_stage_seconds histogram"]
+                for stage, hist in sorted(self.stage_seconds.items()):
+                    lines += hist.prometheus(f"{p}_stage_seconds", f'stage="{stage}"')
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """Rewrite <name>.prom and <name>.json atomically (no-op without metrics_dir)."""
+        if not self.metrics_dir:
+            return
+        snap = self.snapshot()
+        try:
+            self._replace(self.metrics_dir / f"{self.name}.prom", self.prometheus(snap))
+            self._replace(self.metrics_dir / f"{self.name}.json", json.dumps(snap, indent=2))
+        except OSError as e:
+            logger.warning(f"Could not export metrics to {self.metrics_dir}: {e}")
+
+    @staticmethod
+    def _replace(path: Path, text: str):
+        # Hidden .tmp name: the textfile collector reads every *.prom, so readers must
+        # only ever see complete files
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def close(self):
+        """Final export; ends the progress line."""
+        self.tick(force=True)
+        if self.progress and self._tty:
+            sys.stderr.write("\n")
+            sys.stderr.flush()
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return Path(path).stat().st_size
+    except (OSError, TypeError):
+        return 0
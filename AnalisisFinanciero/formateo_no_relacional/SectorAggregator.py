@@ -0,0 +1,329 @@
+import logging
+import math
+import re
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+import pandas as pd
+from utils import *
+from JsonCodec import *
+from FilingSelection import FilingSelection
+from TimeSeriesStore import iter_numeric_leaves, CURRENT
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+CIIU_RE = re.compile(r"^\s*(?P<section>[A-U])\s*(?P<code>\d{4})\b\s*-?\s*(?P<name>.*)$")
+# Sector key for each level of the CIIU Rev. 4 A.C. hierarchy, from section letter + 4-digit class
+SECTOR_LEVELS = {
+    "section": lambda s, c: s,
+    "division": lambda s, c: f"{s}{c[:2]}",
+    "group": lambda s, c: f"{s}{c[:3]}",
+    "class": lambda s, c: f"{s}{c}",
+}
+UNKNOWN_SECTOR = "unknown"
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+
+Group = Tuple[str, str, Optional[str], List[str]]  # nit, period, carátula file, line-item files
+PartialKey = Tuple[str, str, str, str]  # sector, period, report, item path
+
+
+# ----------------- Mergeable Statistics -----------------
+class QuantileSketch:
+    """
+    DDSketch: values fall into logarithmic buckets (gamma = (1+a)/(1-a)), so every
+    quantile is returned within relative error `alpha`. Memory grows with the log
+    of the value range, not with the count, and two sketches merge exactly by
+    adding bucket counts — partial sketches from any number of workers combine
+    into the sketch of the whole corpus.
+    """
+
+    __slots__ = ("alpha", "log_gamma", "pos", "neg", "zeros", "count")
+    MIN_VALUE = 1e-9  # magnitudes below this count as zero
+
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self.log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.pos: Dict[int, int] = {}
+        self.neg: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, x: float):
+        self.count += 1
+        if abs(x) < self.MIN_VALUE:
+            self.zeros += 1
+            return
+        store = self.pos if x > 0 else self.neg
+        k = math.ceil(math.log(abs(x)) / self.log_gamma)
+        store[k] = store.get(k, 0) + 1
+
+    def merge(self, other: "QuantileSketch"):
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for mine, theirs in ((self.pos, other.pos), (self.neg, other.neg)):
+            for k, n in theirs.items():
+                mine[k] = mine.get(k, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, k: int) -> float:
+        # Midpoint (in relative terms) of bucket (gamma^(k-1), gamma^k]
+        return 2 * math.exp(k * self.log_gamma) / (1 + math.exp(self.log_gamma))
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for k in sorted(self.neg, reverse=True):  # most negative first
+            seen += self.neg[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.pos):
+            seen += self.pos[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.pos)) if self.pos else 0.0
+
+
+class Aggregate:
+    """count/sum/mean/variance (Welford, merged with Chan's formula), min/max and a quantile sketch."""
+
+    __slots__ = ("count", "total", "mean", "m2", "min", "max", "sketch")
+
+    def __init__(self, alpha: float = 0.01):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch(alpha)
+
+    def add(self, x: float):
+        self.count += 1
+        self.total += x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        self.sketch.add(x)
+
+    def merge(self, other: "Aggregate"):
+        if not other.count:
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.mean += delta * other.count / n
+        self.count = n
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        out = {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean if self.count else None,
+            "std": math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+        for q in quantiles:
+            # A single value is exact; otherwise bucket midpoints are kept inside the observed range
+            value = self.min if self.count == 1 else self.sketch.quantile(q)
+            if value is not None:
+                value = min(max(value, self.min), self.max)
+            out[f"p{round(q * 100):02d}"] = value
+        return out
+
+
+class PartialAggregates:
+    """Aggregates keyed by (sector, period, report, item), plus the companies behind each sector/period."""
+
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self.cells: Dict[PartialKey, Aggregate] = {}
+        self.companies: Dict[Tuple[str, str], set] = {}
+        self.sector_names: Dict[str, str] = {}
+        self.filings = 0
+        self.failed: List[str] = []
+
+    def add(self, key: PartialKey, value: float):
+        agg = self.cells.get(key)
+        if agg is None:
+            agg = self.cells[key] = Aggregate(self.alpha)
+        agg.add(value)
+
+    def merge(self, other: "PartialAggregates"):
+        for key, agg in other.cells.items():
+            mine = self.cells.get(key)
+            if mine is None:
+                self.cells[key] = agg
+            else:
+                mine.merge(agg)
+        for key, nits in other.companies.items():
+            self.companies.setdefault(key, set()).update(nits)
+        self.sector_names.update(other.sector_names)
+        self.filings += other.filings
+        self.failed += other.failed
+
+
+# ----------------- Map Step -----------------
+def find_ciiu(tree: Any) -> Optional[Tuple[str, str, str]]:
+    """
+    (section letter, 4-digit class, description) from the first CIIU-coded text leaf
+    under a key mentioning CIIU (e.g. "C (CIIU)") of a Carátula tree.
+    """
+    stack = [(False, iter(tree.items()))] if isinstance(tree, dict) else []
+    while stack:
+        under_ciiu, items = stack[-1]
+        for k, v in items:
+            if isinstance(v, dict):
+                stack.append((under_ciiu or "ciiu" in k.lower(), iter(v.items())))
+                break
+            if isinstance(v, str) and (under_ciiu or "ciiu" in k.lower()):
+                m = CIIU_RE.match(v)
+                if m:
+                    return m["section"], m["code"], m["name"].strip()
+        else:
+            stack.pop()
+    return None
+
+
+def sector_of(ciiu: Optional[Tuple[str, str, str]], level: str) -> str:
+    return SECTOR_LEVELS[level](ciiu[0], ciiu[1]) if ciiu else UNKNOWN_SECTOR
+
+
+def map_groups(groups: List[Group], items: FilingSelection, level: str, alpha: float) -> PartialAggregates:
+    """
+    Map + combine for a chunk of (nit, period) groups: CIIU from the carátula, then
+    every selected current-period numeric leaf of the group's other filings.
+    Runs in a worker process; only the combined partial travels back.
+    """
+    partial = PartialAggregates(alpha)
+    for nit, period, caratula, files in groups:
+        ciiu = None
+        if caratula is not None:
+            try:
+                ciiu = find_ciiu(load_any(caratula))
+            except Exception as e:
+                partial.failed.append(f"{Path(caratula).name}: {e}")
+        sector = sector_of(ciiu, level)
+        if ciiu and level == "class":
+            partial.sector_names[sector] = ciiu[2]
+        partial.companies.setdefault((sector, period), set()).add(nit)
+        for f in files:
+            try:
+                tree = load_any(f)
+            except Exception as e:
+                partial.failed.append(f"{Path(f).name}: {e}")
+                continue
+            report = (parse_filing_name(Path(f).name) or {}).get("report", strip_codec_suffix(Path(f).name))
+            for path, role, value in iter_numeric_leaves(tree):
+                if role != CURRENT:
+                    continue
+                item = ".".join(path)
+                if items.accepts_row(item):
+                    partial.add((sector, period, report, item), value)
+            partial.filings += 1
+    return partial
+
+
+# ----------------- Sector Aggregator -----------------
+class SectorAggregator:
+    """
+    Sector × period benchmarks over a directory of JSON-stage outputs, in one pass.
+
+    Filings are grouped by company and period; the group's Carátula gives the CIIU
+    sector (at `level`: section, division, group or class) and its other filings the
+    line items. Groups are split into chunks that worker processes map and combine
+    into PartialAggregates; the parent merges partials as they finish, so no process
+    ever holds more than one tree at a time and the result does not depend on how
+    the work was split (quantiles to within `alpha` relative error).
+    """
+
+    def __init__(self, level: str = "class", reports: Optional[List[str]] = None, nits: Optional[List[str]] = None,
+                 periods: Optional[List[str]] = None, items: Optional[List[str]] = None,
+                 workers: int = 1, alpha: float = 0.01):
+        if level not in SECTOR_LEVELS:
+            raise ValueError(f"Unknown sector level '{level}'. Available: {', '.join(SECTOR_LEVELS)}")
+        self.level = level
+        self.selection = FilingSelection(reports, nits, periods)
+        # The carátula is read whatever the report filter says; NIT/period filters apply to it too
+        self.caratula_selection = FilingSelection(None, nits, periods)
+        self.items = FilingSelection(row_prefixes=items)
+        self.workers = workers
+        self.alpha = alpha
+
+    @staticmethod
+    def _is_caratula(report: str) -> bool:
+        return normalize_text(report).startswith("caratula")
+
+    def groups(self, json_dir: Path) -> List[Group]:
+        """(nit, period, carátula, line-item files) from file names only; nothing is opened."""
+        by_filing: Dict[Tuple[str, str], List[Any]] = {}
+        for f in sorted(Path(json_dir).iterdir()):
+            if not f.is_file() or not is_codec_file(f) or f.name.startswith(".") or f.name.endswith("_summary.json"):
+                continue
+            info = parse_filing_name(strip_codec_suffix(f.name))
+            if info is None:
+                continue
+            caratula = self._is_caratula(info["report"])
+            if not (self.caratula_selection if caratula else self.selection).accepts_file(f):
+                continue
+            group = by_filing.setdefault((info["nit"], info["period"]), [None, []])
+            if caratula:
+                group[0] = str(f)
+            else:
+                group[1].append(str(f))
+        return [(nit, period, c, files) for (nit, period), (c, files) in sorted(by_filing.items()) if files]
+
+    def run(self, json_dir: Path) -> PartialAggregates:
+        groups = self.groups(json_dir)
+        logger.info(f"Aggregating {sum(len(g[3]) for g in groups)} filing(s) of {len(groups)} company-period(s)")
+        result = PartialAggregates(self.alpha)
+        executor = make_executor(self.workers, "process")
+        if executor is None:
+            result.merge(map_groups(groups, self.items, self.level, self.alpha))
+        else:
+            # A few chunks per worker keeps them busy when groups differ in size
+            n_chunks = min(len(groups), self.workers * 4) or 1
+            chunks = [groups[i::n_chunks] for i in range(n_chunks)]
+            with executor:
+                futures = [executor.submit(map_groups, c, self.items, self.level, self.alpha) for c in chunks if c]
+                for fut in as_completed(futures):
+                    result.merge(fut.result())
+        for msg in result.failed:
+            logger.error(f"Could not read {msg}")
+        return result
+
+    # -- tables --
+    @staticmethod
+    def table(result: PartialAggregates, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> pd.DataFrame:
+        """Long table: one row per sector, period, report and item, with every statistic."""
+        rows = [
+            {"sector": sector, "sector_name": result.sector_names.get(sector, ""), "period": period,
+             "report": report, "item": item, "companies": len(result.companies.get((sector, period), ())),
+             **agg.to_dict(quantiles)}
+            for (sector, period, report, item), agg in result.cells.items()
+        ]
+        columns = ["sector", "sector_name", "period", "report", "item", "companies"]
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame(rows).sort_values(columns[:5], kind="stable").reset_index(drop=True)
+
+    @staticmethod
+    def pivot(table: pd.DataFrame, stat: str = "p50") -> pd.DataFrame:
+        """One statistic as a sector × period table per report/item (rows: report, item, sector)."""
+        if stat not in table.columns:
+            raise ValueError(f"Unknown statistic '{stat}'. Available: {', '.join(table.columns[6:])}")
+        return table.pivot_table(index=["report", "item", "sector"], columns="period", values=stat, aggfunc="first")
@@ -18,46 +18,51 @@ logger = logging.getLogger(__name__)
 class SheetToJsonConverter:
     """Convert a single flattened DataFrame to a nested dictionary."""
 
-    def convert(self, df: pd.DataFrame) -> Dict:
+    @staticmethod
+    def sheet_arrays(df):
+        """(row labels, column labels, value matrix) of a DataFrame or FlatSheet."""
+        if isinstance(df, pd.DataFrame):
+            # Ensure index is "Index"
+            if df.index.name != "Index":
+                if "Index" in df.columns:
+                    df = df.set_index("Index")
+                else:
+                    df = df.copy()
+                    df.index = pd.Index([f"row_{i}" for i in range(len(df))], name="Index")
+            return df.index, df.columns, df.to_numpy()
+        return df.row_labels, df.col_labels, df.values
+
+    def convert(self, df) -> Dict:
         """
         Convert a flattened sheet (with hierarchical row/column paths) to nested dict.
 
+        Accepts a DataFrame or a FlatSheet from the flattening stage (read through its
+        label arrays and value matrix, without building a DataFrame).
+
         Rules:
           - Index index (named "Index") becomes outer path.
           - Column names become inner path.
           - Non-null values are written to nested path.
           - All-null rows still create an empty branch.
         """
-        # Ensure index is "Index"
-        if df.index.name != "Index":
-            if "Index" in df.columns:
-                df = df.set_index("Index")
-            else:
-                df = df.copy()
-                df.index = pd.Index([f"row_{i}" for i in range(len(df))], name="Index")
+        row_labels, col_labels, values = self.sheet_arrays(df)
 
-        # Normalize column names
-        df.columns = [str(c) for c in df.columns]
+        # Column paths are the same for every row; split them once
+        col_paths = [split_path(str(c)) or ["value"] for c in col_labels]  # "value": generic key, avoids clobbering
 
         result = {}
 
-        for row_label, row in df.iterrows():
+        for i, row_label in enumerate(row_labels):
             row_path = split_path(row_label)
             row_branch = (
                 NestedDictBuilder.ensure_path(result, row_path)
                 if row_path else result
             )
 
-            for col_name, val in row.items():
+            for col_path, val in zip(col_paths, values[i]):
                 safe_val = json_safe_scalar(val)
                 if safe_val is None:
                     continue  # Skip nulls
-
-                col_path = split_path(col_name)
-                if not col_path:
-                    # Fallback: store under a generic key to avoid clobbering
-                    NestedDictBuilder.set_value(row_branch, ["value"], safe_val)
-                else:
-                    NestedDictBuilder.set_value(row_branch, col_path, safe_val)
+                NestedDictBuilder.set_value(row_branch, col_path, safe_val)
 
         return result
@@ -0,0 +1,244 @@
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+import pandas as pd
+import numpy as np
+from utils import *
+from WorkbookToJsonConverter import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS paths (
+    id    INTEGER PRIMARY KEY,
+    path  TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS filings (
+    id      INTEGER PRIMARY KEY,
+    nit     TEXT NOT NULL,
+    period  TEXT NOT NULL,
+    report  TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    mtime   REAL NOT NULL,
+    cells   INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (nit, period, report)
+);
+CREATE TABLE IF NOT EXISTS cells (
+    filing_id  INTEGER NOT NULL REFERENCES filings(id),
+    nit        TEXT NOT NULL,
+    period     TEXT NOT NULL,
+    report     TEXT NOT NULL,
+    sheet      TEXT NOT NULL,
+    row_path   INTEGER NOT NULL REFERENCES paths(id),
+    col_path   INTEGER NOT NULL REFERENCES paths(id),
+    value
+);
+CREATE VIEW IF NOT EXISTS cells_v AS
+    SELECT c.nit, c.period, c.report, c.sheet,
+           r.path AS row_path, k.path AS col_path, c.value
+    FROM cells c
+    JOIN paths r ON r.id = c.row_path
+    JOIN paths k ON k.id = c.col_path;
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_cells_report_row ON cells (report, row_path);
+CREATE INDEX IF NOT EXISTS ix_cells_nit_period ON cells (nit, period);
+CREATE INDEX IF NOT EXISTS ix_cells_filing ON cells (filing_id);
+"""
+
+
+# ----------------- SQLite Cell Store -----------------
+class SqliteCellStore:
+    """
+    Long-format (EAV) store of flattened filings in a local SQLite database.
+
+    One row per non-null cell: (nit, period, report, sheet, row_path, col_path, value),
+    where row_path/col_path are ids into the `paths` dictionary table. Use the
+    `cells_v` view to query with the path strings resolved.
+
+    Loading is incremental: a filing whose source file size/mtime is unchanged is
+    skipped; a replaced filing has its cells deleted and re-inserted (upsert).
+    """
+
+    def __init__(self, db_path: Path, batch_size: int = 50_000, commit_every: int = 50):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.reader = WorkbookToJsonConverter()
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._reload_path_ids()
+
+    # -- path dictionary --
+    def _reload_path_ids(self):
+        self._path_ids: Dict[str, int] = dict(
+            (p, i) for i, p in self.conn.execute("SELECT id, path FROM paths")
+        )
+
+    def _encode_paths(self, labels: Iterable[str]) -> List[int]:
+        """Map path strings to ids, inserting unseen paths in one executemany."""
+        new = [p for p in dict.fromkeys(labels) if p not in self._path_ids]
+        if new:
+            next_id = max(self._path_ids.values(), default=0) + 1
+            rows = [(next_id + i, p) for i, p in enumerate(new)]
+            self.conn.executemany("INSERT INTO paths (id, path) VALUES (?, ?)", rows)
+            self._path_ids.update((p, i) for i, p in rows)
+        return [self._path_ids[p] for p in labels]
+
+    # -- cell extraction --
+    def _sheet_cells(self, df: pd.DataFrame) -> Iterable[Tuple[str, str, Any]]:
+        """Yield (row_label, col_label, value) for every non-null cell of a flattened sheet."""
+        if df.index.name != "Index" and "Index" in df.columns:
+            df = df.set_index("Index")
+        row_labels = [str(r) for r in df.index]
+        col_labels = [str(c) for c in df.columns]
+        values = df.to_numpy(dtype=object)
+        rows, cols = np.nonzero(pd.notna(values))
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            v = json_safe_scalar(values[i, j])
+            if v is not None:
+                yield row_labels[i], col_labels[j], v
+
+    # -- loading --
+    def _upsert_filing(self, info: Dict[str, str], file_path: Path, stat: os.stat_result) -> int:
+        cur = self.conn.execute(
+            """
+            INSERT INTO filings (nit, period, report, source, size, mtime)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (nit, period, report) DO UPDATE SET
+                source = excluded.source, size = excluded.size, mtime = excluded.mtime
+            RETURNING id
+            """,
+            (info["nit"], info["period"], info["report"], str(file_path), stat.st_size, stat.st_mtime),
+        )
+        return cur.fetchone()[0]
+
+    def load_workbook(self, file_path: Path, force: bool = False) -> Dict[str, Any]:
+        """
+        Load (or replace) one flattened workbook inside the current transaction
+        (sqlite3 opens one implicitly); the caller commits.
+
+        Returns a summary dict with status 'loaded', 'skipped' or 'failed'.
+        """
+        file_path = Path(file_path)
+        info = parse_filing_name(file_path.name)
+        if info is None:
+            return {"input": str(file_path), "status": "failed",
+                    "error": "File name does not match <NIT>_<YYYY-MM-DD>_<Report>"}
+
+        stat = file_path.stat()
+        existing = self.conn.execute(
+            "SELECT size, mtime FROM filings WHERE nit = ? AND period = ? AND report = ?",
+            (info["nit"], info["period"], info["report"]),
+        ).fetchone()
+        if existing and not force and existing == (stat.st_size, stat.st_mtime):
+            return {"input": str(file_path), "status": "skipped", **info}
+
+        xl = pd.ExcelFile(file_path, engine="openpyxl")
+        filing_id = self._upsert_filing(info, file_path, stat)
+        self.conn.execute("DELETE FROM cells WHERE filing_id = ?", (filing_id,))
+
+        n_cells = 0
+        for sheet_name in xl.sheet_names:
+            df = self.reader.read_sheet(file_path, sheet_name, xl=xl)
+            triples = list(self._sheet_cells(df))
+            if not triples:
+                continue
+            row_ids = self._encode_paths([t[0] for t in triples])
+            col_ids = self._encode_paths([t[1] for t in triples])
+            rows = [
+                (filing_id, info["nit"], info["period"], info["report"], sheet_name, r, c, t[2])
+                for r, c, t in zip(row_ids, col_ids, triples)
+            ]
+            for start in range(0, len(rows), self.batch_size):
+                self.conn.executemany(
+                    "INSERT INTO cells (filing_id, nit, period, report, sheet, row_path, col_path, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows[start:start + self.batch_size],
+                )
+            n_cells += len(rows)
+
+        self.conn.execute("UPDATE filings SET cells = ? WHERE id = ?", (n_cells, filing_id))
+        return {"input": str(file_path), "status": "loaded", "cells": n_cells, **info}
+
+    def load_directory(self, input_dir: Path, force: bool = False) -> List[Dict[str, Any]]:
+        """Load every flattened workbook in input_dir, committing every `commit_every` filings."""
+        files = sorted(p for p in Path(input_dir).iterdir() if p.is_file() and is_excel_file(p))
+        if not files:
+            logger.info(f"No Excel files found in {input_dir}")
+            return []
+
+        summaries = []
+        pending = 0
+        try:
+            # Explicit BEGIN: a SAVEPOINT outside a transaction would start (and its
+            # RELEASE commit) a transaction of its own for every filing
+            self._begin()
+            for file_path in files:
+                self.conn.execute("SAVEPOINT filing")
+                try:
+                    summary = self.load_workbook(file_path, force=force)
+                    self.conn.execute("RELEASE filing")
+                except Exception as e:
+                    # Undo the half-loaded filing only; earlier filings stay in the open transaction
+                    self.conn.execute("ROLLBACK TO filing")
+                    self.conn.execute("RELEASE filing")
+                    self._reload_path_ids()
+                    logger.error(f"Failed to load {file_path.name}: {e}")
+                    summary = {"input": str(file_path), "status": "failed", "error": str(e)}
+                summaries.append(summary)
+                if summary["status"] == "loaded":
+                    logger.info(f"✔ Loaded: {file_path.name} ({summary['cells']} cells)")
+                    pending += 1
+                    if pending >= self.commit_every:
+                        self.conn.commit()
+                        self._begin()
+                        pending = 0
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self._reload_path_ids()
+            raise
+
+        self.ensure_indexes()
+        return summaries
+
+    def _begin(self):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+    def ensure_indexes(self):
+        """Create the query indexes (no-op if they already exist)."""
+        self.conn.executescript(INDEXES)
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
+    # -- querying --
+    def query(self, sql: str, params: Tuple = ()) -> pd.DataFrame:
+        """Run a SQL query against the store and return a DataFrame."""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def line_item(self, report: str, row_path: str) -> pd.DataFrame:
+        """All companies/periods for one report line item (served by ix_cells_report_row)."""
+        return self.query(
+            """
+            SELECT c.nit, c.period, k.path AS col_path, c.value
+            FROM cells c JOIN paths k ON k.id = c.col_path
+            WHERE c.report = ? AND c.row_path = (SELECT id FROM paths WHERE path = ?)
+            ORDER BY c.nit, c.period
+            """,
+            (report, row_path),
+        )
+
+    def close(self):
+        self.conn.close()
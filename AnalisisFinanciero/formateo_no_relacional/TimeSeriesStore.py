@@ -0,0 +1,308 @@
+import datetime as dt
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+import numpy as np
+import pandas as pd
+from utils import *
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+STORE_NAME = ".timeseries.pkl"
+STORE_VERSION = 1
+CURRENT, PRIOR = "Periodo Actual", "Periodo Anterior"
+
+SeriesKey = Tuple[str, Tuple[str, ...]]  # (report, path without the period leaf)
+
+
+def prior_period(period: str, months: int = 12) -> str:
+    """Period end `months` before `period` ('2024-12-31' → '2023-12-31'), clamped to month end."""
+    d = dt.date.fromisoformat(period)
+    year, month = divmod(d.year * 12 + d.month - 1 - months, 12)
+    month += 1
+    next_month = dt.date(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - dt.timedelta(days=1)).day
+    # Month-end stays month-end (Feb 28 → Feb 29 in leap years and vice versa)
+    day = last_day if _is_month_end(d) else min(d.day, last_day)
+    return dt.date(year, month, day).isoformat()
+
+
+def _is_month_end(d: dt.date) -> bool:
+    return (d + dt.timedelta(days=1)).month != d.month
+
+
+def iter_numeric_leaves(tree: Any) -> Iterator[Tuple[Tuple[str, ...], str, float]]:
+    """
+    Yield (series path, period role, value) for numeric leaves of a JSON-stage tree.
+    Leaves named "Periodo Actual"/"Periodo Anterior" give their role and are dropped
+    from the path; any other numeric leaf is a current-period value.
+    """
+    stack = [((), iter(tree.items()))]  # iterators keep document order
+    while stack:
+        path, items = stack[-1]
+        for k, v in items:
+            if isinstance(v, dict):
+                stack.append((path + (k,), iter(v.items())))
+                break
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and v == v:
+                if k == PRIOR:
+                    yield path, PRIOR, float(v)
+                elif k == CURRENT:
+                    yield path, CURRENT, float(v)
+                else:
+                    yield path + (k,), CURRENT, float(v)
+        else:
+            stack.pop()
+
+
+# ----------------- Company Series -----------------
+class CompanySeries:
+    """
+    Every numeric line item of one company, aligned on period end dates.
+
+    Two float64 matrices [series × period] hold the values: `current` as each
+    period's own filing reported them, and `comparative` as the following filing
+    restated them in its "Periodo Anterior" column. Rows are C-contiguous, so a
+    series' history is one contiguous array. Periods are kept sorted; both axes
+    grow by doubling their capacity, so appending a new period or line item costs
+    amortized O(1) per cell and never rebuilds the existing history.
+    """
+
+    def __init__(self, nit: str):
+        self.nit = nit
+        self.series: List[SeriesKey] = []
+        self.series_ids: Dict[SeriesKey, int] = {}
+        self.periods: List[str] = []
+        self.filings: Dict[str, Dict[str, Any]] = {}  # stem → {period, prior, rows written}
+        self.current = np.full((16, 4), np.nan)
+        self.comparative = np.full((16, 4), np.nan)
+
+    # -- growth --
+    def _grow(self, rows: int, cols: int):
+        cap_r, cap_c = self.current.shape
+        if rows <= cap_r and cols <= cap_c:
+            return
+        cap_r, cap_c = max(cap_r, 1), max(cap_c, 1)
+        while cap_r < rows:
+            cap_r *= 2
+        while cap_c < cols:
+            cap_c *= 2
+        n, m = len(self.series), len(self.periods)
+        for name in ("current", "comparative"):
+            grown = np.full((cap_r, cap_c), np.nan)
+            grown[:n, :m] = getattr(self, name)[:n, :m]
+            setattr(self, name, grown)
+
+    def _series_id(self, key: SeriesKey) -> int:
+        sid = self.series_ids.get(key)
+        if sid is None:
+            sid = len(self.series)
+            self._grow(sid + 1, len(self.periods))
+            self.series_ids[key] = sid
+            self.series.append(key)
+        return sid
+
+    def _period_col(self, period: str) -> int:
+        """Column of `period`, inserting it in date order if new."""
+        m = len(self.periods)
+        if not m or period > self.periods[-1]:
+            self._grow(len(self.series), m + 1)
+            self.periods.append(period)
+            return m
+        pos = int(np.searchsorted(np.array(self.periods), period))
+        if self.periods[pos] == period:
+            return pos
+        # Back-filling an older period: shift later columns right (only this company's arrays)
+        self._grow(len(self.series), m + 1)
+        for arr in (self.current, self.comparative):
+            arr[:, pos + 1:m + 1] = arr[:, pos:m]
+            arr[:, pos] = np.nan
+        self.periods.insert(pos, period)
+        return pos
+
+    # -- filings --
+    def add_filing(self, stem: str, report: str, period: str, tree: Dict, prior_months: int = 12):
+        """Add (or replace) one filing's values."""
+        if stem in self.filings:
+            self.remove_filing(stem)
+        prior = prior_period(period, prior_months)
+        cur_rows, cur_vals, cmp_rows, cmp_vals = [], [], [], []
+        for path, role, value in iter_numeric_leaves(tree):
+            sid = self._series_id((report, path))
+            if role == CURRENT:
+                cur_rows.append(sid)
+                cur_vals.append(value)
+            else:
+                cmp_rows.append(sid)
+                cmp_vals.append(value)
+        # Resolve columns first: adding a period may reallocate the matrices
+        if cur_rows:
+            col = self._period_col(period)
+            self.current[cur_rows, col] = cur_vals
+        if cmp_rows:
+            col = self._period_col(prior)
+            self.comparative[cmp_rows, col] = cmp_vals
+        self.filings[stem] = {
+            "report": report, "period": period, "prior": prior,
+            "current": np.array(cur_rows, dtype=np.int64), "comparative": np.array(cmp_rows, dtype=np.int64),
+        }
+
+    def remove_filing(self, stem: str):
+        info = self.filings.pop(stem, None)
+        if info is None:
+            return
+        if len(info["current"]):
+            self.current[info["current"], self.periods.index(info["period"])] = np.nan
+        if len(info["comparative"]):
+            self.comparative[info["comparative"], self.periods.index(info["prior"])] = np.nan
+
+    # -- views --
+    def matrices(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(current, comparative) trimmed to the used size (views, no copy)."""
+        n, m = len(self.series), len(self.periods)
+        return self.current[:n, :m], self.comparative[:n, :m]
+
+    def history(self, fill_from_comparative: bool = True) -> np.ndarray:
+        """Best value per series and period: the period's own filing, else the next filing's restatement."""
+        current, comparative = self.matrices()
+        if not fill_from_comparative:
+            return current.copy()
+        return np.where(np.isnan(current), comparative, current)
+
+    def frame(self, report: Optional[str] = None, fill_from_comparative: bool = True) -> pd.DataFrame:
+        """Series × period DataFrame; index levels report/path (dot-joined), columns are period dates."""
+        values = self.history(fill_from_comparative)
+        rows = [i for i, (r, _) in enumerate(self.series) if report is None or r == report]
+        index = pd.MultiIndex.from_tuples(
+            [(self.series[i][0], ".".join(self.series[i][1])) for i in rows], names=["report", "path"]
+        )
+        return pd.DataFrame(values[rows], index=index, columns=pd.to_datetime(self.periods))
+
+    def series_values(self, report: str, path: Tuple[str, ...], fill_from_comparative: bool = True) -> pd.Series:
+        sid = self.series_ids[(report, tuple(path))]
+        current, comparative = self.matrices()
+        row = current[sid]
+        if fill_from_comparative:
+            row = np.where(np.isnan(row), comparative[sid], row)
+        return pd.Series(row, index=pd.to_datetime(self.periods), name=".".join(path))
+
+    def reconcile(self, abs_tol: float = 1.0, rel_tol: float = 0.0) -> pd.DataFrame:
+        """
+        Line items whose "Periodo Anterior" in one filing disagrees with "Periodo Actual"
+        in the prior period's filing (restatements or extraction errors).
+        """
+        current, comparative = self.matrices()
+        both = ~np.isnan(current) & ~np.isnan(comparative)
+        diff = np.zeros_like(current)
+        np.subtract(comparative, current, out=diff, where=both)
+        bad = both & (np.abs(diff) > abs_tol + rel_tol * np.abs(current))
+        rows, cols = np.nonzero(bad)
+        return pd.DataFrame({
+            "nit": self.nit,
+            "report": [self.series[i][0] for i in rows],
+            "path": [".".join(self.series[i][1]) for i in rows],
+            "period": [self.periods[j] for j in cols],
+            "reported_current": current[rows, cols],
+            "restated_by_next": comparative[rows, cols],
+            "difference": diff[rows, cols],
+        })
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["current"], state["comparative"] = (a.copy() for a in self.matrices())
+        return state
+
+
+# ----------------- Store -----------------
+class TimeSeriesStore:
+    """
+    Per-company time series built from JSON-stage outputs (any codec).
+
+    Filings are matched by the <NIT>_<date>_<Report> file name: each one fills its
+    period's column and, through "Periodo Anterior", the column `prior_months`
+    earlier. update() only reads files that are new or changed (size/mtime), so
+    adding a year to a ten-year history touches one file per report.
+    """
+
+    def __init__(self, prior_months: int = 12):
+        self.prior_months = prior_months
+        self.companies: Dict[str, CompanySeries] = {}
+        self.sources: Dict[str, Dict[str, Any]] = {}  # file name → {stem, nit, size, mtime}
+
+    def company(self, nit: str) -> CompanySeries:
+        return self.companies[nit]
+
+    def add_tree(self, stem: str, tree: Dict) -> bool:
+        info = parse_filing_name(stem)
+        if info is None:
+            logger.warning(f"Skipping {stem}: name does not match <NIT>_<YYYY-MM-DD>_<Report>")
+            return False
+        company = self.companies.get(info["nit"])
+        if company is None:
+            company = self.companies[info["nit"]] = CompanySeries(info["nit"])
+        company.add_filing(stem, info["report"], info["period"], tree, self.prior_months)
+        return True
+
+    def update(self, json_dir: Path) -> Dict[str, int]:
+        """Bring the store in line with a directory of JSON outputs; returns counts per action."""
+        files = {
+            p.name: p for p in sorted(Path(json_dir).iterdir())
+            if p.is_file() and is_codec_file(p) and not p.name.startswith(".") and not p.name.endswith("_summary.json")
+        }
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "failed": 0}
+
+        for name in list(self.sources):
+            if name not in files:
+                old = self.sources.pop(name)
+                if old["nit"] in self.companies:
+                    self.companies[old["nit"]].remove_filing(old["stem"])
+                counts["removed"] += 1
+
+        for name, path in files.items():
+            st = path.stat()
+            src = self.sources.get(name)
+            if src and src["size"] == st.st_size and src["mtime"] == st.st_mtime_ns:
+                counts["unchanged"] += 1
+                continue
+            stem = strip_codec_suffix(name)
+            try:
+                if not self.add_tree(stem, load_any(path)):
+                    continue
+            except Exception as e:
+                logger.error(f"Failed to load {name}: {e}")
+                counts["failed"] += 1
+                continue
+            self.sources[name] = {"stem": stem, "nit": parse_filing_name(stem)["nit"],
+                                  "size": st.st_size, "mtime": st.st_mtime_ns}
+            counts["updated" if src else "added"] += 1
+        return counts
+
+    def reconcile(self, abs_tol: float = 1.0, rel_tol: float = 0.0) -> pd.DataFrame:
+        frames = [c.reconcile(abs_tol, rel_tol) for c in self.companies.values()]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    # -- persistence --
+    def save(self, path: Path):
+        state = {"version": STORE_VERSION, "prior_months": self.prior_months,
+                 "companies": self.companies, "sources": self.sources}
+        with atomic_output(Path(path)) as tmp, open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: Path, prior_months: int = 12) -> "TimeSeriesStore":
+        """Load a saved store; a missing or outdated file (or another prior_months) gives an empty store."""
+        store = cls(prior_months)
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return store
+        if state.get("version") != STORE_VERSION or state.get("prior_months") != prior_months:
+            return store
+        store.companies = state["companies"]
+        store.sources = state["sources"]
+        return store
@@ -0,0 +1,121 @@
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, Tuple
+from utils import *
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def tree_nbytes(obj: Any) -> int:
+    """Approximate in-memory size of a parsed JSON tree (containers, keys and leaves)."""
+    size = 0
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        size += sys.getsizeof(node)
+        if isinstance(node, dict):
+            for k, v in node.items():
+                size += sys.getsizeof(k)
+                stack.append(v)
+        elif isinstance(node, list):
+            stack.extend(node)
+    return size
+
+
+# ----------------- Tree Cache -----------------
+class TreeCache:
+    """
+    Thread-safe LRU cache of parsed JSON-stage files, bounded by memory.
+
+    Entries are keyed by path and validated against the file's (mtime_ns, size)
+    on every get(), so a rewritten file is re-parsed on next access. When the
+    estimated size of all cached trees exceeds max_bytes, least recently used
+    entries are evicted (the entry just loaded is always kept).
+
+    Concurrent get() calls for the same uncached file parse it once.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2**20, loader: Callable[[Path], Any] = load_any):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries: "OrderedDict[Path, Tuple[Tuple[int, int], Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[Path, threading.Lock] = {}
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _fingerprint(path: Path) -> Tuple[int, int]:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path: Path) -> Any:
+        """Parsed tree of `path`, from cache when the file is unchanged."""
+        path = Path(path)
+        fp = self._fingerprint(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == fp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            load_lock = self._loading.setdefault(path, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None and entry[0] == fp:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[1]
+            tree = self.loader(path)
+            nbytes = tree_nbytes(tree)
+            with self._lock:
+                self.misses += 1
+                self._put(path, fp, tree, nbytes)
+                self._loading.pop(path, None)
+            return tree
+
+    def _put(self, path: Path, fp: Tuple[int, int], tree: Any, nbytes: int):
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._entries[path] = (fp, tree, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
+
+    def invalidate(self, path: Optional[Path] = None):
+        """Drop one entry, or everything."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            old = self._entries.pop(Path(path), None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, path) -> bool:
+        with self._lock:
+            return Path(path) in self._entries
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from utils import *
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".tree_hashes.json"
+
+# Patch ops: ["+", path, new] | ["-", path, old] | ["~", path, old, new]
+ADDED, REMOVED, CHANGED = "+", "-", "~"
+
+
+# ----------------- Subtree Hashes -----------------
+class HashTree:
+    """Content hash of a JSON subtree; `children` mirrors dict keys (None for leaves)."""
+
+    __slots__ = ("digest", "children")
+
+    def __init__(self, digest: bytes, children: Optional[Dict[str, "HashTree"]] = None):
+        self.digest = digest
+        self.children = children
+
+    @classmethod
+    def build(cls, node: Any) -> "HashTree":
+        """Hash a tree bottom-up. Dict digests ignore key order."""
+        if isinstance(node, dict):
+            children = {k: cls.build(v) for k, v in node.items()}
+            h = hashlib.blake2b(b"d", digest_size=16)
+            for k in sorted(children):
+                h.update(k.encode("utf-8"))
+                h.update(b"\x00")
+                h.update(children[k].digest)
+            return cls(h.digest(), children)
+        leaf = json.dumps(node, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return cls(hashlib.blake2b(b"v" + leaf, digest_size=16).digest())
+
+
+# ----------------- Tree Diff -----------------
+class TreeDiff:
+    """
+    Structural diff between two WorkbookToJsonConverter trees.
+
+    Subtrees whose content hashes match are skipped without being descended,
+    so the walk only visits branches that actually changed.
+    """
+
+    @staticmethod
+    def diff(old: Any, new: Any,
+             old_hashes: Optional[HashTree] = None,
+             new_hashes: Optional[HashTree] = None) -> List[list]:
+        """Return a compact patch (list of ops) turning `old` into `new`."""
+        old_hashes = old_hashes or HashTree.build(old)
+        new_hashes = new_hashes or HashTree.build(new)
+        patch: List[list] = []
+        TreeDiff._diff(old, new, old_hashes, new_hashes, [], patch)
+        return patch
+
+    @staticmethod
+    def _diff(old, new, ho: HashTree, hn: HashTree, path: List[str], patch: List[list]):
+        if ho.digest == hn.digest:
+            return
+        if ho.children is None or hn.children is None:
+            patch.append([CHANGED, path, old, new])
+            return
+        for k, v in old.items():
+            if k not in new:
+                patch.append([REMOVED, path + [k], v])
+        for k, v in new.items():
+            if k not in old:
+                patch.append([ADDED, path + [k], v])
+            else:
+                TreeDiff._diff(old[k], v, ho.children[k], hn.children[k], path + [k], patch)
+
+    @staticmethod
+    def apply(tree: Dict, patch: List[list]) -> Dict:
+        """Apply a patch in place and return the tree."""
+        for op in patch:
+            kind, path = op[0], op[1]
+            if not path:
+                return op[-1] if kind != REMOVED else {}
+            parent = tree
+            for k in path[:-1]:
+                parent = parent[k]
+            if kind == REMOVED:
+                del parent[path[-1]]
+            else:
+                parent[path[-1]] = op[-1]
+        return tree
+
+    @staticmethod
+    def summarize(patch: List[list]) -> Dict[str, int]:
+        return {
+            "added": sum(1 for op in patch if op[0] == ADDED),
+            "removed": sum(1 for op in patch if op[0] == REMOVED),
+            "changed": sum(1 for op in patch if op[0] == CHANGED),
+        }
+
+
+# ----------------- Corpus Diff -----------------
+class CorpusDiff:
+    """
+    Diff two directories of JSON-stage outputs (any codec), pairing files by name.
+
+    Each directory keeps a root-hash manifest keyed by file name and validated by
+    size/mtime, so unchanged files are skipped without being parsed. Only files
+    whose root hashes differ are loaded and diffed. The manifest is a cache: with
+    write_manifest=False, or when a directory is read-only, it is not saved.
+    """
+
+    def __init__(self, write_manifest: bool = True):
+        self.write_manifest = write_manifest
+
+    @staticmethod
+    def _files(directory: Path) -> Dict[str, Path]:
+        return {
+            strip_codec_suffix(f.name): f
+            for f in sorted(directory.iterdir())
+            if f.is_file() and is_codec_file(f)
+            and not f.name.startswith((".", "~$")) and not f.name.endswith("_summary.json")
+        }
+
+    def root_hashes(self, directory: Path) -> Dict[str, str]:
+        """Root digest per file, reusing manifest entries whose size/mtime still match."""
+        manifest_path = directory / MANIFEST_NAME
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+
+        fresh, dirty = {}, False
+        for key, f in self._files(directory).items():
+            st = f.stat()
+            entry = manifest.get(key)
+            if not entry or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime or entry["file"] != f.name:
+                entry = {"file": f.name, "size": st.st_size, "mtime": st.st_mtime,
+                         "root": HashTree.build(load_any(f)).digest.hex()}
+                dirty = True
+            fresh[key] = entry
+
+        if self.write_manifest and (dirty or fresh.keys() != manifest.keys()):
+            try:
+                with atomic_output(manifest_path) as tmp:
+                    tmp.write_text(json.dumps(fresh, ensure_ascii=False, indent=2), encoding="utf-8")
+            except OSError as e:  # e.g. a read-only snapshot: the diff does not need the cache
+                logger.warning(f"Root-hash cache not saved in {directory}: {e}")
+        return {k: v["root"] for k, v in fresh.items()}
+
+    def diff(self, old_dir: Path, new_dir: Path) -> Dict[str, Any]:
+        """
+        Returns {"added": [names], "removed": [names], "changed": {name: patch}}.
+        """
+        old_dir, new_dir = Path(old_dir), Path(new_dir)
+        old_roots, new_roots = self.root_hashes(old_dir), self.root_hashes(new_dir)
+        old_files, new_files = self._files(old_dir), self._files(new_dir)
+
+        result = {
+            "added": sorted(new_roots.keys() - old_roots.keys()),
+            "removed": sorted(old_roots.keys() - new_roots.keys()),
+            "changed": {},
+        }
+        for key in sorted(old_roots.keys() & new_roots.keys()):
+            if old_roots[key] == new_roots[key]:
+                continue
+            patch = TreeDiff.diff(load_any(old_files[key]), load_any(new_files[key]))
+            if patch:
+                result["changed"][key] = patch
+        return result
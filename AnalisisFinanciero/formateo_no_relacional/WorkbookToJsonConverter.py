@@ -3,13 +3,18 @@ import logging
 import sys
 import json
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import pandas as pd
 import numpy as np
 import datetime as dt
 from utils import *
 from NestedDictBuilder import *
 from SheetToJsonConverter import *
+from XlsxStreamReader import *
+from RunMetrics import stage_timer
+from FilingSelection import *
+from ColumnarJson import sheet_to_columnar, columnar_document
+from ContentStore import ContentStore, sheet_key
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -19,38 +24,172 @@ logger = logging.getLogger(__name__)
 class WorkbookToJsonConverter:
     """Convert all sheets of a workbook into a single merged nested JSON tree."""
 
-    def __init__(self):
+    def __init__(self, sheet_workers: int = 1, sheet_executor: str = "thread", engine: str = "openpyxl",
+                 selection: Optional[FilingSelection] = None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Available: {', '.join(ENGINES)}")
         self.sheet_converter = SheetToJsonConverter()
+        # Sheets of one workbook are converted concurrently when sheet_workers > 1
+        self.sheet_workers = sheet_workers
+        self.sheet_executor = sheet_executor
+        self.executor = None
+        # "stream" reads cell values straight from the sheet XML (see XlsxStreamReader.py)
+        self.engine = engine
+        # Sheets outside the selection are never parsed; rows outside it are not converted
+        self.selection = selection or FilingSelection()
 
-    def convert(self, file_path: Path) -> Optional[Dict]:
+    @staticmethod
+    def read_sheet(file_path: Path, sheet_name: str, xl: Optional[pd.ExcelFile] = None,
+                   engine: str = "openpyxl") -> pd.DataFrame:
         """
-        Read all sheets and merge into one nested dict.
-        Returns None if file cannot be read.
+        Read one flattened sheet, using its first column as index when possible.
+        Pass an open workbook (open_workbook()) as `xl` to reuse an already parsed workbook;
+        otherwise the file is opened with `engine` ("openpyxl" or "stream").
         """
+        if xl is None:
+            xl = open_workbook(file_path, engine)
+        try:
+            # Try to read with index_col=0 (assumes "Index" column was written)
+            return xl.parse(sheet_name, dtype=object, header=0, index_col=0)
+        except Exception:
+            logger.debug(f"Falling back to no index for sheet '{sheet_name}' in {file_path.name}")
+            return xl.parse(sheet_name, dtype=object, header=0)
+
+    def _read_frames(self, file_path: Path, timings: Dict[str, float]):
+        """(sheet names, frames) of the selected sheets, or None if the file cannot be opened."""
         try:
-            xl = pd.ExcelFile(file_path, engine="openpyxl")
+            with stage_timer(timings, "read"):
+                xl = open_workbook(file_path, self.engine)
         except Exception as e:
             logger.error(f"Failed to open {file_path.name}: {e}")
             return None
 
+        # Parse the workbook once; sheets outside the selection are never read
+        sheet_names = self.selection.select_sheets(xl.sheet_names)
+        with stage_timer(timings, "read"):
+            frames = [self.selection.select_rows(self.read_sheet(file_path, sheet_name, xl=xl))
+                      for sheet_name in sheet_names]
+        return sheet_names, frames
+
+    @staticmethod
+    def _fill_stats(stats: Optional[Dict[str, Any]], timings: Dict[str, float], sheet_names, frames):
+        if stats is not None:
+            stats["stages"] = timings
+            stats["cells"] = sum(int(df.size) for df in frames)
+            stats["sheets"] = len(sheet_names)
+
+    def convert(self, file_path: Path, stats: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """
+        Read all sheets and merge into one nested dict.
+        Returns None if file cannot be read. Pass a dict as `stats` to receive
+        {"stages": {"read": s, "convert": s}, "cells": n, "sheets": n} for run metrics
+        (sheets: how many were selected).
+        """
+        timings = {}
+        read = self._read_frames(file_path, timings)
+        if read is None:
+            return None
+        sheet_names, frames = read
+
         merged_tree = {}
 
-        for sheet_name in xl.sheet_names:
-            try:
-                # Try to read with index_col=0 (assumes "Index" column was written)
-                df = pd.read_excel(
-                    file_path, sheet_name=sheet_name,
-                    engine="openpyxl", dtype=object, header=0, index_col=0
-                )
-            except Exception:
-                logger.debug(f"Falling back to no index for sheet '{sheet_name}' in {file_path.name}")
-                df = pd.read_excel(
-                    file_path, sheet_name=sheet_name,
-                    engine="openpyxl", dtype=object, header=0
-                )
-
-            sheet_tree = self.sheet_converter.convert(df)
-            NestedDictBuilder.deep_merge(merged_tree, sheet_tree)
-            logger.debug(f"Processed sheet: {sheet_name} ({len(df)} rows)")
-
-        return merged_tree
\ No newline at end of file
+        # Convert sheets (possibly concurrently), then merge in original sheet order
+        # so the result matches sequential mode.
+        if self.executor is None:
+            self.executor = make_executor(self.sheet_workers, self.sheet_executor)
+        with stage_timer(timings, "convert"):
+            sheet_trees = ordered_map(self.sheet_converter.convert, frames, executor=self.executor)
+
+            for sheet_name, df, (sheet_tree, err) in zip(sheet_names, frames, sheet_trees):
+                if err is not None:
+                    raise err
+                NestedDictBuilder.deep_merge(merged_tree, sheet_tree)
+                logger.debug(f"Processed sheet: {sheet_name} ({len(df)} rows)")
+
+        self._fill_stats(stats, timings, sheet_names, frames)
+        return merged_tree
+
+    def convert_columnar(self, file_path: Path, stats: Optional[Dict[str, Any]] = None) -> Optional[Dict]:
+        """
+        Same input as convert(), returned as a columnar document (see ColumnarJson.py):
+        one entry per sheet, paths stored once per row/column instead of once per cell.
+        columnar_to_tree() of the result equals convert().
+        """
+        timings = {}
+        read = self._read_frames(file_path, timings)
+        if read is None:
+            return None
+        sheet_names, frames = read
+
+        if self.executor is None:
+            self.executor = make_executor(self.sheet_workers, self.sheet_executor)
+        with stage_timer(timings, "convert"):
+            sheets = []
+            for sheet_name, df, (sheet, err) in zip(
+                sheet_names, frames, ordered_map(sheet_to_columnar, frames, sheet_names, executor=self.executor)
+            ):
+                if err is not None:
+                    raise err
+                sheets.append(sheet)
+                logger.debug(f"Processed sheet: {sheet_name} ({len(df)} rows)")
+
+        self._fill_stats(stats, timings, sheet_names, frames)
+        return columnar_document(sheets)
+
+    def convert_stored(self, file_path: Path, store: ContentStore, schema: str = "nested",
+                       stats: Optional[Dict[str, Any]] = None) -> Optional[List[Tuple[str, str]]]:
+        """
+        Convert like convert() ("nested") or convert_columnar() ("columnar"), putting
+        each sheet's result in `store`; returns [(sheet name, digest)] for a manifest.
+        Sheets whose content the store has already seen are not converted again.
+        `stats` also receives "reused" (sheets not converted) and "stored" (new objects).
+        """
+        timings = {}
+        read = self._read_frames(file_path, timings)
+        if read is None:
+            return None
+        sheet_names, frames = read
+
+        with stage_timer(timings, "hash"):
+            # The nested tree of a sheet does not depend on its name; the columnar one does
+            keys = [sheet_key(*self.sheet_converter.sheet_arrays(df), schema, *([name] if schema == "columnar" else []))
+                    for name, df in zip(sheet_names, frames)]
+            digests = [store.lookup(key) for key in keys]
+        todo = [i for i, digest in enumerate(digests) if digest is None]
+
+        if self.executor is None:
+            self.executor = make_executor(self.sheet_workers, self.sheet_executor)
+        with stage_timer(timings, "convert"):
+            if schema == "columnar":
+                results = ordered_map(sheet_to_columnar, [frames[i] for i in todo], [sheet_names[i] for i in todo],
+                                      executor=self.executor)
+            else:
+                results = ordered_map(self.sheet_converter.convert, [frames[i] for i in todo], executor=self.executor)
+
+        stored = 0
+        with stage_timer(timings, "encode"):
+            for i, (obj, err) in zip(todo, results):
+                if err is not None:
+                    raise err
+                digests[i], new = store.put(obj)
+                store.remember(keys[i], digests[i])
+                stored += new
+                logger.debug(f"Processed sheet: {sheet_names[i]} ({len(frames[i])} rows)")
+
+        self._fill_stats(stats, timings, sheet_names, frames)
+        if stats is not None:
+            stats["reused"] = len(frames) - len(todo)
+            stats["stored"] = stored
+        return list(zip(sheet_names, digests))
+
+    def close(self):
+        """Shut down the sheet worker pool, if any (it is recreated on next use)."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __getstate__(self):
+        # Worker pools cannot be pickled; file-level workers create their own
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
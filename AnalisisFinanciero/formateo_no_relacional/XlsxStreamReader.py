@@ -0,0 +1,360 @@
+import html
+import io
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple, Union
+import pandas as pd
+import numpy as np
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import from_excel, from_ISO8601, CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904
+
+ENGINES = ("openpyxl", "stream")
+
+_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_ROW, _C, _V, _IS, _T, _R, _SI = (f"{_MAIN}{t}" for t in ("row", "c", "v", "is", "t", "r", "si"))
+
+BLOCK_SIZE = 1 << 20  # bytes decompressed per read of a sheet's XML
+_PREFIXED_ROOT_RE = re.compile(rb"<\w+:worksheet\b")
+_ROW_RE = re.compile(rb"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_ROW_NUM_RE = re.compile(rb'\br="([0-9.]+)"')
+_CELL_RE = re.compile(rb"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+_REF_RE = re.compile(rb'\br="([A-Za-z]+)')
+_TYPE_RE = re.compile(rb'\bt="([^"]*)"')
+_STYLE_RE = re.compile(rb'\bs="(\d+)"')
+_V_RE = re.compile(rb"<v(?:\s[^>]*)?>(.*?)</v>", re.S)
+_IS_RE = re.compile(rb"<is\b[^>]*>(.*?)</is>", re.S)
+_T_RE = re.compile(rb"<t(?:\s[^>]*)?>(.*?)</t>", re.S)
+_RPH_RE = re.compile(rb"<rPh\b.*?</rPh>", re.S)
+
+
+def _xml_text(raw: bytes) -> str:
+    text = raw.decode("utf-8")
+    return html.unescape(text) if "&" in text else text
+
+
+def _text(node) -> str:
+    """Plain text of an <si>/<is> node: its <t> plus the <t> of each rich-text run."""
+    parts = []
+    t = node.find(_T)
+    if t is not None and t.text is not None:
+        parts.append(t.text)
+    for run in node.iterfind(_R):
+        t = run.find(_T)
+        if t is not None and t.text is not None:
+            parts.append(t.text)
+    return "".join(parts)
+
+
+def column_index(ref: str) -> int:
+    """0-based column of an A1 reference ("B7" → 1)."""
+    col = 0
+    for ch in ref:
+        if ch.isdigit():
+            break
+        col = col * 26 + (ord(ch.upper()) - 64)
+    return col - 1
+
+
+# ----------------- Raw Sheet XML -----------------
+# For callers that edit sheet XML in place (transformador's HeaderRewriter)
+def is_prefixed_sheet(head: bytes) -> bool:
+    """True if the start of a sheet's XML uses a namespace prefix (<x:worksheet>); the byte scanners need unprefixed XML."""
+    return _PREFIXED_ROOT_RE.search(head) is not None
+
+
+def row_number(row_attrs: bytes) -> Optional[str]:
+    """The r="..." attribute of a <row> (its 1-based number, as written), or None."""
+    r = _ROW_NUM_RE.search(row_attrs)
+    return r.group(1).decode() if r else None
+
+
+def iter_raw_cells(row_body: bytes) -> Iterator[Tuple[int, bytes, bytes]]:
+    """(0-based column, attributes, whole <c> element) of each cell in a <row>'s content, undecoded."""
+    next_col = 0
+    for m in _CELL_RE.finditer(row_body or b""):
+        ref = _REF_RE.search(m.group(1))
+        col = column_index(ref.group(1).decode()) if ref else next_col
+        next_col = col + 1
+        yield col, m.group(1), m.group(0)
+
+
+def cell_style(cell_xml: bytes) -> bytes:
+    """The s="..." (style) attribute of a cell's attributes or element, or b""."""
+    m = _STYLE_RE.search(cell_xml)
+    return m.group(0) if m else b""
+
+
+class XlsxStreamReader:
+    """
+    Minimal xlsx reader that streams worksheet XML straight out of the zip.
+
+    Builds no Cell or style objects: the sharedStrings table is read once per
+    workbook, styles.xml only to learn which cell formats are dates, and each
+    sheet is parsed incrementally row by row (memory stays flat). Cell values are
+    converted exactly as pandas' openpyxl engine does, and parse() mirrors
+    pd.ExcelFile.parse for the arguments this pipeline uses, so it can stand in
+    for an ExcelFile anywhere.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path)
+        self._shared: Optional[List[str]] = None
+        self._sheets = self._read_workbook()
+        self.sheet_names = list(self._sheets)
+        self._date_styles, self._timedelta_styles = self._read_styles()
+
+    # -- workbook structure --
+    def _read_workbook(self) -> Dict[str, str]:
+        """{sheet name: zip member} in workbook order; also reads the date epoch."""
+        wb = ET.fromstring(self._zip.read("xl/workbook.xml"))
+        pr = wb.find(f"{_MAIN}workbookPr")
+        date1904 = pr is not None and pr.get("date1904", "false").lower() in ("1", "true")
+        self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+        rels = {}
+        try:
+            for rel in ET.fromstring(self._zip.read("xl/_rels/workbook.xml.rels")).iter(f"{_PKG_REL}Relationship"):
+                target = rel.get("Target")
+                target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+                rels[rel.get("Id")] = target
+        except KeyError:
+            pass
+
+        sheets = {}
+        for i, sheet in enumerate(wb.iter(f"{_MAIN}sheet"), start=1):
+            sheets[sheet.get("name")] = rels.get(sheet.get(f"{_REL}id"), f"xl/worksheets/sheet{i}.xml")
+        return sheets
+
+    def _read_styles(self) -> Tuple[set, set]:
+        """Indices of cellXfs whose number format is a date / a timedelta."""
+        try:
+            root = ET.fromstring(self._zip.read("xl/styles.xml"))
+        except KeyError:
+            return set(), set()
+        custom = {int(n.get("numFmtId")): n.get("formatCode") for n in root.iter(f"{_MAIN}numFmt")}
+        dates, timedeltas = set(), set()
+        xfs = root.find(f"{_MAIN}cellXfs")
+        for idx, xf in enumerate(xfs if xfs is not None else []):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if fmt is None:
+                continue
+            if is_date_format(fmt):
+                dates.add(idx)
+            if is_timedelta_format(fmt):
+                timedeltas.add(idx)
+        return dates, timedeltas
+
+    @property
+    def shared_strings(self) -> List[str]:
+        if self._shared is None:
+            self._shared = []
+            try:
+                with self._zip.open("xl/sharedStrings.xml") as f:
+                    for _, node in ET.iterparse(f):
+                        if node.tag == _SI:
+                            self._shared.append(_text(node).replace("x005F_", ""))
+                            node.clear()
+            except KeyError:
+                pass
+        return self._shared
+
+    def sheet_member(self, sheet: Union[str, int]) -> str:
+        if isinstance(sheet, int):
+            sheet = self.sheet_names[sheet]
+        if sheet not in self._sheets:
+            raise ValueError(f"Worksheet named '{sheet}' not found")
+        return self._sheets[sheet]
+
+    # -- cells --
+    def _convert(self, t: str, style: int, v: Optional[str]) -> Tuple[Any, str]:
+        """(value, kind) of one cell from its type, style and raw text, like openpyxl with data_only=True."""
+        if v is None:
+            return None, t
+        if t == "n":
+            value = float(v) if ("." in v or "E" in v or "e" in v) else int(v)
+            if style in self._date_styles:
+                try:
+                    return from_excel(value, self.epoch, timedelta=style in self._timedelta_styles), "d"
+                except (OverflowError, ValueError):
+                    return "#VALUE!", "e"
+            return value, "n"
+        if t == "s":
+            return self.shared_strings[int(v)], "s"
+        if t == "b":
+            return bool(int(v)), "b"
+        if t in ("str", "inlineStr"):
+            return v, "s"
+        if t == "d":
+            return from_ISO8601(v), "d"
+        return v, t
+
+    def _rows_etree(self, f) -> Iterator[Tuple[int, List[Tuple[int, Any, str]]]]:
+        """Generic path: ElementTree iterparse, for sheets written with namespace prefixes."""
+        row_counter = 0
+        for _, el in ET.iterparse(f):
+            if el.tag != _ROW:
+                continue
+            r = el.get("r")
+            row_counter = int(float(r)) if r else row_counter + 1
+            cells, next_col = [], 0
+            for c in el.iter(_C):
+                ref = c.get("r")
+                col = column_index(ref) if ref else next_col
+                next_col = col + 1
+                t = c.get("t", "n")
+                if t == "inlineStr":
+                    node = c.find(_IS)
+                    v = _text(node) if node is not None else None
+                else:
+                    v = c.findtext(_V) or None
+                if v is not None:
+                    cells.append((col, *self._convert(t, int(c.get("s", 0)), v)))
+            el.clear()
+            yield row_counter - 1, cells
+
+    def _rows_scan(self, f) -> Iterator[Tuple[int, List[Tuple[int, Any, str]]]]:
+        """
+        Fast path: scan the sheet XML in blocks cut at </row> boundaries with byte
+        regexes. Cells without a value (styled blanks, often most of a sheet) are
+        skipped without being decoded.
+        """
+        row_counter = 0
+        buf = b""
+        while True:
+            chunk = f.read(BLOCK_SIZE)
+            buf += chunk
+            cut = buf.rfind(b"</row>") + len(b"</row>") if chunk else len(buf)
+            if cut < len(b"</row>") and chunk:
+                continue
+            block, buf = buf[:cut], buf[cut:]
+            for m in _ROW_RE.finditer(block):
+                r = _ROW_NUM_RE.search(m.group(1))
+                row_counter = int(float(r.group(1))) if r else row_counter + 1
+                cells, next_col = [], 0
+                body = m.group(2)
+                if body:
+                    for attrs, content in _CELL_RE.findall(body):
+                        ref = _REF_RE.search(attrs)
+                        col = column_index(ref.group(1).decode()) if ref else next_col
+                        next_col = col + 1
+                        if not content:
+                            continue
+                        t = _TYPE_RE.search(attrs)
+                        t = t.group(1).decode() if t else "n"
+                        if t == "inlineStr":
+                            inline = _IS_RE.search(content)
+                            if inline is None:
+                                continue
+                            v = "".join(_xml_text(x) for x in _T_RE.findall(_RPH_RE.sub(b"", inline.group(1))))
+                        else:
+                            v = _V_RE.search(content)
+                            v = _xml_text(v.group(1)) if v and v.group(1) else None
+                            if v is None:
+                                continue
+                        st = _STYLE_RE.search(attrs)
+                        cells.append((col, *self._convert(t, int(st.group(1)) if st else 0, v)))
+                yield row_counter - 1, cells
+            if not chunk:
+                break
+
+    def parse_row(self, row_xml: bytes) -> List[Tuple[int, Any, str]]:
+        """[(col index, value, kind), ...] of one <row> element, converted like iter_rows()."""
+        self.shared_strings  # shared-string cells resolve against the table
+        return next(self._rows_scan(io.BytesIO(row_xml)), (0, []))[1]
+
+    def iter_rows(self, sheet: Union[str, int] = 0) -> Iterator[Tuple[int, List[Tuple[int, Any, str]]]]:
+        """Yield (row index, [(col index, value, kind), ...]) for each <row>, non-empty cells only (0-based)."""
+        member = self.sheet_member(sheet)
+        self.shared_strings  # load once, before streaming the sheet
+        with self._zip.open(member) as f:
+            prefixed = is_prefixed_sheet(f.read(4096))
+        with self._zip.open(member) as f:
+            yield from (self._rows_etree(f) if prefixed else self._rows_scan(f))
+
+    def iter_cells(self, sheet: Union[str, int] = 0) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (row, col, value) for every non-empty cell (0-based)."""
+        for r, cells in self.iter_rows(sheet):
+            for c, value, _ in cells:
+                yield r, c, value
+
+    def get_sheet_data(self, sheet: Union[str, int] = 0) -> List[List[Any]]:
+        """
+        Dense rows exactly as pandas' openpyxl engine builds them before parsing:
+        empty cells are "", error cells NaN, integral numbers int; trailing empty
+        cells and rows are trimmed and rows are padded to the widest one.
+        """
+        data: List[List[Any]] = []
+        last_row_with_data = -1
+        for r, cells in self.iter_rows(sheet):
+            while len(data) < r:
+                data.append([])
+            row: List[Any] = []
+            for c, value, kind in cells:
+                if c >= len(row):
+                    row.extend([""] * (c - len(row) + 1))
+                if value is None:
+                    value = ""
+                elif kind == "e":
+                    value = np.nan
+                elif kind == "n":
+                    value = int(value) if int(value) == value else float(value)
+                row[c] = value
+            while row and row[-1] == "":
+                row.pop()
+            if row:
+                last_row_with_data = r
+            data.append(row)
+
+        data = data[: last_row_with_data + 1]
+        if data:
+            width = max(len(row) for row in data)
+            data = [row + [""] * (width - len(row)) for row in data]
+        return data
+
+    # -- pandas --
+    def parse(self, sheet_name: Union[str, int] = 0, header: Optional[int] = 0,
+              index_col: Optional[int] = None, dtype=None, **kwds) -> pd.DataFrame:
+        """Drop-in for pd.ExcelFile.parse (single sheet, scalar header/index_col)."""
+        data = self.get_sheet_data(sheet_name)
+        try:
+            return TextParser(
+                data, header=header, index_col=index_col, has_index_names=False,
+                dtype=dtype, skip_blank_lines=False, **kwds,
+            ).read()
+        except EmptyDataError:
+            return pd.DataFrame()
+
+    # -- lifecycle --
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # Zip handles cannot be pickled; reopen on the other side
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+
+def open_workbook(path, engine: str = "openpyxl"):
+    """pd.ExcelFile for engine="openpyxl", XlsxStreamReader for engine="stream"."""
+    if engine == "stream":
+        return XlsxStreamReader(path)
+    if engine == "openpyxl":
+        return pd.ExcelFile(path, engine="openpyxl")
+    raise ValueError(f"Unknown engine '{engine}'. Available: {', '.join(ENGINES)}")
@@ -0,0 +1,88 @@
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from SectorAggregator import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def write_table(df: pd.DataFrame, path: Path, index: bool):
+    """CSV or Excel depending on the extension, written atomically."""
+    with atomic_output(path) as tmp:
+        if path.suffix.lower() in (".xlsx", ".xlsm"):
+            df.to_excel(tmp, index=index, engine="openpyxl")
+        else:
+            df.to_csv(tmp, index=index, encoding="utf-8")
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Sector benchmarks: aggregate line items by CIIU sector (read from each filing's
+        Carátula) and period, in one parallel map-reduce pass over the JSON outputs.
+        - Map: worker processes read company-period groups and combine them into partial
+          aggregates (count, sum, mean, std, min, max, quantile sketch).
+        - Reduce: partials are merged as workers finish; no process loads the whole corpus.
+        """
+    )
+    parser.add_argument("--json_dir", type=str, required=True, help="Directory with JSON outputs (any codec).")
+    parser.add_argument("--output", type=str, required=True,
+                        help="Long table (sector, period, report, item, statistics) (.csv/.xlsx).")
+    parser.add_argument("--level", choices=list(SECTOR_LEVELS), default="class",
+                        help="CIIU level to group by: section (C), division (C11), group (C110) or class (C1104).")
+    parser.add_argument("--reports", nargs="+", metavar="REPORT", help="Only these report types (wildcards allowed).")
+    parser.add_argument("--nits", nargs="+", metavar="NIT", help="Only these companies.")
+    parser.add_argument("--periods", nargs="+", metavar="YYYY-MM-DD", help='Only these periods, e.g. "2024-*".')
+    parser.add_argument("--items", nargs="+", metavar="PATH",
+                        help="Only line items whose path starts with one of these (dot-separated, wildcards allowed).")
+    parser.add_argument("--quantiles", nargs="+", type=float, default=list(DEFAULT_QUANTILES),
+                        help="Quantiles to report (from mergeable sketches).")
+    parser.add_argument("--accuracy", type=float, default=0.01, help="Relative error of the quantiles.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the map step.")
+    parser.add_argument("--pivot", type=str, help="Also write one statistic as report/item/sector × period here.")
+    parser.add_argument("--pivot_stat", type=str, default="p50", help="Statistic for --pivot (e.g. mean, p50, sum).")
+
+    args = parser.parse_args()
+
+    json_dir = Path(args.json_dir).resolve()
+    if not json_dir.is_dir():
+        logger.error(f"JSON directory not found: {json_dir}")
+        sys.exit(1)
+
+    try:
+        t0 = time.perf_counter()
+        aggregator = SectorAggregator(args.level, args.reports, args.nits, args.periods, args.items,
+                                      args.workers, args.accuracy)
+        result = aggregator.run(json_dir)
+        table = SectorAggregator.table(result, args.quantiles)
+        elapsed = time.perf_counter() - t0
+        write_table(table, Path(args.output), index=False)
+        logger.info(f"Aggregates saved to {args.output}")
+        if args.pivot:
+            write_table(SectorAggregator.pivot(table, args.pivot_stat), Path(args.pivot), index=True)
+            logger.info(f"Pivot saved to {args.pivot}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        sys.exit(1)
+
+    # Final summary
+    print("\n" + "=" * 60)
+    print("SECTOR AGGREGATION SUMMARY")
+    print("=" * 60)
+    print(f"📥 Filings: {result.filings} read, {len(result.failed)} failed ({elapsed:.2f}s, {args.workers} worker(s))")
+    sectors = sorted({sector for sector, _ in result.companies})
+    for sector in sectors:
+        periods = sorted(p for s, p in result.companies if s == sector)
+        companies = len(set().union(*(result.companies[(sector, p)] for p in periods)))
+        name = result.sector_names.get(sector, "")
+        print(f"  - {sector}{' ' + name[:50] if name else ''}: {companies} company(ies), {len(periods)} period(s)")
+    print(f"📊 Rows: {len(table)} (sector × period × line item)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any
+from JsonCodec import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# ----------------- Benchmark -----------------
+def load_payloads(paths: List[Path]) -> Dict[str, Any]:
+    """Load every JSON-stage file (any codec) under the given files/directories."""
+    payloads = {}
+    for p in paths:
+        files = sorted(f for f in p.iterdir() if f.is_file() and is_codec_file(f)) if p.is_dir() else [p]
+        for f in files:
+            if f.name.endswith("_summary.json"):
+                continue
+            payloads[str(f)] = load_any(f)
+    return payloads
+
+
+def benchmark_codecs(payloads: Dict[str, Any], codecs: List[str], repeat: int = 3) -> List[Dict[str, Any]]:
+    """
+    Encode/decode every payload with each codec; keep the best of `repeat` runs.
+
+    Returns one row per codec: total size in bytes, size relative to 'pretty',
+    and encode/decode wall time in milliseconds.
+    """
+    rows = []
+    for name in codecs:
+        codec = get_codec(name)
+        best_enc = best_dec = float("inf")
+        size = 0
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            blobs = [codec.dumps(obj) for obj in payloads.values()]
+            t1 = time.perf_counter()
+            for blob in blobs:
+                loads_any(blob)
+            t2 = time.perf_counter()
+            best_enc = min(best_enc, t1 - t0)
+            best_dec = min(best_dec, t2 - t1)
+            size = sum(len(b) for b in blobs)
+        rows.append({
+            "codec": name,
+            "bytes": size,
+            "encode_ms": round(best_enc * 1000, 2),
+            "decode_ms": round(best_dec * 1000, 2),
+        })
+
+    base = next((r["bytes"] for r in rows if r["codec"] == "pretty"), None)
+    for r in rows:
+        r["ratio"] = round(r["bytes"] / base, 3) if base else None
+    return rows
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report size and encode/decode time of each JSON output codec."
+    )
+    parser.add_argument(
+        "inputs", nargs="+",
+        help="JSON-stage files or directories (e.g. data/json, bundle.json)."
+    )
+    parser.add_argument(
+        "--codecs", nargs="*", default=list(CODECS), choices=list(CODECS),
+        help="Codecs to benchmark (default: all)."
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per codec; best time is reported.")
+    args = parser.parse_args()
+
+    payloads = load_payloads([Path(p) for p in args.inputs])
+    if not payloads:
+        logger.error("No JSON-stage files found.")
+        sys.exit(1)
+
+    rows = benchmark_codecs(payloads, args.codecs, repeat=args.repeat)
+
+    print(f"\n{len(payloads)} payload(s)")
+    print(f"{'codec':<10}{'bytes':>14}{'ratio':>8}{'encode ms':>12}{'decode ms':>12}")
+    for r in rows:
+        ratio = f"{r['ratio']:.3f}" if r["ratio"] is not None else "-"
+        print(f"{r['codec']:<10}{r['bytes']:>14,}{ratio:>8}{r['encode_ms']:>12.2f}{r['decode_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from TimeSeriesStore import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def write_table(df: pd.DataFrame, path: Path, index: bool):
+    """CSV or Excel depending on the extension, written atomically."""
+    with atomic_output(path) as tmp:
+        if path.suffix.lower() in (".xlsx", ".xlsm"):
+            df.to_excel(tmp, index=index, engine="openpyxl")
+        else:
+            df.to_csv(tmp, index=index, encoding="utf-8")
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Align a company's filings into per-line-item time series by period end date.
+        - "Periodo Actual" fills the filing's own period; "Periodo Anterior" fills the
+          period before it and is reconciled against that period's own filing.
+        - The store is cached next to the inputs (.timeseries.pkl); later runs only
+          read JSON files that were added or changed.
+        """
+    )
+    parser.add_argument("--json_dir", type=str, required=True, help="Directory with JSON outputs (any codec).")
+    parser.add_argument("--store", type=str, help="Store file (default: json_dir/.timeseries.pkl).")
+    parser.add_argument("--prior_months", type=int, default=12,
+                        help="Months between a period and its 'Periodo Anterior' (12 for annual filings).")
+    parser.add_argument("--nit", type=str, help="Company to export (required with --output).")
+    parser.add_argument("--report", type=str, help="Only series of this report.")
+    parser.add_argument("--output", type=str, help="Write the aligned series (rows) × periods (columns) here (.csv/.xlsx).")
+    parser.add_argument("--no_fill", action="store_true",
+                        help="Do not fill periods without their own filing from the next filing's 'Periodo Anterior'.")
+    parser.add_argument("--reconciliation", type=str,
+                        help="Write 'Periodo Anterior' vs prior 'Periodo Actual' mismatches here (.csv/.xlsx).")
+    parser.add_argument("--abs_tol", type=float, default=1.0, help="Absolute tolerance for reconciliation.")
+    parser.add_argument("--rel_tol", type=float, default=0.0, help="Relative tolerance for reconciliation.")
+
+    args = parser.parse_args()
+
+    json_dir = Path(args.json_dir).resolve()
+    store_path = Path(args.store) if args.store else json_dir / STORE_NAME
+    if args.output and not args.nit:
+        logger.error("--output requires --nit")
+        sys.exit(1)
+
+    try:
+        t0 = time.perf_counter()
+        store = TimeSeriesStore.load(store_path, args.prior_months)
+        counts = store.update(json_dir)
+        if counts["added"] or counts["updated"] or counts["removed"]:
+            store.save(store_path)
+        elapsed = time.perf_counter() - t0
+
+        if args.output:
+            if args.nit not in store.companies:
+                logger.error(f"No filings for NIT {args.nit} in {json_dir}")
+                sys.exit(1)
+            frame = store.company(args.nit).frame(args.report, fill_from_comparative=not args.no_fill)
+            frame.columns = [c.date().isoformat() for c in frame.columns]
+            write_table(frame, Path(args.output), index=True)
+            logger.info(f"Series saved to {args.output}")
+
+        mismatches = store.reconcile(args.abs_tol, args.rel_tol)
+        if args.nit and len(mismatches):
+            mismatches = mismatches[mismatches["nit"] == args.nit]
+        if args.report and len(mismatches):
+            mismatches = mismatches[mismatches["report"] == args.report]
+        if args.reconciliation:
+            write_table(mismatches, Path(args.reconciliation), index=False)
+            logger.info(f"Reconciliation saved to {args.reconciliation}")
+
+        # Final summary
+        print("\n" + "=" * 60)
+        print("TIME-SERIES STORE SUMMARY")
+        print("=" * 60)
+        print(f"📥 Files: {counts['added']} added, {counts['updated']} updated, {counts['removed']} removed, "
+              f"{counts['unchanged']} unchanged, {counts['failed']} failed ({elapsed:.2f}s)")
+        for nit, company in sorted(store.companies.items()):
+            if args.nit and nit != args.nit:
+                continue
+            span = f"{company.periods[0]} → {company.periods[-1]}" if company.periods else "no periods"
+            print(f"  - {nit}: {len(company.series)} series, {len(company.periods)} period(s) ({span}), "
+                  f"{len(company.filings)} filing(s)")
+        print(f"🔁 Reconciliation mismatches: {len(mismatches)}")
+        print(f"💾 Store: {store_path}")
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+from utils import *
+from JsonCodec import *
+from WorkbookToJsonConverter import *
+from TreeDiff import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_tree(path: Path) -> Dict:
+    """Load a JSON-stage file (any codec) or convert a flattened workbook on the fly."""
+    if is_excel_file(path):
+        tree = WorkbookToJsonConverter().convert(path)
+        if tree is None:
+            raise ValueError(f"Cannot convert {path}")
+        return tree
+    return load_any(path)
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Structural diff between two filings or two output directories.
+        - Files: JSON-stage outputs (any codec) or flattened Excel workbooks.
+        - Directories: files are paired by name; unchanged files are skipped
+          using cached root hashes (.tree_hashes.json, see --no_manifest).
+        - Patch ops: ["+", path, new], ["-", path, old], ["~", path, old, new].
+        """
+    )
+    parser.add_argument("old", type=str, help="Old file or directory.")
+    parser.add_argument("new", type=str, help="New file or directory.")
+    parser.add_argument("--output", type=str, help="Write the patch here (compact JSON).")
+    parser.add_argument("--no_manifest", action="store_true",
+                        help="Do not write the root-hash cache (.tree_hashes.json) into the directories.")
+    args = parser.parse_args()
+
+    old, new = Path(args.old), Path(args.new)
+    try:
+        if old.is_dir() and new.is_dir():
+            result = CorpusDiff(write_manifest=not args.no_manifest).diff(old, new)
+            print(f"Added files:   {len(result['added'])}")
+            print(f"Removed files: {len(result['removed'])}")
+            print(f"Changed files: {len(result['changed'])}")
+            for name, patch in result["changed"].items():
+                counts = TreeDiff.summarize(patch)
+                print(f"  - {name}: +{counts['added']} -{counts['removed']} ~{counts['changed']}")
+        else:
+            result = TreeDiff.diff(load_tree(old), load_tree(new))
+            counts = TreeDiff.summarize(result)
+            print(f"+{counts['added']} -{counts['removed']} ~{counts['changed']}")
+
+        if args.output:
+            get_codec("compact").dump(result, args.output)
+            logger.info(f"Patch saved to {args.output}")
+
+    except Exception as e:
+        logger.error(f"Diff failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+from CorpusExporter import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Export the whole corpus as flat (nit, period, report, row_path, col_path, value)
+        rows to partitioned CSV or Parquet files, streaming with bounded memory.
+        - Inputs: flattened Excel files (exact row/column split) or JSON outputs.
+        - Layout: output_dir/<partition>=<value>/part.csv|parquet
+        """
+    )
+    parser.add_argument("--input_dir", type=str, required=True, help="Flattened Excel files or JSON outputs.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Directory for the exported files.")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Output format (parquet needs pyarrow).")
+    parser.add_argument("--partition_by", choices=PARTITIONS, default="report", help="Partition column.")
+    parser.add_argument("--row_group_size", type=int, default=100_000, help="Rows per written row group.")
+    parser.add_argument("--writers", type=int, default=1, help="Parallel writer threads.")
+    parser.add_argument("--max_buffered_rows", type=int,
+                        help="Rows held across all partition buffers before the largest are written "
+                             "early (default: 4 × --row_group_size).")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir).resolve()
+    files = sorted(
+        f for f in input_dir.iterdir()
+        if f.is_file() and (is_excel_file(f) or is_codec_file(f))
+        and not f.name.startswith(".") and not f.name.endswith("_summary.json")
+    )
+    if not files:
+        logger.error(f"No flattened Excel or JSON files found in {input_dir}")
+        sys.exit(1)
+
+    try:
+        exporter = CorpusExporter(
+            Path(args.output_dir).resolve(), fmt=args.format, partition_by=args.partition_by,
+            row_group_size=args.row_group_size, writers=args.writers,
+            max_buffered_rows=args.max_buffered_rows,
+        )
+        stats = exporter.export(files)
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        sys.exit(1)
+
+    print("\n" + "=" * 60)
+    print("EXPORT SUMMARY")
+    print("=" * 60)
+    print(f"Files:       {len(files)}")
+    print(f"Rows:        {stats['rows']:,} in {stats['row_groups']} row group(s), {stats['partitions']} partition(s)")
+    print(f"Throughput:  {stats['rows_per_s'] or 0:,} rows/s ({stats['elapsed_s']}s)")
+    print(f"📁 Output:   {Path(args.output_dir).resolve()}")
+
+
+if __name__ == "__main__":
+    main()
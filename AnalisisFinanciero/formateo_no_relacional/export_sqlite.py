@@ -0,0 +1,60 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+from SqliteCellStore import SqliteCellStore
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Bulk-load flattened Excel files into a SQLite cell store.
+        - One row per non-null cell: (nit, period, report, sheet, row_path, col_path, value).
+        - Paths are dictionary-encoded; query the cells_v view for readable paths.
+        - Incremental: unchanged filings are skipped, replaced filings are upserted.
+        """
+    )
+    parser.add_argument(
+        "--input_dir", type=str, required=True,
+        help="Directory containing flattened (cleaned) Excel files."
+    )
+    parser.add_argument(
+        "--db", type=str,
+        help="SQLite database path (default: input_dir/cells.sqlite)."
+    )
+    parser.add_argument("--force", action="store_true", help="Reload filings even if unchanged.")
+    parser.add_argument("--batch_size", type=int, default=50_000, help="Rows per executemany batch.")
+
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir).resolve()
+    db_path = Path(args.db).resolve() if args.db else input_dir / "cells.sqlite"
+
+    try:
+        store = SqliteCellStore(db_path, batch_size=args.batch_size)
+        summaries = store.load_directory(input_dir, force=args.force)
+        store.close()
+
+        print("\n" + "=" * 60)
+        print("SQLITE EXPORT SUMMARY")
+        print("=" * 60)
+        if not summaries:
+            print("No files were processed.")
+        else:
+            for status in ("loaded", "skipped", "failed"):
+                print(f"{status:<8} {sum(1 for s in summaries if s['status'] == status)}")
+            print(f"Cells loaded: {sum(s.get('cells', 0) for s in summaries)}")
+            print(f"📁 Database:  {db_path}")
+
+    except Exception as e:
+        logger.error(f"Fatal error during export: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
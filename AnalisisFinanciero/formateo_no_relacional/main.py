@@ -12,6 +12,10 @@ from NestedDictBuilder import *
 from SheetToJsonConverter import *
 from WorkbookToJsonConverter import *
 from ExcelToJSONBatchProcessor import *
+from JsonCodec import CODECS
+from XlsxStreamReader import ENGINES
+from FilingSelection import FilingSelection
+from ColumnarJson import SCHEMAS
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -36,6 +40,60 @@ def main():
         "--output_dir", type=str,
         help="Output directory (default: input_dir/excel_to_json)."
     )
+    parser.add_argument(
+        "--codec", type=str, default="pretty", choices=list(CODECS),
+        help="Output encoding: pretty (indent=2, default), compact, gzip, lzma or binary (key dictionary)."
+    )
+    parser.add_argument(
+        "--schema", type=str, default="nested", choices=list(SCHEMAS),
+        help="Output layout: nested (one merged tree, default) or columnar (per-sheet path and value arrays; "
+             "JsonCodec.load_any() rebuilds the tree). On the regression corpus columnar is about 30%% smaller "
+             "with --codec pretty (arrays kept on one line; 88,936 vs 126,415 bytes) and 17%% smaller with "
+             "--codec compact (86,123 vs 103,381 bytes)."
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Continue an interrupted run from output_dir/conversion_journal.jsonl."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Convert N workbooks concurrently (largest/slowest first)."
+    )
+    parser.add_argument(
+        "--memory_budget_mb", type=float,
+        help="Admit new workbooks only while worker RSS stays under this budget."
+    )
+    parser.add_argument(
+        "--sheet_workers", type=int, default=1,
+        help="Convert the sheets of each workbook concurrently with N workers."
+    )
+    parser.add_argument(
+        "--sheet_executor", choices=["thread", "process"], default="thread",
+        help="Worker type for --sheet_workers."
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="openpyxl",
+        help="Excel reader: openpyxl, or stream (reads the sheet XML directly, much faster)."
+    )
+    parser.add_argument(
+        "--content_store", type=str,
+        help="Content store directory: each distinct sheet is converted and written once there, "
+             "and the per-workbook outputs are small manifests referencing it (read back "
+             "transparently by JsonCodec.load_any())."
+    )
+    parser.add_argument(
+        "--metrics_dir", type=str,
+        help="Write live metrics here: json.prom (Prometheus textfile) and json.json."
+    )
+    parser.add_argument(
+        "--metrics_interval", type=float, default=10.0,
+        help="Seconds between metric exports / progress updates."
+    )
+    parser.add_argument(
+        "--progress", action="store_true",
+        help="Show a progress line (files/s, cells/s, failures, ETA)."
+    )
+    FilingSelection.add_arguments(parser)
 
     args = parser.parse_args()
 
@@ -43,7 +101,15 @@ def main():
     output_dir = Path(args.output_dir) if args.output_dir else input_dir / "excel_to_json"
 
     try:
-        processor = ExcelToJSONBatchProcessor(input_dir=input_dir, output_dir=output_dir)
+        processor = ExcelToJSONBatchProcessor(
+            input_dir=input_dir, output_dir=output_dir, codec=args.codec,
+            sheet_workers=args.sheet_workers, sheet_executor=args.sheet_executor,
+            resume=args.resume, workers=args.workers, memory_budget_mb=args.memory_budget_mb,
+            engine=args.engine, metrics_dir=args.metrics_dir,
+            metrics_interval=args.metrics_interval, progress=args.progress,
+            selection=FilingSelection.from_args(args), schema=args.schema,
+            store_dir=Path(args.content_store) if args.content_store else None
+        )
         summaries = processor.run()
 
         # Final summary
@@ -52,18 +118,28 @@ def main():
         print("=" * 60)
 
         success_count = sum(1 for s in summaries if s["status"] == "success")
-        fail_count = len(summaries) - success_count
+        skipped_count = sum(1 for s in summaries if s["status"] == "skipped")
+        fail_count = len(summaries) - success_count - skipped_count
 
         if not summaries:
             print("No files were processed.")
         else:
             print(f"✅ Success: {success_count}")
             print(f"❌ Failed:  {fail_count}")
+            if skipped_count:
+                print(f"⏭  Skipped: {skipped_count} (no sheet matches the selection)")
             print(f"📁 Output:  {output_dir}")
+            if processor.store is not None:
+                reused = sum(s.get("reused", 0) for s in summaries)
+                store_stats = processor.store.stats()
+                print(f"🗃  Store:   {processor.store.root} ({store_stats['objects']} object(s), "
+                      f"{store_stats['bytes'] / 2**20:.1f} MiB; {reused} sheet(s) reused this run)")
+            print(f"🧠 Peak worker RSS: {processor.scheduler.peak_rss_mb:.0f} MiB")
+            print(f"⏱  {processor.metrics.progress_line()}")
 
             # Save summary
-            summary_file = output_dir / "conversion_summary.json"
-            with open(summary_file, "w", encoding="utf-8") as f:
+            summary_file = processor.summary_path
+            with atomic_output(summary_file) as tmp_file, open(tmp_file, "w", encoding="utf-8") as f:
                 json.dump(summaries, f, indent=2, ensure_ascii=False)
             logger.info(f"Summary saved to {summary_file}")
 
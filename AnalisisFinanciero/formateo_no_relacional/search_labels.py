@@ -0,0 +1,86 @@
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from LabelIndex import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def print_hits(hits: List[Dict[str, Any]], max_filings: int = 5):
+    if not hits:
+        print("No matches.")
+    for h in hits:
+        filings = ", ".join(h["filings"][:max_filings])
+        more = f" (+{len(h['filings']) - max_filings})" if len(h["filings"]) > max_filings else ""
+        print(f"{h['score']:>7.3f}  [{h['report']}] {h['kind']}: {h['path']}")
+        print(f"         {len(h['filings'])} filing(s): {filings}{more}")
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Fuzzy search over the row/column paths of every flattened filing.
+        - Accent- and case-insensitive; tolerant to typos and partial words.
+        - The index is cached next to the inputs (.label_index.pkl) and only
+          re-reads workbooks that were added or changed since the last run.
+        - Without a query, just updates the index.
+        """
+    )
+    parser.add_argument("query", nargs="*", help="Words to look for (e.g. cuentas comerciales por cobrar).")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input_dir", type=str, help="Directory containing flattened (cleaned) Excel files.")
+    source.add_argument("--db", type=str, help="SQLite cell store built by export_sqlite.py (not cached).")
+    parser.add_argument("--index", type=str, help="Index file (default: input_dir/.label_index.pkl).")
+    parser.add_argument("--report", type=str, help="Only paths of this report (e.g. Estado_de_situacion_financiera).")
+    parser.add_argument("--kind", choices=["row", "col"], help="Only row paths or only column paths.")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum number of results.")
+    parser.add_argument("--interactive", action="store_true", help="Keep prompting for queries.")
+
+    args = parser.parse_args()
+
+    try:
+        t0 = time.perf_counter()
+        if args.db:
+            index = LabelIndex()
+            index.add_store(Path(args.db))
+        else:
+            input_dir = Path(args.input_dir).resolve()
+            index_path = Path(args.index) if args.index else input_dir / INDEX_NAME
+            index = LabelIndex.load(index_path)
+            counts = index.update(input_dir)
+            if counts["added"] or counts["updated"] or counts["removed"]:
+                index.save(index_path)
+            logger.info(
+                f"Index: {counts['added']} added, {counts['updated']} updated, "
+                f"{counts['removed']} removed, {counts['unchanged']} unchanged"
+            )
+        logger.info(f"{len(index)} paths indexed in {time.perf_counter() - t0:.2f}s")
+
+        queries = [" ".join(args.query)] if args.query else []
+        while True:
+            for q in queries:
+                t1 = time.perf_counter()
+                hits = index.search(q, report=args.report, kind=args.kind, limit=args.limit)
+                print_hits(hits)
+                print(f"({(time.perf_counter() - t1) * 1000:.1f} ms)")
+            if not args.interactive:
+                break
+            try:
+                queries = [input("\n🔎 ").strip()]
+            except EOFError:
+                break
+            if not queries[0]:
+                break
+
+    except Exception as e:
+        logger.error(f"Search failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from QueryServer import QueryServer
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Serve a directory of JSON outputs over local HTTP (use QueryClient from notebooks).
+        - Parsed trees are cached in memory (LRU, bounded by --cache_mb).
+        - Rewritten files are detected by mtime and re-parsed on next access.
+        """
+    )
+    parser.add_argument("--json_dir", type=str, required=True, help="Directory with JSON outputs (any codec).")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Bind address (default: localhost only).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument("--cache_mb", type=float, default=512, help="Memory budget for parsed trees, in MiB.")
+    parser.add_argument("--load_workers", type=int, default=4, help="Threads used to parse files.")
+    args = parser.parse_args()
+
+    json_dir = Path(args.json_dir).resolve()
+    if not json_dir.is_dir():
+        logger.error(f"Not a directory: {json_dir}")
+        sys.exit(1)
+
+    server = QueryServer(json_dir, cache_bytes=int(args.cache_mb * 2**20), load_workers=args.load_workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info("Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
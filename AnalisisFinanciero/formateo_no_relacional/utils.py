@@ -1,5 +1,8 @@
 import argparse
 import logging
+import os
+from contextlib import contextmanager
+from functools import partial
 import sys
 import json
 from pathlib import Path
@@ -7,6 +10,10 @@ from typing import Dict, List, Any, Optional
 import pandas as pd
 import numpy as np
 import datetime as dt
+import re
+import unicodedata
+from ParallelMap import *
+from FilingNames import *
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -50,4 +57,28 @@ def split_path(label: str) -> List[str]:
     """Split 'A.B.C' → ['A','B','C'], trimming and filtering empty parts."""
     if not label or not str(label).strip():
         return []
-    return [p.strip() for p in str(label).split(".") if p.strip()]
\ No newline at end of file
+    return [p.strip() for p in str(label).split(".") if p.strip()]
+
+
+def normalize_text(s: str) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    s = unicodedata.normalize("NFKD", str(s))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.lower().split())
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yield a temporary sibling path and move it over `path` only if the block succeeds,
+    so readers never see a half-written output. The '~$' prefix (Excel's lock-file
+    convention) keeps the temporary file out of is_excel_file() listings.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"~${os.getpid()}_{path.name}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
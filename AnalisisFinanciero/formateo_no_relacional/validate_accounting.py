@@ -0,0 +1,69 @@
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from AccountingValidator import *
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Check accounting identities (roll-forwards, totals) across every filing.
+        - Rules are declared in a JSON file (default: accounting_rules.json).
+        - Reads flattened Excel files or a SQLite cell store (export_sqlite.py).
+        - Exits with status 2 when any filing violates a rule.
+        """
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input_dir", type=str, help="Directory containing flattened (cleaned) Excel files.")
+    source.add_argument("--db", type=str, help="SQLite cell store built by export_sqlite.py.")
+    parser.add_argument("--rules", type=str, default=str(DEFAULT_RULES), help="Rules JSON file.")
+    parser.add_argument("--output", type=str, help="Write the per-filing report to this JSON file.")
+
+    args = parser.parse_args()
+
+    try:
+        validator = AccountingValidator.from_file(Path(args.rules))
+
+        t0 = time.perf_counter()
+        cells = load_cells_from_store(Path(args.db)) if args.db else load_cells_from_dir(Path(args.input_dir))
+        t1 = time.perf_counter()
+        violations = validator.validate(cells)
+        t2 = time.perf_counter()
+
+        report = AccountingValidator.report(violations, validator.checked_filings(cells))
+        if args.output:
+            with atomic_output(Path(args.output)) as tmp:
+                tmp.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        failed = [r for r in report if r["status"] == "failed"]
+        print("\n" + "=" * 60)
+        print("ACCOUNTING CHECKS SUMMARY")
+        print("=" * 60)
+        print(f"Rules:    {len(validator.rules)}")
+        print(f"Cells:    {len(cells)} (loaded in {t1 - t0:.2f}s, checked in {t2 - t1:.3f}s)")
+        print(f"Filings:  {len(report)} checked, {len(failed)} with violations")
+        for r in failed:
+            print(f"❌ {r['nit']} {r['period']} {r['report']}")
+            for v in r["violations"]:
+                print(f"   {v['rule']} [{v['column']}]: residual {v['residual']:,.2f}")
+        if args.output:
+            print(f"📁 Report: {Path(args.output).resolve()}")
+
+    except Exception as e:
+        logger.error(f"Fatal error during validation: {e}")
+        sys.exit(1)
+
+    if failed:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
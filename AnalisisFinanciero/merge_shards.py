@@ -0,0 +1,244 @@
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from stage_loader import STAGE_DIRS
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+SHARDS_DIR = "shards"  # written by the stages' FilingSelection.run_file()
+# run name (summary/journal prefix) → journal written by that stage, if any
+RUNS = {
+    "processing": "processing_journal.jsonl",
+    "cleaning": None,
+    "conversion": "conversion_journal.jsonl",
+}
+# CLI stage name → (stage folder, script, run name)
+STAGES = {
+    "flatten": ("procesador", "flatten_excel.py", "processing"),
+    "transform": ("transformador", "main.py", "cleaning"),
+    "json": ("formateo", "main.py", "conversion"),
+}
+SHARD_FILE_RE = re.compile(
+    r"^(?P<run>[a-z]+)_(?P<kind>summary|journal|manifest)\.(?P<i>\d+)-of-(?P<n>\d+)\.(?P<ext>jsonl?)$"
+)
+
+
+# ----------------- Collecting Shards -----------------
+def find_shards(dirs: List[Path]) -> Dict[str, Dict[Tuple[int, int], Dict[str, Path]]]:
+    """{run: {(i, N): {"summary"|"journal"|"manifest": path}}} from the shards/ folders of `dirs`."""
+    found: Dict[str, Dict[Tuple[int, int], Dict[str, Path]]] = {}
+    for d in dirs:
+        folder = Path(d) / SHARDS_DIR
+        if not folder.is_dir():
+            continue
+        for f in sorted(folder.iterdir()):
+            m = SHARD_FILE_RE.match(f.name)
+            if not m or m["run"] not in RUNS:
+                continue
+            key = (int(m["i"]), int(m["n"]))
+            kinds = found.setdefault(m["run"], {}).setdefault(key, {})
+            if m["kind"] in kinds:
+                logger.warning(f"Shard {key[0]}/{key[1]} of '{m['run']}' found twice; using {kinds[m['kind']]}")
+                continue
+            kinds[m["kind"]] = f
+    return found
+
+
+def _read_json(path: Path) -> Any:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _read_journal(path: Path) -> List[Dict[str, Any]]:
+    entries = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # torn last line from a crash
+    return entries
+
+
+# ----------------- Merging -----------------
+def check_run(run: str, shards: Dict[Tuple[int, int], Dict[str, Path]]) -> Dict[str, Any]:
+    """
+    Load and cross-check the shards of one run. Returns {"counts", "summaries",
+    "journal", "problems", "shards"}; problems is empty when every shard 1..N is
+    present, finished, and the shards cover the selection exactly once.
+    """
+    problems = []
+    counts = sorted({n for _, n in shards})
+    if len(counts) > 1:
+        problems.append(f"mixed shard counts {counts} (leftovers from another run?)")
+    n = counts[-1]
+
+    owner: Dict[str, int] = {}
+    selected = set()
+    summaries, journal, done = [], [], []
+    for i in range(1, n + 1):
+        files = shards.get((i, n), {})
+        if "manifest" not in files:
+            problems.append(f"shard {i}/{n}: no manifest (not started?)")
+            continue
+        manifest = _read_json(files["manifest"])
+        selected.add(manifest["selected"])
+        for f in manifest["files"]:
+            if f in owner:
+                problems.append(f"shard {i}/{n}: {Path(f).name} also in shard {owner[f]}/{n}")
+            owner[f] = i
+        if manifest["files"] and "summary" not in files:
+            problems.append(f"shard {i}/{n}: no summary (still running or failed)")
+            continue
+        summaries += _read_json(files["summary"]) if "summary" in files else []
+        journal += _read_journal(files["journal"]) if "journal" in files else []
+        done.append(i)
+
+    if len(selected) > 1:
+        problems.append(f"shards disagree on the selection size {sorted(selected)} (different inputs or flags?)")
+    elif selected and len(owner) != next(iter(selected)):
+        problems.append(f"shards own {len(owner)} file(s), the selection has {next(iter(selected))}")
+
+    # Same order as an unsharded run (files are processed sorted by path)
+    summaries.sort(key=lambda s: Path(s.get("input", "")))
+    journal.sort(key=lambda e: Path(e.get("input", "")))
+    return {"run": run, "shards": n, "done": done, "files": len(owner), "summaries": summaries,
+            "journal": journal, "problems": problems}
+
+
+def write_json_atomic(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def write_merged(result: Dict[str, Any], into: Path) -> List[Path]:
+    """Write the run's summary (and journal) where an unsharded run would have put them."""
+    into.mkdir(parents=True, exist_ok=True)
+    summary_path = into / f"{result['run']}_summary.json"
+    write_json_atomic(summary_path, json.dumps(result["summaries"], indent=2, ensure_ascii=False))
+    written = [summary_path]
+    journal_name = RUNS[result["run"]]
+    if journal_name and result["journal"]:
+        # An unsharded --resume run picks up from the merged journal
+        journal_path = into / journal_name
+        write_json_atomic(journal_path, "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in result["journal"]))
+        written.append(journal_path)
+    return written
+
+
+def merge(dirs: List[Path], into: Path, allow_partial: bool = False,
+          runs: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Check and merge every sharded run found under `dirs`; incomplete runs are only written with allow_partial."""
+    found = find_shards(dirs)
+    results = []
+    for run in runs or sorted(found):
+        if run not in found:
+            results.append({"run": run, "shards": 0, "done": [], "files": 0, "summaries": [],
+                            "problems": ["no shard files found"], "written": []})
+            continue
+        result = check_run(run, found[run])
+        result["written"] = write_merged(result, into) if allow_partial or not result["problems"] else []
+        results.append(result)
+    return results
+
+
+# ----------------- Local Runs -----------------
+def run_local(stage: str, count: int, stage_args: List[str], log_dir: Path) -> List[Tuple[int, int, float]]:
+    """Run shards 1..count of a stage as parallel processes on this machine; returns (i, exit code, seconds)."""
+    folder, script, _ = STAGES[stage]
+    log_dir.mkdir(parents=True, exist_ok=True)
+    procs = []
+    for i in range(1, count + 1):
+        # Run from the caller's directory so relative stage arguments resolve as typed;
+        # the stage's own modules are found because the script's folder is sys.path[0]
+        cmd = [sys.executable, str(STAGE_DIRS[folder] / script), *stage_args, "--shard", f"{i}/{count}"]
+        log = open(log_dir / f"{stage}.{i}-of-{count}.log", "w", encoding="utf-8")
+        procs.append((i, subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT), log, time.perf_counter()))
+    results = []
+    for i, proc, log, t0 in procs:
+        code = proc.wait()
+        log.close()
+        results.append((i, code, time.perf_counter() - t0))
+    return results
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Combine the runs of a stage split with --shard i/N into one summary.
+        - merge: check that shards 1..N all finished and cover the selection exactly once,
+          then write processing/cleaning/conversion summaries (and journals) as an
+          unsharded run would.
+        - local: run N shards of a stage as processes on this machine, then merge.
+        """
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_merge = sub.add_parser("merge", help="Merge the shards found in one or more output directories.")
+    p_merge.add_argument("dirs", nargs="+", help="Output directories holding shards/ (one per node, or shared).")
+    p_merge.add_argument("--into", type=str, help="Where to write the merged files (default: the first directory).")
+    p_merge.add_argument("--allow_partial", action="store_true", help="Write the merge even if shards are missing.")
+
+    p_local = sub.add_parser("local", help="Run N shards of one stage in parallel here, then merge.")
+    p_local.add_argument("--stage", choices=list(STAGES), required=True)
+    p_local.add_argument("--shards", type=int, required=True, help="Number of shard processes.")
+    p_local.add_argument("--output_dir", type=str, required=True,
+                         help="The stage's output directory (where its shards/ folder is written).")
+    p_local.add_argument("stage_args", nargs=argparse.REMAINDER,
+                         help="Arguments for the stage script, after '--' (e.g. -- --input_dir data).")
+
+    args = parser.parse_args()
+
+    launched = []
+    if args.command == "local":
+        if args.shards < 1:
+            logger.error("--shards must be at least 1")
+            sys.exit(1)
+        stage_args = args.stage_args[1:] if args.stage_args[:1] == ["--"] else args.stage_args
+        dirs = [Path(args.output_dir).resolve()]
+        launched = run_local(args.stage, args.shards, stage_args, dirs[0] / SHARDS_DIR)
+        runs = [STAGES[args.stage][2]]
+        into = dirs[0]
+    else:
+        dirs = [Path(d).resolve() for d in args.dirs]
+        runs = None
+        into = Path(args.into).resolve() if args.into else dirs[0]
+
+    failed_procs = [(i, code) for i, code, _ in launched if code != 0]
+    try:
+        results = merge(dirs, into, getattr(args, "allow_partial", False), runs)
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        sys.exit(1)
+
+    # Final summary
+    print("\n" + "=" * 60)
+    print("SHARD MERGE SUMMARY")
+    print("=" * 60)
+    for i, code, seconds in launched:
+        print(f"  shard {i}/{len(launched)}: exit {code} ({seconds:.2f}s)")
+    if not results:
+        print(f"No shards found under {', '.join(str(d) for d in dirs)}")
+    for r in results:
+        status = "✅" if not r["problems"] else "❌"
+        print(f"{status} {r['run']}: {len(r['done'])}/{r['shards']} shard(s), {r['files']} file(s), "
+              f"{len(r['summaries'])} summary entr(ies)")
+        for msg in r["problems"]:
+            print(f"    - {msg}")
+        for path in r["written"]:
+            print(f"    → {path}")
+    if failed_procs or not results or any(r["problems"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
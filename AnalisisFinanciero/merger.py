@@ -1,15 +1,31 @@
 from __future__ import annotations
-import json
+import sys
 from pathlib import Path
 from typing import Iterable, Union, Dict, Any
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "formateo_no_relacional"))
+from JsonCodec import get_codec, loads_any, detect_codec, is_codec_file, strip_codec_suffix
+from ContentStore import ContentStore, is_manifest, rebase_manifest
+
 PathLike = Union[str, Path]
 
+TEXT_CODECS = ("pretty", "compact")  # plain JSON text; `encoding` applies to these
+
+
+def _utf8(raw: bytes, encoding: str) -> bytes:
+    """Plain JSON text re-encoded from `encoding` to UTF-8; compressed/binary payloads unchanged."""
+    if encoding.lower().replace("-", "").replace("_", "") == "utf8" or detect_codec(raw).name not in TEXT_CODECS:
+        return raw
+    return raw.decode(encoding).encode("utf-8")
+
+
 def bundle_json_files(
     files: Iterable[PathLike],
     output_path: PathLike | None = None,
     key: str | callable = "stem",
     encoding: str = "utf-8",
+    codec: str = "pretty",
+    store: PathLike | None = None,
 ) -> Dict[str, Any]:
     """
     Combine multiple JSON files into a single dict: {<file-key>: <file-content>}.
@@ -18,37 +34,57 @@ def bundle_json_files(
         files: Iterable of file paths (e.g., list[PathLike] or Path.glob()).
         output_path: If provided, write the bundled JSON to this path.
         key: How to derive the dict key from each file path:
-             - "stem" -> filename without extension (default)
+             - "stem" -> filename without extension (default; codec suffixes count as one:
+                         "a.json.gz" -> "a")
              - "name" -> filename with extension
              - "path" -> full path string
              - callable(Path) -> custom key function
-        encoding: File encoding for reading/writing.
+        encoding: Text encoding of plain JSON inputs and of a "pretty"/"compact" output
+                  (compressed and binary codecs always hold UTF-8).
+        codec: Output codec for output_path ("pretty", "compact", "gzip", "lzma", "binary").
+               Inputs are decoded with whatever codec wrote them (auto-detected).
+        store: Content store directory (see formateo_no_relacional/ContentStore.py). The bundle
+               then holds references instead of copies: outputs that are already manifests
+               are re-pointed at their store, other files are stored once there.
+               Requires output_path; load_any() of the bundle resolves the references.
 
     Returns:
-        Dict mapping computed keys to parsed JSON contents.
+        Dict mapping computed keys to parsed JSON contents (the references, with store).
 
     Notes:
         - If two files resolve to the same key, a suffix like "#2", "#3" is appended.
-        - Raises ValueError if any file is not valid JSON.
+        - Raises ValueError if any file is not valid JSON (or cannot be decoded).
     """
     result: Dict[str, Any] = {}
+    if store is not None and not output_path:
+        raise ValueError("store requires output_path (references are relative to the bundle)")
+    content_store = ContentStore(store, codec) if store is not None else None
 
     for f in files:
         p = Path(f)
         if not p.is_file():
             raise FileNotFoundError(f"Not a file: {p}")
 
-        with p.open("r", encoding=encoding) as fh:
-            try:
-                data = json.load(fh)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON in {p}: {e}") from e
+        try:
+            raw = _utf8(p.read_bytes(), encoding)
+            if content_store is None:
+                data = loads_any(raw, base=p.parent)
+            else:
+                data = detect_codec(raw).loads(raw)
+                if is_manifest(data) and data.get("kind") == "nested":
+                    data = rebase_manifest(data, p.parent, Path(output_path).parent)
+                else:
+                    digest, _ = content_store.put(loads_any(raw, base=p.parent))
+                    data = content_store.manifest("tree", [(strip_codec_suffix(p.name), digest)],
+                                                  Path(output_path).parent)
+        except ValueError as e:  # JSONDecodeError is a ValueError
+            raise ValueError(f"Invalid JSON in {p}: {e}") from e
 
         # Compute the key
         if callable(key):
             k = key(p)
         elif key == "stem":
-            k = p.stem
+            k = strip_codec_suffix(p.name) if is_codec_file(p) else p.stem
         elif key == "name":
             k = p.name
         elif key == "path":
@@ -70,24 +106,26 @@ def bundle_json_files(
     if output_path:
         out = Path(output_path)
         out.parent.mkdir(parents=True, exist_ok=True)
-        with out.open("w", encoding=encoding) as fo:
-            json.dump(result, fo, indent=2, ensure_ascii=False)
+        out_codec = get_codec(codec)
+        if out_codec.name in TEXT_CODECS:
+            out.write_bytes(out_codec.dumps(result).decode("utf-8").encode(encoding))
+        else:
+            out_codec.dump(result, out)
 
     return result
 
 
-from pathlib import Path
-
-# 1) Bundle all JSON files in a folder, keys are filenames (without .json)
-files = Path(r"C:\Users\Usuario\Documents\Repositorios\Maestria\AnalisisFinanciero\data\json").glob("*.json")
-bundle = bundle_json_files(files, output_path="bundle.json")
+if __name__ == "__main__":
+    # 1) Bundle all JSON files in a folder, keys are filenames (without .json)
+    files = Path(r"C:\Users\Usuario\Documents\Repositorios\Maestria\AnalisisFinanciero\data\json").glob("*.json")
+    bundle = bundle_json_files(files, output_path="bundle.json")
 
-# 2) Use filenames WITH extension as keys
-files = ["a.json", "b.json", "c.json"]
-bundle = bundle_json_files(files, key="name")
+    # 2) Use filenames WITH extension as keys
+    files = ["a.json", "b.json", "c.json"]
+    bundle = bundle_json_files(files, key="name")
 
-# 3) Custom key (e.g., include parent folder name)
-bundle = bundle_json_files(
-    Path("data").glob("*.json"),
-    key=lambda p: f"{p.parent.name}/{p.stem}"
-)
+    # 3) Custom key (e.g., include parent folder name)
+    bundle = bundle_json_files(
+        Path("data").glob("*.json"),
+        key=lambda p: f"{p.parent.name}/{p.stem}"
+    )
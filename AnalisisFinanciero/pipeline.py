@@ -0,0 +1,362 @@
+import argparse
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Iterable, Optional, Tuple
+from stage_loader import load_stage_module
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # end-of-stream marker passed down the queues
+
+
+# ----------------- Stage Pipeline -----------------
+class Stage:
+    """One step of the pipeline: `workers` threads applying fn to jobs from `inbox` into `outbox`."""
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], None], workers: int = 1):
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least one worker")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.inbox: Optional[queue.Queue] = None
+        self.outbox: Optional[queue.Queue] = None
+        self.lock = threading.Lock()
+        self.running = 0
+        # Seconds summed over workers: working, waiting for input, waiting for room downstream
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.jobs = 0
+        self.max_depth = 0
+
+    def _worker(self):
+        while True:
+            t0 = time.perf_counter()
+            job = self.inbox.get()
+            t1 = time.perf_counter()
+            if job is _DONE:
+                self.inbox.put(_DONE)  # let the sibling workers see it too
+                break
+            if job["error"] is None:
+                try:
+                    self.fn(job)
+                except Exception as e:
+                    logger.error(f"[{self.name}] {job['input'].name}: {e}")
+                    job["error"] = e
+            t2 = time.perf_counter()
+            job["stages"][self.name] = job["stages"].get(self.name, 0.0) + t2 - t1
+            self.outbox.put(job)  # blocks while the next stage is behind (backpressure)
+            t3 = time.perf_counter()
+            with self.lock:
+                self.starved += t1 - t0
+                self.busy += t2 - t1
+                self.blocked += t3 - t2
+                self.jobs += 1
+                self.max_depth = max(self.max_depth, self.inbox.qsize())
+        with self.lock:
+            self.running -= 1
+            last = self.running == 0
+        if last:
+            self.outbox.put(_DONE)
+
+    def start(self) -> List[threading.Thread]:
+        self.running = self.workers
+        threads = [threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def report(self, wall: float) -> Dict[str, Any]:
+        capacity = self.workers * wall if wall > 0 else 0.0
+        return {
+            "workers": self.workers,
+            "jobs": self.jobs,
+            "busy_s": round(self.busy, 4),
+            "utilization": round(self.busy / capacity, 4) if capacity else 0.0,
+            "starved": round(self.starved / capacity, 4) if capacity else 0.0,
+            "blocked": round(self.blocked / capacity, 4) if capacity else 0.0,
+            "max_queue_depth": self.max_depth,
+        }
+
+
+class StagePipeline:
+    """
+    Run jobs through a chain of stages connected by bounded queues.
+
+    Every stage has its own thread pool; a full queue blocks the stage feeding it,
+    so a slow step throttles the ones before it instead of letting finished work
+    pile up in memory (at most queue_size jobs wait between two stages). Jobs are
+    dicts with "input", "error" and "stages" ({stage: seconds}); a stage that
+    raises marks the job failed and later stages pass it through untouched.
+    Results are yielded in completion order.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 2):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.wall = 0.0
+
+    def run(self, inputs: Iterable[Path]) -> Iterable[Dict[str, Any]]:
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        for stage, inbox, outbox in zip(self.stages, queues, queues[1:]):
+            stage.inbox, stage.outbox = inbox, outbox
+            stage.start()
+
+        def feed():
+            for path in inputs:
+                queues[0].put({"input": Path(path), "error": None, "stages": {}})
+            queues[0].put(_DONE)
+
+        t0 = time.perf_counter()
+        threading.Thread(target=feed, name="feed", daemon=True).start()
+        try:
+            while True:
+                job = queues[-1].get()
+                if job is _DONE:
+                    break
+                yield job
+        finally:
+            self.wall = time.perf_counter() - t0
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage utilization over the last run; the bottleneck is the stage with the highest."""
+        return {s.name: s.report(self.wall) for s in self.stages}
+
+
+# ----------------- Workbook → JSON Pipeline -----------------
+def excel_numbers(tree: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Integral floats → int, in place. Excel keeps no int/float distinction and the
+    readers give whole numbers back as int, so this makes in-memory trees serialize
+    exactly like trees read back from the intermediate workbooks (7714331, not 7714331.0).
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for key, value in node.items():
+            if isinstance(value, dict):
+                stack.append(value)
+            elif isinstance(value, float) and value.is_integer():
+                node[key] = int(value)
+    return tree
+
+
+class WorkbookPipeline:
+    """
+    flatten → clean → json for a folder of workbooks, in one process and without the
+    intermediate Excel files: read (parse the workbook), flatten (ExcelFlattener),
+    clean (ColumnCleaner), convert (SheetToJsonConverter, sheets merged in order)
+    and write (JSON codec). Sheets travel between stages as FlatSheets, so output
+    trees equal those of the three stage CLIs run one after the other; output names
+    match too (<stem>_flattened<codec suffix>).
+    """
+
+    STAGES = ("read", "flatten", "clean", "convert", "write")
+
+    def __init__(self, output_dir: Path, workers: Optional[Dict[str, int]] = None, queue_size: int = 2,
+                 keep_all_columns: bool = False, engine: str = "openpyxl", codec: str = "pretty",
+                 metrics_dir: Optional[Path] = None, metrics_interval: float = 10.0, progress: bool = False):
+        flattener_mod = load_stage_module("procesador", "excel_flattener")
+        self.open_workbook = load_stage_module("formateo", "XlsxStreamReader").open_workbook
+        self.flattener = flattener_mod.ExcelFlattener(keep_all_columns=keep_all_columns, engine=engine)
+        self.cleaner = load_stage_module("transformador", "column_cleaner").ColumnCleaner()
+        sheet_json = load_stage_module("formateo", "SheetToJsonConverter")
+        self.sheet_converter = sheet_json.SheetToJsonConverter()
+        self.deep_merge = sheet_json.NestedDictBuilder.deep_merge
+        self.codec = load_stage_module("formateo", "JsonCodec").get_codec(codec)
+        self.atomic_output = load_stage_module("formateo", "utils").atomic_output
+        self.run_metrics = load_stage_module("formateo", "RunMetrics").RunMetrics
+
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        workers = workers or {}
+        self.steps = {"read": self._read, "flatten": self._flatten, "clean": self._clean,
+                      "convert": self._convert, "write": self._write}
+        self.pipeline = StagePipeline([Stage(name, self.steps[name], workers.get(name, 1)) for name in self.STAGES],
+                                      queue_size)
+        self.metrics_dir = metrics_dir
+        self.metrics_interval = metrics_interval
+        self.progress = progress
+        self.metrics = None
+
+    # -- stages --
+    def _read(self, job):
+        path = job["input"]
+        with self.open_workbook(path, self.flattener.engine) as xl:
+            job["sheets"] = []
+            for sheet in xl.sheet_names:
+                try:
+                    job["sheets"].append((sheet, self.flattener.read_raw(path, sheet, xl=xl)))
+                except Exception:
+                    continue  # logged by read_raw; the other sheets are still converted
+
+    def _each_sheet(self, job, fn):
+        """Apply fn to every sheet; a failing sheet is logged and dropped, as the stage CLIs do."""
+        done = []
+        for sheet, data in job["sheets"]:
+            try:
+                done.append((sheet, fn(sheet, data)))
+            except Exception as e:
+                logger.error(f"Failed to process sheet '{sheet}' in {job['input'].name}: {e}")
+        job["sheets"] = done
+
+    def _flatten(self, job):
+        self._each_sheet(job, lambda sheet, raw: self.flattener.flatten_frame(raw, job["input"], sheet))
+        job["cells"] = sum(int(flat.shape[0] * flat.shape[1]) for _, flat in job["sheets"])
+
+    def _clean(self, job):
+        self._each_sheet(job, lambda sheet, flat: self.cleaner.clean_columns(flat)[0])
+
+    def _convert(self, job):
+        tree = {}
+        for sheet, flat in job.pop("sheets"):
+            self.deep_merge(tree, self.sheet_converter.convert(flat))
+        job["tree"] = excel_numbers(tree)
+
+    def _write(self, job):
+        output_path = self.output_dir / f"{job['input'].stem}_flattened{self.codec.suffix}"
+        with self.atomic_output(output_path) as tmp_path:
+            self.codec.dump(job.pop("tree"), tmp_path)
+        job["output"] = output_path
+
+    # -- running --
+    @staticmethod
+    def _summary(job: Dict[str, Any]) -> Dict[str, Any]:
+        summary = {
+            "input": str(job["input"]),
+            "output": str(job["output"]) if job["error"] is None else None,
+            "status": "failed" if job["error"] is not None else "ok",
+            "cells": job.get("cells", 0),
+            "stages": {k: round(v, 4) for k, v in job["stages"].items()},
+        }
+        if job["error"] is not None:
+            summary["error"] = str(job["error"])
+        return summary
+
+    def process_file(self, path: Path) -> Dict[str, Any]:
+        """
+        All steps for one file in the calling thread, for callers that bring their own
+        workers (watch_folder.py); same output and summary as run().
+        """
+        job = {"input": Path(path), "error": None, "stages": {}}
+        for name in self.STAGES:
+            t0 = time.perf_counter()
+            try:
+                self.steps[name](job)
+            except Exception as e:
+                logger.error(f"[{name}] {job['input'].name}: {e}")
+                job["error"] = e
+                break
+            finally:
+                job["stages"][name] = time.perf_counter() - t0
+        return self._summary(job)
+
+    def run(self, files: List[Path]) -> List[Dict[str, Any]]:
+        """Process all files; returns one summary per file (sorted by input)."""
+        self.metrics = self.run_metrics("pipeline", len(files), self.metrics_dir, self.metrics_interval, self.progress)
+        self.metrics.tick(force=True)
+        summaries = []
+        t0 = time.perf_counter()
+        try:
+            for job in self.pipeline.run(files):
+                summary = self._summary(job)
+                if job["error"] is None:
+                    logger.info(f"✔ JSON saved: {summary['output']}")
+                summaries.append(summary)
+                self.metrics.observe_file(job["input"], summary, job["error"], sum(job["stages"].values()))
+        finally:
+            self.metrics.close()
+        self.elapsed = time.perf_counter() - t0
+        return sorted(summaries, key=lambda s: s["input"])
+
+    def utilization(self) -> Dict[str, Dict[str, Any]]:
+        return self.pipeline.report()
+
+
+# ----------------- CLI Interface -----------------
+def _stage_workers(args) -> Dict[str, int]:
+    return {name: getattr(args, f"{name}_workers") for name in WorkbookPipeline.STAGES}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Run flatten → clean → json on a folder of workbooks as one pipeline.
+        - Each step has its own worker threads; bounded queues between steps apply
+          backpressure, so files overlap across steps without piling up in memory.
+        - No intermediate Excel files: outputs equal running the three stage CLIs in a row.
+        - Reports per-step utilization to show which step to give more workers.
+        """
+    )
+    parser.add_argument("--input_dir", type=str, required=True, help="Folder with the original Excel files.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Folder for the JSON outputs.")
+    for name, default in zip(WorkbookPipeline.STAGES, (1, 2, 1, 2, 1)):
+        parser.add_argument(f"--{name}_workers", type=int, default=default, help=f"Worker threads for '{name}'.")
+    parser.add_argument("--queue_size", type=int, default=2, help="Files allowed to wait between two steps.")
+    parser.add_argument("--keep_all_columns", action="store_true", help="Keep all columns even if fully blank.")
+    parser.add_argument("--engine", choices=["openpyxl", "stream"], default="openpyxl",
+                        help="Workbook reader; 'stream' parses the sheet XML directly (faster).")
+    parser.add_argument("--codec", type=str, default="pretty", help="Output codec (see formateo_no_relacional/JsonCodec.py).")
+    parser.add_argument("--report", type=str, help="Write per-file summaries and step utilization here (JSON).")
+    parser.add_argument("--metrics_dir", type=str, help="Export live metrics (pipeline.prom / pipeline.json) here.")
+    parser.add_argument("--metrics_interval", type=float, default=10.0, help="Seconds between metrics exports.")
+    parser.add_argument("--progress", action="store_true", help="Print a progress line while running.")
+
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir).resolve()
+    if not input_dir.is_dir():
+        logger.error(f"Input directory not found: {input_dir}")
+        sys.exit(1)
+    files = sorted(p for p in input_dir.iterdir()
+                   if p.is_file() and p.suffix.lower() in (".xlsx", ".xlsm") and not p.name.startswith("~$"))
+    if not files:
+        logger.info(f"No Excel files found in {input_dir}")
+        return
+
+    try:
+        runner = WorkbookPipeline(Path(args.output_dir).resolve(), _stage_workers(args), args.queue_size,
+                                  args.keep_all_columns, args.engine, args.codec,
+                                  Path(args.metrics_dir) if args.metrics_dir else None,
+                                  args.metrics_interval, args.progress)
+        summaries = runner.run(files)
+    except Exception as e:
+        logger.error(f"Pipeline failed: {e}")
+        sys.exit(1)
+
+    utilization = runner.utilization()
+    if args.report:
+        Path(args.report).write_text(json.dumps({"files": summaries, "stages": utilization}, indent=2,
+                                                ensure_ascii=False), encoding="utf-8")
+
+    # Final summary
+    ok = sum(1 for s in summaries if s["status"] == "ok")
+    print("\n" + "=" * 60)
+    print("PIPELINE SUMMARY")
+    print("=" * 60)
+    print(f"✅ Files converted: {ok}/{len(summaries)} in {runner.elapsed:.2f}s")
+    print(f"{'step':<10}{'workers':>8}{'busy':>9}{'starved':>9}{'blocked':>9}{'max queue':>11}")
+    for name, u in utilization.items():
+        print(f"{name:<10}{u['workers']:>8}{u['utilization']:>9.0%}{u['starved']:>9.0%}{u['blocked']:>9.0%}"
+              f"{u['max_queue_depth']:>11}")
+    bottleneck = max(utilization, key=lambda n: utilization[n]["utilization"])
+    print(f"🐢 Bottleneck: {bottleneck} (consider --{bottleneck}_workers)")
+    print(f"⏱ {runner.metrics.progress_line()}")
+    for s in summaries:
+        if s["status"] != "ok":
+            print(f"❌ {Path(s['input']).name}: {s.get('error')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,11 @@ from pathlib import Path
 import pandas as pd
 from utils import *
 from excel_flattener import ExcelFlattener
+from XlsxStreamReader import open_workbook
+from RunMetrics import RunMetrics, stage_timer
+from BatchJournal import BatchJournal
+from CostAwareScheduler import CostAwareScheduler
+from FilingSelection import FilingSelection
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -13,18 +18,44 @@ logger = logging.getLogger(__name__)
 class BatchProcessor:
     """Processes a folder of Excel files and flattens all sheets."""
 
-    def __init__(self, input_dir, output_subdir="flattened", keep_all_columns=False, verbose=False):
+    JOURNAL_NAME = "processing_journal.jsonl"
+    SUMMARY_NAME = "processing_summary.json"
+
+    def __init__(self, input_dir, output_subdir="flattened", keep_all_columns=False, verbose=False,
+                 sheet_workers=1, sheet_executor="thread", resume=False,
+                 workers=1, memory_budget_mb=None, engine="openpyxl",
+                 metrics_dir=None, metrics_interval=10.0, progress=False, selection=None):
         self.input_dir = Path(input_dir)
         self.output_subdir = output_subdir
         self.keep_all_columns = keep_all_columns
         self.verbose = verbose
-        self.flattener = ExcelFlattener(keep_all_columns=keep_all_columns)
+        self.flattener = ExcelFlattener(keep_all_columns=keep_all_columns, engine=engine)
+        # Sheets of one workbook are flattened concurrently when sheet_workers > 1
+        self.sheet_workers = sheet_workers
+        self.sheet_executor = sheet_executor
+        self.executor = None
 
         if not self.input_dir.exists():
             raise FileNotFoundError(f"Input directory not found: {self.input_dir}")
 
         self.out_dir = self.input_dir / output_subdir
         self.out_dir.mkdir(parents=True, exist_ok=True)
+        # Report/NIT/period/sheet/row predicates; pruning happens as early as each allows
+        self.selection = selection or FilingSelection()
+        # A shard (--shard i/N) keeps its summary and journal under out_dir/shards/
+        self.summary_path = self.selection.run_file(self.out_dir, self.SUMMARY_NAME)
+        journal_path = self.selection.run_file(self.out_dir, self.JOURNAL_NAME)
+        journal_path.parent.mkdir(parents=True, exist_ok=True)
+        # Timings from the previous run drive longest-first scheduling; read them before
+        # the journal is reset for a fresh run (a merged summary covers every shard)
+        self.history = CostAwareScheduler.load_history(self.out_dir / self.SUMMARY_NAME, journal_path)
+        self.journal = BatchJournal(journal_path, resume=resume)
+        self.scheduler = CostAwareScheduler(workers, memory_budget_mb, self.history)
+        # Throughput/latency metrics; created per run in process()
+        self.metrics_dir = metrics_dir
+        self.metrics_interval = metrics_interval
+        self.progress = progress
+        self.metrics = None
 
     def process(self, include_patterns=(".xlsx", ".xlsm")):
         """Process all matching files."""
@@ -33,53 +64,121 @@ class BatchProcessor:
             logger.info(f"No files found with patterns {include_patterns} in {self.input_dir}")
             return []
 
-        summaries = []
-
-        for f in sorted(files):
-            try:
-                xl = pd.ExcelFile(f, engine="openpyxl")
-            except Exception as e:
-                logger.error(f"Skipping {f.name}: cannot open → {e}")
-                continue
-
-            out_path = self.out_dir / (f.stem + "_flattened.xlsx")
-            sheet_summaries = []
-
-            with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-                for sheet in xl.sheet_names:
-                    try:
-                        df_flat, meta = self.flattener.flatten(f, sheet_name=sheet)
-                        sheetname = sanitize_sheet_name(f"flattened_{sheet}")
-                        df_flat.to_excel(writer, sheet_name=sheetname)
-
-                        sheet_summary = {
-                            "sheet": sheet,
-                            "rows": int(df_flat.shape[0]),
-                            "cols": int(df_flat.shape[1]),
-                            "row_levels": int(meta.get("row_levels", 0)),
-                            "col_levels": int(meta.get("col_levels", 0)),
-                        }
-                        if self.verbose:
-                            sheet_summary["explanation"] = meta.get("explanation", "")
-                        sheet_summaries.append(sheet_summary)
-
-                    except Exception as e:
-                        logger.error(f"Failed to process sheet '{sheet}' in {f.name}: {e}")
-                        continue
-
-            summary = {
-                "input": str(f),
-                "output": str(out_path),
-                "sheets": sheet_summaries
-            }
-            summaries.append(summary)
-
-            logger.info(f"✔ Saved: {out_path}")
-            for s in sheet_summaries:
-                logger.info(
-                    f"  - [{s['sheet']}] {s['rows']}×{s['cols']} "
-                    f"(row_levels={s['row_levels']}, col_levels={s['col_levels']})"
-                )
-
-        return summaries
+        candidates = sorted(files)
+        files = self.selection.select_files(candidates)
+        self.selection.write_manifest(self.out_dir, "processing", candidates, files)
+        pending = [f for f in files if not self.journal.is_done(f)]
+        self.metrics = RunMetrics("flatten", len(pending), self.metrics_dir, self.metrics_interval, self.progress)
+        self.metrics.tick(force=True)
+
+        try:
+            for f, summary, error, stats in self.scheduler.run(self._process_file, pending):
+                if error is not None:
+                    logger.error(f"Skipping {f.name}: {error}")
+                    summary = None
+                if summary is not None:
+                    summary["elapsed_s"] = stats["elapsed_s"]
+                self.journal.record(f, summary)
+                self.metrics.observe_file(f, summary, error, stats["elapsed_s"])
+        finally:
+            self.close()
+            self.metrics.close()
+
+        return self.journal.summaries(files)
+
+    def _process_file(self, f):
+        """Flatten every sheet of one workbook; returns its summary (None if it cannot be opened)."""
+        timings = {}
+        try:
+            with stage_timer(timings, "read"):
+                xl = open_workbook(f, self.flattener.engine)
+        except Exception as e:
+            logger.error(f"Skipping {f.name}: cannot open → {e}")
+            return None
+        with xl:  # releases the file handle (and the input, on Windows) once the sheets are read
+            return self._flatten_workbook(f, xl, timings)
+
+    def _flatten_workbook(self, f, xl, timings):
+        """Flatten the selected sheets of an open workbook into <stem>_flattened.xlsx; returns its summary."""
+        out_path = self.out_dir / (f.stem + "_flattened.xlsx")
+        sheet_summaries = []
+        sheet_names = self.selection.select_sheets(xl.sheet_names)
+        if not sheet_names:
+            logger.info(f"Skipping {f.name}: no sheet matches the selection")
+            return {"input": str(f), "output": None, "sheets": [], "cells": 0, "status": "skipped",
+                    "stages": {k: round(v, 4) for k, v in timings.items()}}
+        if self.executor is None:
+            self.executor = make_executor(self.sheet_workers, self.sheet_executor)
+
+        # Parse the workbook once, then flatten its sheets (possibly concurrently)
+        with stage_timer(timings, "read"):
+            raws = ordered_map(partial(self.flattener.read_raw, f, xl=xl), sheet_names)
+        readable = [(sheet, raw) for sheet, (raw, err) in zip(sheet_names, raws) if err is None]
+        with stage_timer(timings, "flatten"):
+            results = dict(zip(
+                [sheet for sheet, _ in readable],
+                ordered_map(
+                    self.flattener.flatten_frame,
+                    [raw for _, raw in readable],
+                    [f] * len(readable),
+                    [sheet for sheet, _ in readable],
+                    executor=self.executor,
+                ),
+            ))
+
+        with stage_timer(timings, "write"), atomic_output(out_path) as tmp_path, pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+            for sheet, (_, read_err) in zip(sheet_names, raws):
+                try:
+                    if read_err is not None:
+                        raise read_err
+                    flat, err = results[sheet]
+                    if err is not None:
+                        raise err
+                    flat = self.selection.select_rows(flat)
+                    sheetname = sanitize_sheet_name(f"flattened_{sheet}")
+                    flat.to_frame().to_excel(writer, sheet_name=sheetname)
+
+                    sheet_summary = {
+                        "sheet": sheet,
+                        "rows": int(flat.shape[0]),
+                        "cols": int(flat.shape[1]),
+                        "row_levels": flat.meta.row_levels,
+                        "col_levels": flat.meta.col_levels,
+                    }
+                    if self.verbose:
+                        sheet_summary["explanation"] = flat.meta.explanation
+                    sheet_summaries.append(sheet_summary)
+
+                except Exception as e:
+                    logger.error(f"Failed to process sheet '{sheet}' in {f.name}: {e}")
+                    continue
+
+        summary = {
+            "input": str(f),
+            "output": str(out_path),
+            "sheets": sheet_summaries,
+            "cells": sum(s["rows"] * s["cols"] for s in sheet_summaries),
+            "stages": {k: round(v, 4) for k, v in timings.items()},
+        }
+
+        logger.info(f"✔ Saved: {out_path}")
+        for s in sheet_summaries:
+            logger.info(
+                f"  - [{s['sheet']}] {s['rows']}×{s['cols']} "
+                f"(row_levels={s['row_levels']}, col_levels={s['col_levels']})"
+            )
+
+        return summary
+
+    def __getstate__(self):
+        # Worker pools cannot be pickled; file-level workers create their own
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
+
+    def close(self):
+        """Shut down the sheet worker pool, if any (it is recreated on next use)."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
 
@@ -0,0 +1,112 @@
+# flat_sheet.py
+
+from typing import List, Optional
+import pandas as pd
+import numpy as np
+
+
+class SheetMeta:
+    """Header-detection record of one flattened sheet."""
+
+    __slots__ = ("row_levels", "col_levels", "blank_top_rows", "blank_left_cols", "explanation")
+
+    def __init__(self, row_levels=0, col_levels=0, blank_top_rows=0, blank_left_cols=0, explanation=""):
+        self.row_levels = int(row_levels)
+        self.col_levels = int(col_levels)
+        self.blank_top_rows = int(blank_top_rows)
+        self.blank_left_cols = int(blank_left_cols)
+        self.explanation = explanation
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**{k: d[k] for k in cls.__slots__ if k in d})
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def get(self, key, default=None):
+        """dict-style access, so code written against the old meta dict keeps working."""
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return (f"SheetMeta(row_levels={self.row_levels}, col_levels={self.col_levels}, "
+                f"blank_top_rows={self.blank_top_rows}, blank_left_cols={self.blank_left_cols})")
+
+
+class FlatSheet:
+    """
+    Result of flattening one sheet: row labels, column labels and a 2-D value matrix.
+
+    `values` is float64 when every kept column is numeric, object otherwise. It is
+    allocated column-major, so to_frame() hands it to pandas as a single block
+    without copying. Downstream stages (ColumnCleaner, SheetToJsonConverter) read
+    the labels and matrix directly and never need the DataFrame.
+    """
+
+    __slots__ = ("row_labels", "col_labels", "values", "meta")
+
+    def __init__(self, row_labels, col_labels, values, meta: Optional[SheetMeta] = None):
+        self.row_labels = np.asarray(row_labels, dtype=object)
+        self.col_labels = np.asarray(col_labels, dtype=object)
+        self.values = values
+        self.meta = meta if meta is not None else SheetMeta()
+
+    @classmethod
+    def empty(cls, meta=None):
+        return cls([], [], np.empty((0, 0), dtype=object), meta)
+
+    @classmethod
+    def from_columns(cls, row_labels, col_labels, columns: List[np.ndarray], meta=None):
+        """
+        Build from per-column 1-D arrays with one allocation for the matrix.
+        All-numeric columns give a typed matrix; any other dtype gives object.
+        """
+        n = len(row_labels)
+        if columns and all(c.dtype.kind in "iuf" for c in columns):
+            dtype = np.result_type(*[c.dtype for c in columns])
+        else:
+            dtype = object
+        values = np.empty((n, len(columns)), dtype=dtype, order="F")
+        for j, c in enumerate(columns):
+            values[:, j] = c
+        return cls(row_labels, col_labels, values, meta)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, meta=None):
+        """Wrap an existing flattened DataFrame (an "Index" column becomes the row labels)."""
+        if df.index.name != "Index" and "Index" in df.columns:
+            df = df.set_index("Index")
+        return cls([str(r) for r in df.index], [str(c) for c in df.columns], df.to_numpy(), meta)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def with_labels(self, row_labels=None, col_labels=None) -> "FlatSheet":
+        """Same values (shared, not copied) under new labels."""
+        return FlatSheet(
+            self.row_labels if row_labels is None else row_labels,
+            self.col_labels if col_labels is None else col_labels,
+            self.values,
+            self.meta,
+        )
+
+    def take_rows(self, mask) -> "FlatSheet":
+        """Rows where the boolean mask is True (self when every row is kept)."""
+        mask = np.asarray(mask, dtype=bool)
+        if mask.all():
+            return self
+        return FlatSheet(self.row_labels[mask], self.col_labels, self.values[mask], self.meta)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame view over the value matrix (no copy)."""
+        index = pd.Index(self.row_labels, dtype=object, name="Index")
+        return pd.DataFrame(self.values, index=index, columns=pd.Index(self.col_labels, dtype=object), copy=False)
+
+    def __iter__(self):
+        # Unpacks like the old (df, meta) tuple
+        yield self.to_frame()
+        yield self.meta
+
+    def __repr__(self):
+        return f"FlatSheet({self.shape[0]}×{self.shape[1]}, dtype={self.values.dtype})"
@@ -6,6 +6,8 @@ import logging
 import sys
 from utils import *
 from batch_processor import BatchProcessor
+from XlsxStreamReader import ENGINES
+from FilingSelection import FilingSelection
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -23,6 +25,25 @@ def main():
     parser.add_argument("--verbose", action="store_true", help="Include detailed explanations in output.")
     parser.add_argument("--patterns", nargs="*", default=[".xlsx", ".xlsm"],
                         help="File extensions to include (e.g., .xlsx .xlsm).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from the output folder's processing_journal.jsonl.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Flatten N workbooks concurrently (largest/slowest first).")
+    parser.add_argument("--memory_budget_mb", type=float,
+                        help="Admit new workbooks only while worker RSS stays under this budget.")
+    parser.add_argument("--sheet_workers", type=int, default=1,
+                        help="Flatten the sheets of each workbook concurrently with N workers.")
+    parser.add_argument("--sheet_executor", choices=["thread", "process"], default="thread",
+                        help="Worker type for --sheet_workers.")
+    parser.add_argument("--engine", choices=ENGINES, default="openpyxl",
+                        help="Excel reader: openpyxl, or stream (reads the sheet XML directly, much faster).")
+    parser.add_argument("--metrics_dir", type=str,
+                        help="Write live metrics here: flatten.prom (Prometheus textfile) and flatten.json.")
+    parser.add_argument("--metrics_interval", type=float, default=10.0,
+                        help="Seconds between metric exports / progress updates.")
+    parser.add_argument("--progress", action="store_true",
+                        help="Show a progress line (files/s, cells/s, failures, ETA).")
+    FilingSelection.add_arguments(parser)
 
     args = parser.parse_args()
 
@@ -31,7 +52,17 @@ def main():
             input_dir=args.input_dir,
             output_subdir=args.output_subdir,
             keep_all_columns=args.keep_all_columns,
-            verbose=args.verbose
+            verbose=args.verbose,
+            sheet_workers=args.sheet_workers,
+            sheet_executor=args.sheet_executor,
+            resume=args.resume,
+            workers=args.workers,
+            memory_budget_mb=args.memory_budget_mb,
+            engine=args.engine,
+            metrics_dir=args.metrics_dir,
+            metrics_interval=args.metrics_interval,
+            progress=args.progress,
+            selection=FilingSelection.from_args(args)
         )
         summaries = processor.process(include_patterns=args.patterns)
 
@@ -49,10 +80,12 @@ def main():
                     print(f"  - {sh['sheet']}: {sh['rows']}×{sh['cols']} "
                           f"(row_levels={sh['row_levels']}, col_levels={sh['col_levels']})")
             print(f"\n✅ Processed {len(summaries)} file(s). Outputs in '{processor.out_dir}'.")
+            print(f"🧠 Peak worker RSS: {processor.scheduler.peak_rss_mb:.0f} MiB")
+            print(f"⏱  {processor.metrics.progress_line()}")
 
         # Optionally save summary as JSON
-        summary_file = processor.out_dir / "processing_summary.json"
-        with open(summary_file, "w", encoding="utf-8") as f:
+        summary_file = processor.summary_path
+        with atomic_output(summary_file) as tmp_file, open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(summaries, f, indent=2)
         logger.info(f"Summary saved to {summary_file}")
 
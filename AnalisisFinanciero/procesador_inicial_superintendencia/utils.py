@@ -1,6 +1,18 @@
 import logging
+import os
+import sys
+from contextlib import contextmanager
+from functools import partial
 import pandas as pd
 import re
+from pathlib import Path
+
+# Modules shared by the three stages live in formateo_no_relacional (appended, so
+# this stage's own modules keep precedence)
+SHARED_DIR = Path(__file__).resolve().parent.parent / "formateo_no_relacional"
+if str(SHARED_DIR) not in sys.path:
+    sys.path.append(str(SHARED_DIR))
+from ParallelMap import *
 
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -64,3 +76,19 @@ def sanitize_sheet_name(name: str) -> str:
     name = re.sub(r'[:\\/?*\[\]]', '_', str(name))
     return name[:31]
 
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yield a temporary sibling path and move it over `path` only if the block succeeds,
+    so readers never see a half-written output. The '~$' prefix (Excel's lock-file
+    convention) keeps the temporary file out of is_excel_file() listings.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"~${os.getpid()}_{path.name}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
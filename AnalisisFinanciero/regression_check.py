@@ -0,0 +1,330 @@
+import argparse
+import json
+import logging
+import math
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "formateo_no_relacional"))
+from JsonCodec import load_any, is_codec_file, strip_codec_suffix
+from TreeDiff import TreeDiff, CHANGED
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+# name, stage folder, script, arguments ({work} is the scratch directory), output folder, golden folder
+STAGES = [
+    ("flatten", "procesador_inicial_superintendencia", "flatten_excel.py",
+     ["--input_dir", "{work}/in"], "{work}/in/flattened", "flattened"),
+    ("transform", "transformador_superintendencia", "main.py",
+     ["--input_dir", "{work}/in/flattened", "--output_dir", "{work}/transform"], "{work}/transform", "transform"),
+    ("json", "formateo_no_relacional", "main.py",
+     ["--input_dir", "{work}/transform", "--output_dir", "{work}/json"], "{work}/json", "json"),
+]
+METRICS_NAMES = {"flatten": "flatten", "transform": "clean", "json": "json"}  # <run>.json under --metrics_dir
+MAX_SAMPLES = 5  # differences listed per file
+
+
+# ----------------- Running Stages -----------------
+def run_measured(cmd: List[str], cwd: Path, log_path: Path) -> Tuple[int, float, Optional[float]]:
+    """Run a command; returns (exit code, wall seconds, peak RSS in MiB or None if not measurable)."""
+    with open(log_path, "w", encoding="utf-8") as log:
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, "wait4"):
+            # wait4 returns the rusage of this child alone (RUSAGE_CHILDREN would mix stages)
+            _, status, usage = os.wait4(proc.pid, 0)
+            elapsed = time.perf_counter() - t0
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            rss_mb = usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+            return proc.returncode, elapsed, rss_mb
+        code = proc.wait()
+        return code, time.perf_counter() - t0, None
+
+
+def read_stage_metrics(metrics_dir: Path, name: str) -> Dict[str, Any]:
+    """Per-step timings exported by the stage itself (--metrics_dir), if present."""
+    try:
+        snap = json.loads((metrics_dir / f"{name}.json").read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return {step: h.get("sum") for step, h in snap.get("stage_seconds", {}).items()}
+
+
+# ----------------- Structural Diff -----------------
+def _is_missing(v: Any) -> bool:
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+def same_value(a: Any, b: Any, abs_tol: float, rel_tol: float) -> bool:
+    if _is_missing(a) or _is_missing(b):
+        return _is_missing(a) and _is_missing(b)
+    numeric = (int, float)
+    if isinstance(a, numeric) and isinstance(b, numeric) and not isinstance(a, bool) and not isinstance(b, bool):
+        return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+    return a == b
+
+
+def diff_workbooks(golden: Path, actual: Path, abs_tol: float, rel_tol: float) -> List[Dict[str, Any]]:
+    """Cell-level differences between two workbooks (sheets compared by name, raw grid, no header)."""
+    g = pd.read_excel(golden, sheet_name=None, header=None, dtype=object, engine="openpyxl")
+    a = pd.read_excel(actual, sheet_name=None, header=None, dtype=object, engine="openpyxl")
+    diffs = []
+    if list(g) != list(a):
+        diffs.append({"kind": "sheets", "golden": list(g), "actual": list(a)})
+    for sheet in g:
+        if sheet not in a:
+            continue
+        gs, as_ = g[sheet], a[sheet]
+        if gs.equals(as_):
+            continue
+        if gs.shape != as_.shape:
+            diffs.append({"kind": "shape", "sheet": sheet, "golden": list(gs.shape), "actual": list(as_.shape)})
+            continue
+        gv, av = gs.to_numpy(), as_.to_numpy()
+        for i in range(gv.shape[0]):
+            for j in range(gv.shape[1]):
+                if not same_value(gv[i, j], av[i, j], abs_tol, rel_tol):
+                    diffs.append({"kind": "cell", "sheet": sheet, "row": i, "col": j,
+                                  "golden": _jsonable(gv[i, j]), "actual": _jsonable(av[i, j])})
+    return diffs
+
+
+def diff_trees(golden: Path, actual: Path, abs_tol: float, rel_tol: float) -> List[Dict[str, Any]]:
+    """TreeDiff between two JSON-stage files, ignoring numeric changes within tolerance."""
+    diffs = []
+    for op in TreeDiff.diff(load_any(golden), load_any(actual)):
+        if op[0] == CHANGED and same_value(op[2], op[3], abs_tol, rel_tol):
+            continue
+        entry = {"kind": op[0], "path": op[1], "golden": op[2] if op[0] != "+" else None}
+        entry["actual"] = op[-1] if op[0] != "-" else None
+        diffs.append(entry)
+    return diffs
+
+
+def _jsonable(v: Any) -> Any:
+    if _is_missing(v):
+        return None
+    return v if isinstance(v, (str, int, float, bool)) else str(v)
+
+
+def _outputs(directory: Path) -> Dict[str, Path]:
+    """{stem: path} of stage outputs, ignoring run summaries, journals and temporary files."""
+    files = {}
+    if not directory.is_dir():
+        return files
+    for f in directory.iterdir():
+        if not f.is_file() or f.name.startswith(("~$", ".")) or "summary" in f.name or "journal" in f.name:
+            continue
+        if f.suffix.lower() in (".xlsx", ".xlsm"):
+            files[f.stem] = f
+        elif is_codec_file(f):
+            files[strip_codec_suffix(f.name)] = f
+    return files
+
+
+def compare_dirs(golden_dir: Path, actual_dir: Path, abs_tol: float, rel_tol: float) -> Dict[str, Any]:
+    golden, actual = _outputs(golden_dir), _outputs(actual_dir)
+    result = {
+        "files": len(golden),
+        "missing": sorted(set(golden) - set(actual)),
+        "unexpected": sorted(set(actual) - set(golden)),
+        "different": {},
+    }
+    for stem in sorted(set(golden) & set(actual)):
+        g, a = golden[stem], actual[stem]
+        try:
+            if g.suffix.lower() in (".xlsx", ".xlsm"):
+                diffs = diff_workbooks(g, a, abs_tol, rel_tol)
+            else:
+                diffs = diff_trees(g, a, abs_tol, rel_tol)
+        except Exception as e:
+            diffs = [{"kind": "error", "error": str(e)}]
+        if diffs:
+            result["different"][stem] = {"count": len(diffs), "samples": diffs[:MAX_SAMPLES]}
+    return result
+
+
+# ----------------- Budgets -----------------
+def check_budgets(name: str, stage: Dict[str, Any], budget: Dict[str, Any],
+                  baseline: Optional[Dict[str, Any]], limits: Dict[str, float]) -> List[str]:
+    """Messages for every exceeded absolute budget or baseline-relative threshold."""
+    failures = []
+    seconds, rss = stage["seconds"], stage["rss_mb"]
+    if budget.get("max_seconds") is not None and seconds > budget["max_seconds"]:
+        failures.append(f"{name}: {seconds:.2f}s exceeds budget {budget['max_seconds']}s")
+    if budget.get("max_rss_mb") is not None and rss is not None and rss > budget["max_rss_mb"]:
+        failures.append(f"{name}: peak RSS {rss:.0f} MiB exceeds budget {budget['max_rss_mb']} MiB")
+    if baseline:
+        base_s = baseline.get("seconds")
+        # Small absolute slowdowns are noise; only flag relative regressions above the floor
+        if base_s and seconds > base_s * (1 + limits["max_regression"]) \
+                and seconds - base_s > limits["min_regression_seconds"]:
+            failures.append(f"{name}: {seconds:.2f}s is {100 * (seconds / base_s - 1):.0f}% slower than baseline "
+                            f"{base_s:.2f}s (limit {100 * limits['max_regression']:.0f}%)")
+        base_rss = baseline.get("rss_mb")
+        if base_rss and rss is not None and rss > base_rss * (1 + limits["max_rss_regression"]):
+            failures.append(f"{name}: peak RSS {rss:.0f} MiB is {100 * (rss / base_rss - 1):.0f}% above baseline "
+                            f"{base_rss:.0f} MiB (limit {100 * limits['max_rss_regression']:.0f}%)")
+    return failures
+
+
+# ----------------- Harness -----------------
+def run_harness(data_dir: Path, config: Dict[str, Any], work: Path, stage_args: Dict[str, List[str]],
+                baseline: Optional[Dict[str, Any]] = None, repeat: int = 1) -> Dict[str, Any]:
+    """Run every stage on data_dir/*.xlsx, diff against the goldens and check budgets."""
+    inputs = sorted(p for p in data_dir.iterdir() if p.is_file() and p.suffix.lower() in (".xlsx", ".xlsm")
+                    and not p.name.startswith("~$"))
+    if not inputs:
+        raise FileNotFoundError(f"No input workbooks in {data_dir}")
+    tol = config.get("tolerance", {})
+    abs_tol, rel_tol = float(tol.get("abs", 0.0)), float(tol.get("rel", 0.0))
+    limits = {
+        "max_regression": float(config.get("max_regression", 0.25)),
+        "min_regression_seconds": float(config.get("min_regression_seconds", 0.5)),
+        "max_rss_regression": float(config.get("max_rss_regression", 0.25)),
+    }
+    metrics_dir = work / "metrics"
+    report = {"data_dir": str(data_dir), "inputs": len(inputs), "python": sys.version.split()[0],
+              "stages": {}, "failures": []}
+
+    for name, folder, script, args, output, golden in STAGES:
+        budget = config.get("stages", {}).get(name, {})
+        cmd = [sys.executable, script] + [a.format(work=work) for a in args] \
+            + list(budget.get("args", [])) + stage_args.get("all", []) + stage_args.get(name, []) \
+            + ["--metrics_dir", str(metrics_dir)]
+        runs = []
+        for i in range(max(1, repeat)):
+            if name == "flatten":
+                # flatten writes next to its inputs: start every run from a clean copy
+                shutil.rmtree(work / "in", ignore_errors=True)
+                (work / "in").mkdir(parents=True)
+                for f in inputs:
+                    shutil.copy2(f, work / "in" / f.name)
+            logger.info(f"Running {name} ({i + 1}/{repeat}): {' '.join(shlex.quote(c) for c in cmd[1:])}")
+            runs.append(run_measured(cmd, ROOT / folder, work / f"{name}.log"))
+            if runs[-1][0] != 0:
+                break
+
+        code = next((c for c, _, _ in runs if c != 0), 0)
+        rss = [r for _, _, r in runs if r is not None]
+        stage = {
+            "exit_code": code,
+            "seconds": round(min(s for _, s, _ in runs), 3),  # best of `repeat` runs
+            "rss_mb": round(max(rss), 1) if rss else None,
+            "steps": read_stage_metrics(metrics_dir, METRICS_NAMES[name]),
+        }
+        if code != 0:
+            stage["log"] = str(work / f"{name}.log")
+            report["failures"].append(f"{name}: exited with status {code} (see {stage['log']})")
+        else:
+            stage["diff"] = compare_dirs(data_dir / golden, Path(output.format(work=work)), abs_tol, rel_tol)
+            d = stage["diff"]
+            if d["missing"] or d["unexpected"] or d["different"]:
+                report["failures"].append(
+                    f"{name}: {len(d['different'])} different, {len(d['missing'])} missing, "
+                    f"{len(d['unexpected'])} unexpected output(s) vs {data_dir / golden}"
+                )
+        report["failures"] += check_budgets(
+            name, stage, budget, (baseline or {}).get("stages", {}).get(name), limits
+        )
+        report["stages"][name] = stage
+        if code != 0:
+            break  # later stages need this stage's output
+
+    report["ok"] = not report["failures"]
+    return report
+
+
+# ----------------- CLI Interface -----------------
+def _parse_stage_args(values: List[str]) -> Dict[str, List[str]]:
+    out: Dict[str, List[str]] = {}
+    names = {s[0] for s in STAGES} | {"all"}
+    for v in values or []:
+        name, sep, args = v.partition("=")
+        if not sep or name not in names:
+            raise ValueError(f"--stage_args expects <stage>=<args> with stage in {sorted(names)}, got '{v}'")
+        out.setdefault(name, []).extend(shlex.split(args))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Golden-corpus regression check: run flatten → transform → json on the workbooks
+        in --data_dir and diff every output structurally against the stored goldens
+        (data/flattened, data/transform, data/json).
+        - Records wall time and peak RSS of each stage process (plus per-step times the stage exports).
+        - Fails on any difference, on budgets from --budgets, or on regressions vs --baseline.
+        Exit status: 0 = pass, 2 = differences or budget failures, 1 = harness error.
+        """
+    )
+    parser.add_argument("--data_dir", type=str, default=str(ROOT / "data"),
+                        help="Folder with input workbooks and the flattened/, transform/, json/ goldens.")
+    parser.add_argument("--budgets", type=str, default=str(ROOT / "regression_budgets.json"),
+                        help="JSON with tolerances, per-stage budgets and regression thresholds.")
+    parser.add_argument("--baseline", type=str, help="Report of a previous run to compare timings/memory against.")
+    parser.add_argument("--save_baseline", type=str, help="Write this run's report here if it passes.")
+    parser.add_argument("--report", type=str, help="Write the full JSON report here.")
+    parser.add_argument("--stage_args", action="append", metavar="STAGE=ARGS",
+                        help='Extra CLI arguments, e.g. flatten="--engine stream --workers 4" or all="--engine stream".')
+    parser.add_argument("--repeat", type=int, default=1, help="Run each stage N times and keep the best time.")
+    parser.add_argument("--keep_work", action="store_true", help="Keep the scratch directory with outputs and logs.")
+    args = parser.parse_args()
+
+    try:
+        config = json.loads(Path(args.budgets).read_text(encoding="utf-8")) if Path(args.budgets).exists() else {}
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+        stage_args = _parse_stage_args(args.stage_args)
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    work = Path(tempfile.mkdtemp(prefix="regression_"))
+    try:
+        report = run_harness(Path(args.data_dir).resolve(), config, work, stage_args, baseline, args.repeat)
+    except Exception as e:
+        logger.error(f"Regression harness failed: {e}")
+        sys.exit(1)
+    finally:
+        if args.keep_work:
+            logger.info(f"Scratch directory kept: {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+    print("GOLDEN-CORPUS REGRESSION CHECK")
+    print("=" * 60)
+    for name, s in report["stages"].items():
+        d = s.get("diff", {})
+        rss = f"{s['rss_mb']:.0f} MiB" if s["rss_mb"] is not None else "n/a"
+        status = "FAIL" if s["exit_code"] else ("ok" if not (d.get("different") or d.get("missing")
+                                                            or d.get("unexpected")) else "DIFF")
+        steps = ", ".join(f"{k} {v:.2f}s" for k, v in s["steps"].items() if v is not None)
+        print(f"  {name:<10} {status:<5} {s['seconds']:>7.2f}s  {rss:>9}  {d.get('files', 0)} golden file(s)"
+              + (f"  [{steps}]" if steps else ""))
+    if report["failures"]:
+        print(f"\n❌ {len(report['failures'])} failure(s):")
+        for msg in report["failures"]:
+            print(f"  - {msg}")
+    else:
+        print("\n✅ All outputs match the goldens and every budget holds.")
+
+    for target in filter(None, [args.report, args.save_baseline if report["ok"] else None]):
+        Path(target).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        logger.info(f"Report saved to {target}")
+    sys.exit(0 if report["ok"] else 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import importlib
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, Tuple
+
+ROOT = Path(__file__).resolve().parent
+STAGE_DIRS = {
+    "procesador": ROOT / "procesador_inicial_superintendencia",
+    "transformador": ROOT / "transformador_superintendencia",
+    "formateo": ROOT / "formateo_no_relacional",
+}
+
+_loaded: Dict[Tuple[str, str], ModuleType] = {}
+_lock = threading.Lock()
+
+
+def _belongs_to(module: ModuleType, folder: Path) -> bool:
+    f = getattr(module, "__file__", None)
+    return f is not None and Path(f).resolve().parent == folder
+
+
+def load_stage_module(stage: str, name: str) -> ModuleType:
+    """
+    Import module `name` from one stage folder in-process.
+
+    Stages are written as flat script folders and share module names (utils,
+    batch_processor, main, ...), so two of them cannot simply be put on sys.path
+    together. The stage folder is put first on sys.path for the duration of the
+    import and any same-named module from another stage is hidden; afterwards the
+    stage's modules are taken out of sys.modules again and cached here, so each
+    stage keeps its own `utils` and later imports from other stages are not
+    affected. Modules bind what they need at import time (`from utils import *`),
+    so they keep working once unregistered.
+    """
+    folder = STAGE_DIRS[stage].resolve()
+    with _lock:
+        if (stage, name) in _loaded:
+            return _loaded[(stage, name)]
+        local = {p.stem for p in folder.glob("*.py")}
+        hidden = {m: sys.modules.pop(m) for m in local if m in sys.modules}
+        # This stage's modules imported earlier resolve to the cached copies
+        for (s, m), module in _loaded.items():
+            if s == stage:
+                sys.modules[m] = module
+        sys.path.insert(0, str(folder))
+        try:
+            module = importlib.import_module(name)
+        finally:
+            sys.path.remove(str(folder))
+            for m in local:
+                current = sys.modules.get(m)
+                if current is not None and _belongs_to(current, folder):
+                    _loaded[(stage, m)] = sys.modules.pop(m)
+            sys.modules.update(hidden)
+        return module
@@ -0,0 +1,54 @@
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "formateo_no_relacional"))
+from SqliteCellStore import SqliteCellStore
+
+FLATTENED = ROOT / "data" / "transform"  # cleaned flattened workbooks (goldens of the cleaning stage)
+
+
+def _first_words(statements):
+    return [s.split()[0].upper() for s in statements if s.strip()]
+
+
+def test_load_directory_commits_in_batches(tmp_path):
+    store = SqliteCellStore(tmp_path / "cells.db", commit_every=4)
+    statements = []
+    store.conn.set_trace_callback(statements.append)
+    loaded = sum(s["status"] == "loaded" for s in store.load_directory(FLATTENED))
+    store.conn.set_trace_callback(None)
+
+    words = [w for w in _first_words(statements) if w in ("BEGIN", "COMMIT", "SAVEPOINT", "RELEASE")]
+    assert loaded == len(list(FLATTENED.glob("*.xlsx")))
+    assert words.count("COMMIT") == math.ceil(loaded / 4)
+    # Every per-filing savepoint is nested in an explicit transaction
+    open_txn = False
+    for w in words:
+        if w == "BEGIN":
+            open_txn = True
+        elif w == "COMMIT":
+            open_txn = False
+        elif w == "SAVEPOINT":
+            assert open_txn
+
+
+def test_interrupted_load_rolls_back_uncommitted_filings(tmp_path, monkeypatch):
+    store = SqliteCellStore(tmp_path / "cells.db", commit_every=100)
+    load_workbook = store.load_workbook
+    calls = []
+
+    def interrupted(file_path, force=False):
+        calls.append(file_path)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return load_workbook(file_path, force=force)
+
+    monkeypatch.setattr(store, "load_workbook", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        store.load_directory(FLATTENED)
+    assert store.conn.execute("SELECT COUNT(*) FROM filings").fetchone()[0] == 0
+    assert store.conn.execute("SELECT COUNT(*) FROM cells").fetchone()[0] == 0
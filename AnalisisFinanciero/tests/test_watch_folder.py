@@ -0,0 +1,42 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from watch_folder import FolderWatcher, WatchDaemon
+
+
+def test_watcher_ignores_file_still_empty_after_settle(tmp_path):
+    empty = tmp_path / "900_2024-12-31_Caratula.xlsx"
+    empty.touch()
+    watcher = FolderWatcher([tmp_path], settle=0.05)
+
+    assert watcher.poll() == []
+    time.sleep(0.1)
+    assert watcher.poll() == []
+    assert not watcher.seen  # given up on, so --once can finish
+
+    # Written later: handed out like any new file once it settles
+    empty.write_bytes(b"PK")
+    watcher.poll()
+    time.sleep(0.1)
+    assert [path for path, _, _ in watcher.poll()] == [empty]
+
+
+def test_once_exits_with_empty_and_unreadable_workbooks(tmp_path):
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    in_dir.mkdir()
+    (in_dir / "900_2024-12-31_Caratula.xlsx").touch()
+    (in_dir / "900_2024-12-31_Notas.xlsx").write_bytes(b"not a zip file")
+    daemon = WatchDaemon([in_dir], out_dir, workers=1, interval=0.05, settle=0.1)
+
+    runner = threading.Thread(target=daemon.run, kwargs={"once": True})
+    runner.start()
+    runner.join(timeout=30)
+    finished = not runner.is_alive()
+    if not finished:
+        daemon.stop()
+        runner.join()
+    assert finished
+    assert daemon.counts == {"ok": 0, "failed": 1}  # the unreadable one; the empty one is ignored
@@ -1,6 +1,7 @@
 import argparse
 import logging
 import sys
+import time
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -11,6 +12,8 @@ from utils import *
 from column_cleaner import ColumnCleaner
 from excel_reader import ExcelReader
 from workbook_reader import WorkbookCleaner
+from RunMetrics import RunMetrics
+from FilingSelection import FilingSelection
 
 # ----------------- Batch Processor -----------------
 class BatchColumnCleaner:
@@ -18,9 +21,26 @@ class BatchColumnCleaner:
     Batch process all Excel files in a directory.
     """
 
-    def __init__(self, input_dir: Path, output_dir: Path):
+    SUMMARY_NAME = "cleaning_summary.json"
+
+    def __init__(self, input_dir: Path, output_dir: Path, sheet_workers: int = 1, sheet_executor: str = "thread",
+                 engine: str = "openpyxl", metrics_dir: Optional[Path] = None,
+                 metrics_interval: float = 10.0, progress: bool = False,
+                 selection: Optional[FilingSelection] = None, header_only: bool = False):
         self.input_dir = input_dir
         self.output_dir = output_dir
+        self.sheet_workers = sheet_workers
+        self.sheet_executor = sheet_executor
+        self.engine = engine
+        self.header_only = header_only
+        # Throughput/latency metrics; created per run in run()
+        self.metrics_dir = metrics_dir
+        self.metrics_interval = metrics_interval
+        self.progress = progress
+        self.metrics = None
+        self.selection = selection or FilingSelection()
+        # A shard (--shard i/N) keeps its summary under output_dir/shards/
+        self.summary_path = self.selection.run_file(self.output_dir, self.SUMMARY_NAME)
 
         if not self.input_dir.exists():
             raise FileNotFoundError(f"Input directory not found: {self.input_dir}")
@@ -32,17 +52,29 @@ class BatchColumnCleaner:
         Process all Excel files and return a list of summaries.
         """
         input_files = [p for p in self.input_dir.iterdir() if p.is_file() and is_excel_file(p)]
+        candidates = sorted(input_files)
+        input_files = self.selection.select_files(candidates)
+        self.selection.write_manifest(self.output_dir, "cleaning", candidates, input_files)
         if not input_files:
             logger.info(f"No Excel files found in {self.input_dir}")
             return []
 
         logger.info(f"Found {len(input_files)} Excel file(s) to process.")
-        workbook_cleaner = WorkbookCleaner(self.output_dir)
+        workbook_cleaner = WorkbookCleaner(self.output_dir, self.sheet_workers, self.sheet_executor, self.engine,
+                                           self.selection, self.header_only)
         summaries = []
+        self.metrics = RunMetrics("clean", len(input_files), self.metrics_dir, self.metrics_interval, self.progress)
+        self.metrics.tick(force=True)
 
-        for file_path in sorted(input_files):
-            summary = workbook_cleaner.clean(file_path)
-            if summary:
-                summaries.append(summary)
+        try:
+            for file_path in sorted(input_files):
+                t0 = time.perf_counter()
+                summary = workbook_cleaner.clean(file_path)
+                self.metrics.observe_file(file_path, summary, None, time.perf_counter() - t0)
+                if summary:
+                    summaries.append(summary)
+        finally:
+            workbook_cleaner.close()
+            self.metrics.close()
 
         return summaries
@@ -6,7 +6,7 @@ import pandas as pd
 import numpy as np
 import re
 import json
-from typing import List, Tuple, Dict, Optional
+from typing import Any, List, Tuple, Dict, Optional
 from utils import *
 
 class ColumnCleaner:
@@ -15,16 +15,26 @@ class ColumnCleaner:
     """
 
     @staticmethod
-    def clean_columns(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[str, str]]]:
+    def clean_labels(labels: List[Any]) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """Normalized, unique column labels and the list of (old, new) changes."""
+        old_cols = [str(c) for c in labels]
+        unique_cols = uniquify([normalize_label(c) for c in old_cols])
+        return unique_cols, [(old, new) for old, new in zip(old_cols, unique_cols) if old != new]
+
+    @staticmethod
+    def clean_columns(df) -> Tuple[Any, List[Tuple[str, str]]]:
         """
         Returns a cleaned DataFrame and a list of (old, new) column name changes.
-        """
-        df_clean = df.copy()
-        old_cols = [str(c) for c in df_clean.columns]
-        normalized = [normalize_label(c) for c in old_cols]
-        unique_cols = uniquify(normalized)
 
-        df_clean.columns = unique_cols
+        A FlatSheet (from the flattening stage) is also accepted; it comes back as a
+        FlatSheet with the new column labels over the same, uncopied, value matrix.
+        """
+        is_frame = isinstance(df, pd.DataFrame)
+        unique_cols, changes = ColumnCleaner.clean_labels(df.columns if is_frame else df.col_labels)
 
-        changes = [(old, new) for old, new in zip(old_cols, unique_cols) if old != new]
-        return df_clean, changes
\ No newline at end of file
+        if is_frame:
+            df_clean = df.copy()
+            df_clean.columns = unique_cols
+        else:
+            df_clean = df.with_labels(col_labels=unique_cols)
+        return df_clean, changes
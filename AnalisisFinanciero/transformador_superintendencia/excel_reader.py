@@ -9,6 +9,7 @@ import json
 from typing import List, Tuple, Dict, Optional
 from utils import *
 from column_cleaner import ColumnCleaner
+from XlsxStreamReader import open_workbook
 
 class ExcelReader:
     """
@@ -16,18 +17,17 @@ class ExcelReader:
     """
 
     @staticmethod
-    def read_sheet(path: Path, sheet_name: str) -> pd.DataFrame:
+    def read_sheet(path: Path, sheet_name: str, xl: Optional[pd.ExcelFile] = None,
+                   engine: str = "openpyxl") -> pd.DataFrame:
         """
         Read a single sheet. Tries to use index_col=0 (from flattener), falls back otherwise.
+        Pass an open workbook (open_workbook()) as `xl` to reuse an already parsed workbook;
+        otherwise the file is opened with `engine` ("openpyxl" or "stream").
         """
+        if xl is None:
+            xl = open_workbook(path, engine)
         try:
-            return pd.read_excel(
-                path, sheet_name=sheet_name, engine="openpyxl",
-                dtype=object, header=0, index_col=0
-            )
+            return xl.parse(sheet_name, dtype=object, header=0, index_col=0)
         except Exception:
             logger.debug(f"Falling back to no index for {path.name}, sheet '{sheet_name}'")
-            return pd.read_excel(
-                path, sheet_name=sheet_name, engine="openpyxl",
-                dtype=object, header=0, index_col=None
-            )
\ No newline at end of file
+            return xl.parse(sheet_name, dtype=object, header=0, index_col=None)
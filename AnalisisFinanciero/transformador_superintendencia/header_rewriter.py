@@ -0,0 +1,161 @@
+import logging
+import os
+import re
+import shutil
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Any, Tuple, Union
+from xml.sax.saxutils import escape
+from openpyxl.utils import get_column_letter
+from pandas.io.parsers import TextParser
+from utils import *
+from XlsxStreamReader import (XlsxStreamReader, BLOCK_SIZE, column_index, is_prefixed_sheet, row_number,
+                              iter_raw_cells, cell_style)
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+_SHEET_DATA_RE = re.compile(rb"<sheetData\b[^>]*?(/?)>")
+_FIRST_ROW_RE = re.compile(rb"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_DIMENSION_RE = re.compile(rb'<dimension\b[^>]*?\bref="[A-Za-z]*\d*:?([A-Za-z]+)(\d+)"')
+
+
+class HeaderOnlyUnsupported(Exception):
+    """The workbook cannot be cleaned header-only; the caller rewrites it in full instead."""
+
+
+# ----------------- Header Rewriter -----------------
+class HeaderRewriter:
+    """
+    Read and replace only the header row of the worksheets of an xlsx file.
+
+    read_header() decompresses each sheet's XML just up to the end of its first row
+    and names the columns exactly as ExcelReader.read_sheet (index_col=0) would.
+    write() copies every zip member to the output unchanged except the header rows
+    it is given, which are spliced into the sheet XML stream: data cells are never
+    parsed, converted or re-serialized, and a workbook without changes is copied
+    byte for byte. Sheets that do not look like a flattened-stage output (header
+    not on row 1, data wider than the header, namespace-prefixed XML) raise
+    HeaderOnlyUnsupported.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.reader = XlsxStreamReader(self.path)  # sheet members, shared strings, cell conversion
+        self.sheet_names = self.reader.sheet_names
+        self._headers: Dict[str, Tuple[bytes, "re.Match"]] = {}
+
+    def _first_row(self, zin: zipfile.ZipFile, member: str) -> Tuple[bytes, "re.Match"]:
+        """Decompressed start of a sheet's XML through its first row, and the match of that row."""
+        buf = b""
+        with zin.open(member) as f:
+            while True:
+                chunk = f.read(BLOCK_SIZE)
+                buf += chunk
+                if is_prefixed_sheet(buf[:4096]):
+                    raise HeaderOnlyUnsupported("namespace-prefixed sheet XML")
+                sheet_data = _SHEET_DATA_RE.search(buf)
+                if sheet_data:
+                    if sheet_data.group(1):
+                        raise HeaderOnlyUnsupported("empty sheet")
+                    row = _FIRST_ROW_RE.search(buf, sheet_data.end())
+                    if row:
+                        return buf, row
+                if not chunk:
+                    raise HeaderOnlyUnsupported("no header row")
+
+    def read_header(self, sheet: str) -> Dict[str, Any]:
+        """
+        {"labels": column names (index column excluded), "cells": header cell text per
+        column (None if empty or not text), "data_cells": rows × columns from the sheet
+        dimension}.
+        """
+        member = self.reader.sheet_member(sheet)
+        with zipfile.ZipFile(self.path) as zin:
+            buf, row = self._first_row(zin, member)
+        r = row_number(row.group(1))
+        if r and float(r) != 1:
+            raise HeaderOnlyUnsupported(f"header on row {r}")
+        self._headers[sheet] = (buf, row)
+
+        # Cell values converted like the full read (shared strings, numbers, dates)
+        first = self.reader.parse_row(buf[row.start():row.end()])
+        values = {col: value for col, value, kind in first if value is not None and value != ""}
+        width = max(values) + 1 if values else 0
+        dim = _DIMENSION_RE.search(buf, 0, row.start())
+        if dim is None:
+            raise HeaderOnlyUnsupported("no sheet dimension")
+        if column_index(dim.group(1).decode()) + 1 > width:
+            raise HeaderOnlyUnsupported("data wider than the header row")
+        if width < 2:
+            raise HeaderOnlyUnsupported("no data columns")
+
+        # Column names from pandas' own header parsing ("Unnamed: i", duplicate mangling)
+        header = [values.get(col, "") for col in range(width)]
+        header = [int(v) if isinstance(v, float) and v.is_integer() else v for v in header]
+        names = TextParser([header], header=0, index_col=0, dtype=object).read().columns
+        rows = int(dim.group(2)) - 1
+        return {
+            "labels": [str(n) for n in names],
+            "cells": [values[col] if isinstance(values.get(col), str) else None for col in range(1, width)],
+            "data_cells": rows * (width - 1),
+        }
+
+    @staticmethod
+    def _header_row(row: "re.Match", labels: Dict[int, str]) -> bytes:
+        """The first row with the cells of `labels` ({0-based column: text}) replaced or added."""
+        attrs = row.group(1)
+        r = row_number(attrs)
+        row_num = int(float(r)) if r else 1
+        cells: Dict[int, bytes] = {}
+        styles: List[bytes] = []
+        for col, cell_attrs, xml in iter_raw_cells(row.group(2)):
+            cells[col] = xml
+            style = cell_style(cell_attrs)
+            if style:
+                styles.append(style)
+        for col, text in labels.items():
+            old = cells.get(col)
+            style = cell_style(old) if old is not None else b""
+            style = style or (styles[-1] if styles else b"")
+            ref = f"{get_column_letter(col + 1)}{row_num}".encode()
+            cells[col] = (b'<c r="' + ref + b'"' + (b" " + style if style else b"") + b' t="inlineStr"><is><t>'
+                          + escape(text).encode("utf-8") + b"</t></is></c>")
+        return b"<row" + attrs.rstrip() + b">" + b"".join(cells[c] for c in sorted(cells)) + b"</row>"
+
+    def write(self, output_path: Path, labels: Dict[str, Dict[int, str]]):
+        """
+        Write the workbook to output_path with new header cells: {sheet: {0-based
+        column: text}} for sheets read with read_header(). Atomic (temporary file + rename).
+        """
+        output_path = Path(output_path)
+        labels = {sheet: cols for sheet, cols in labels.items() if cols}
+        tmp = output_path.with_name("~$" + output_path.name)
+        try:
+            if not labels:
+                shutil.copyfile(self.path, tmp)
+            else:
+                members = {self.reader.sheet_member(sheet): sheet for sheet in labels}
+                with zipfile.ZipFile(self.path) as zin, zipfile.ZipFile(tmp, "w") as zout:
+                    for info in zin.infolist():
+                        copy = zipfile.ZipInfo(info.filename, info.date_time)
+                        copy.compress_type = info.compress_type
+                        copy.external_attr = info.external_attr
+                        with zin.open(info) as src, zout.open(copy, "w", force_zip64=info.file_size > 2**31) as dst:
+                            sheet = members.get(info.filename)
+                            if sheet is not None:
+                                buf, row = self._headers[sheet]
+                                src.read(len(buf))  # already held in buf
+                                dst.write(buf[:row.start()])
+                                dst.write(self._header_row(row, labels[sheet]))
+                                dst.write(buf[row.end():])
+                            shutil.copyfileobj(src, dst, BLOCK_SIZE)
+            os.replace(tmp, output_path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def close(self):
+        self.reader.close()
+
@@ -12,6 +12,8 @@ from column_cleaner import ColumnCleaner
 from excel_reader import ExcelReader
 from workbook_reader import WorkbookCleaner
 from batch_processor import BatchColumnCleaner
+from XlsxStreamReader import ENGINES
+from FilingSelection import FilingSelection
 
 # ----------------- CLI Interface -----------------
 def main():
@@ -35,6 +37,36 @@ def main():
         "--verbose", action="store_true",
         help="Print detailed change logs."
     )
+    parser.add_argument(
+        "--sheet_workers", type=int, default=1,
+        help="Clean the sheets of each workbook concurrently with N workers."
+    )
+    parser.add_argument(
+        "--sheet_executor", choices=["thread", "process"], default="thread",
+        help="Worker type for --sheet_workers."
+    )
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="openpyxl",
+        help="Excel reader: openpyxl, or stream (reads the sheet XML directly, much faster)."
+    )
+    parser.add_argument(
+        "--header_only", action="store_true",
+        help="Rewrite only the header cells of each sheet; data cells are copied untouched "
+             "(falls back to a full rewrite with --sheets/--rows or unusual workbooks)."
+    )
+    parser.add_argument(
+        "--metrics_dir", type=str,
+        help="Write live metrics here: clean.prom (Prometheus textfile) and clean.json."
+    )
+    parser.add_argument(
+        "--metrics_interval", type=float, default=10.0,
+        help="Seconds between metric exports / progress updates."
+    )
+    parser.add_argument(
+        "--progress", action="store_true",
+        help="Show a progress line (files/s, cells/s, failures, ETA)."
+    )
+    FilingSelection.add_arguments(parser)
 
     args = parser.parse_args()
 
@@ -42,7 +74,13 @@ def main():
     output_dir = Path(args.output_dir).resolve() if args.output_dir else input_dir / "cleaned_columns"
 
     try:
-        processor = BatchColumnCleaner(input_dir=input_dir, output_dir=output_dir)
+        processor = BatchColumnCleaner(
+            input_dir=input_dir, output_dir=output_dir,
+            sheet_workers=args.sheet_workers, sheet_executor=args.sheet_executor,
+            engine=args.engine, metrics_dir=args.metrics_dir,
+            metrics_interval=args.metrics_interval, progress=args.progress,
+            selection=FilingSelection.from_args(args), header_only=args.header_only
+        )
         summaries = processor.run()
 
         # Final summary
@@ -60,6 +98,7 @@ def main():
             print(f"✅ Processed {len(summaries)} file(s), {total_sheets} sheet(s).")
             print(f"🔄 Total column name changes: {total_changes}")
             print(f"📁 Output saved to: {output_dir}")
+            print(f"⏱  {processor.metrics.progress_line()}")
 
             if args.verbose:
                 print("\nDetailed per-file:")
@@ -71,7 +110,8 @@ def main():
                             print(f"  - [{sheet['sheet']}] {sheet['column_changes']} changes")
 
         # Save summary to JSON
-        summary_file = output_dir / "cleaning_summary.json"
+        summary_file = processor.summary_path
+        summary_file.parent.mkdir(parents=True, exist_ok=True)
         with open(summary_file, "w", encoding="utf-8") as f:
             json.dump(summaries, f, indent=2, ensure_ascii=False)
         logger.info(f"Summary saved to {summary_file}")
@@ -1,5 +1,6 @@
 import argparse
 import logging
+from functools import partial
 import sys
 from pathlib import Path
 import pandas as pd
@@ -8,6 +9,13 @@ import re
 import json
 from typing import List, Tuple, Dict, Optional
 
+# Modules shared by the three stages live in formateo_no_relacional (appended, so
+# this stage's own modules keep precedence)
+SHARED_DIR = Path(__file__).resolve().parent.parent / "formateo_no_relacional"
+if str(SHARED_DIR) not in sys.path:
+    sys.path.append(str(SHARED_DIR))
+from ParallelMap import *
+
 # ----------------- Logging Setup -----------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -66,4 +74,4 @@ def uniquify(names: List[str], empty_fallback: str = "unnamed") -> List[str]:
         else:
             seen[base] += 1
             output.append(f"{base}__{seen[base]}")
-    return output
\ No newline at end of file
+    return output
@@ -6,10 +6,15 @@ import pandas as pd
 import numpy as np
 import re
 import json
+import zipfile
 from typing import List, Tuple, Dict, Optional
 from utils import *
 from column_cleaner import ColumnCleaner
 from excel_reader import ExcelReader
+from XlsxStreamReader import open_workbook, ENGINES
+from RunMetrics import stage_timer
+from FilingSelection import FilingSelection
+from header_rewriter import HeaderRewriter, HeaderOnlyUnsupported
 
 # ----------------- Workbook Processor -----------------
 class WorkbookCleaner:
@@ -17,11 +22,68 @@ class WorkbookCleaner:
     Processes a single Excel workbook: cleans all sheet column names.
     """
 
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, sheet_workers: int = 1, sheet_executor: str = "thread",
+                 engine: str = "openpyxl", selection: Optional[FilingSelection] = None,
+                 header_only: bool = False):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Available: {', '.join(ENGINES)}")
         self.output_dir = output_dir
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.column_cleaner = ColumnCleaner()
         self.reader = ExcelReader()
+        # Sheets of one workbook are cleaned concurrently when sheet_workers > 1
+        self.sheet_workers = sheet_workers
+        self.sheet_executor = sheet_executor
+        self.executor = None
+        # "stream" reads cell values straight from the sheet XML (see XlsxStreamReader.py)
+        self.engine = engine
+        # Sheets outside the selection are never parsed; rows outside it are dropped
+        self.selection = selection or FilingSelection()
+        # Rewrite only the header cells in the xlsx (see header_rewriter.py); data cells pass through
+        self.header_only = header_only
+
+    def _clean_headers(self, input_path: Path) -> Dict:
+        """
+        Header-only cleaning: read the first row of every sheet, clean its labels and
+        splice the changed header cells into a copy of the workbook. Raises
+        HeaderOnlyUnsupported when the workbook needs the full rewrite.
+        """
+        timings = {}
+        output_path = self.output_dir / input_path.name
+        summary = {
+            "input": str(input_path),
+            "output": str(output_path),
+            "sheets": [],
+            "cells": 0,
+        }
+        with stage_timer(timings, "read"):
+            rewriter = HeaderRewriter(input_path)
+        try:
+            with stage_timer(timings, "read"):
+                headers = [(sheet, rewriter.read_header(sheet)) for sheet in rewriter.sheet_names]
+            labels = {}
+            with stage_timer(timings, "clean"):
+                for sheet, header in headers:
+                    unique_cols, changes = self.column_cleaner.clean_labels(header["labels"])
+                    # Text cells that already hold their label are left as they are
+                    labels[sheet] = {col + 1: new for col, (new, cell) in enumerate(zip(unique_cols, header["cells"]))
+                                     if new != cell}
+                    sheet_summary = {"sheet": sheet, "column_changes": len(changes)}
+                    summary["cells"] += header["data_cells"]
+                    if changes:
+                        sheet_summary["sample_changes"] = changes[:3]  # Log first 3 changes
+                    summary["sheets"].append(sheet_summary)
+            with stage_timer(timings, "write"):
+                rewriter.write(output_path, labels)
+        finally:
+            rewriter.close()
+
+        summary["stages"] = {k: round(v, 4) for k, v in timings.items()}
+        status = "modified" if any(s["column_changes"] for s in summary["sheets"]) else "unchanged"
+        logger.info(f"✔ Saved: {output_path} ({status}, header only)")
+        for s in summary["sheets"]:
+            logger.info(f"  - [{s['sheet']}] {s['column_changes']} column name changes")
+        return summary
 
     def clean(self, input_path: Path) -> Optional[Dict]:
         """
@@ -30,12 +92,25 @@ class WorkbookCleaner:
         Returns:
             Summary dict if successful, None otherwise.
         """
+        # A sheet or row selection needs the parsed sheets; so do workbooks the rewriter cannot splice
+        if self.header_only and not (self.selection.sheets or self.selection.row_prefixes):
+            try:
+                return self._clean_headers(input_path)
+            except (HeaderOnlyUnsupported, zipfile.BadZipFile, KeyError, ValueError) as e:
+                logger.info(f"{input_path.name}: header-only cleaning not possible ({e}); rewriting in full")
+
+        timings = {}
         try:
-            xl = pd.ExcelFile(input_path, engine="openpyxl")
+            with stage_timer(timings, "read"):
+                xl = open_workbook(input_path, self.engine)
         except Exception as e:
             logger.error(f"Cannot open {input_path.name}: {e}")
             return None
+        with xl:  # releases the file handle (and the input, on Windows) once the sheets are read
+            return self._clean_workbook(input_path, xl, timings)
 
+    def _clean_workbook(self, input_path: Path, xl, timings: Dict[str, float]) -> Dict:
+        """Clean the selected sheets of an open workbook and write them to output_dir."""
         output_path = self.output_dir / input_path.name
         summary = {
             "input": str(input_path),
@@ -44,11 +119,32 @@ class WorkbookCleaner:
         }
         any_changes = False
 
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            for sheet_name in xl.sheet_names:
+        # Parse the workbook once, then clean its sheets (possibly concurrently)
+        sheet_names = self.selection.select_sheets(xl.sheet_names)
+        if not sheet_names:
+            logger.info(f"Skipping {input_path.name}: no sheet matches the selection")
+            summary["output"] = None
+            return summary
+        if self.executor is None:
+            self.executor = make_executor(self.sheet_workers, self.sheet_executor)
+        with stage_timer(timings, "read"):
+            frames = ordered_map(partial(self.reader.read_sheet, input_path, xl=xl), sheet_names)
+        readable = [(sheet, self.selection.select_rows(df)) for sheet, (df, err) in zip(sheet_names, frames) if err is None]
+        with stage_timer(timings, "clean"):
+            results = dict(zip(
+                [sheet for sheet, _ in readable],
+                ordered_map(self.column_cleaner.clean_columns, [df for _, df in readable], executor=self.executor),
+            ))
+
+        with stage_timer(timings, "write"), pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+            for sheet_name, (_, read_err) in zip(sheet_names, frames):
                 try:
-                    df = self.reader.read_sheet(input_path, sheet_name)
-                    df_clean, changes = self.column_cleaner.clean_columns(df)
+                    if read_err is not None:
+                        raise read_err
+                    cleaned, err = results[sheet_name]
+                    if err is not None:
+                        raise err
+                    df_clean, changes = cleaned
 
                     # Write cleaned DataFrame (preserve index if it exists)
                     df_clean.to_excel(writer, sheet_name=sheet_name, index=True)
@@ -57,6 +153,7 @@ class WorkbookCleaner:
                         "sheet": sheet_name,
                         "column_changes": len(changes)
                     }
+                    summary["cells"] = summary.get("cells", 0) + int(df_clean.size)
                     if changes:
                         any_changes = True
                         sheet_summary["sample_changes"] = changes[:3]  # Log first 3 changes
@@ -66,9 +163,16 @@ class WorkbookCleaner:
                     logger.error(f"Failed to process sheet '{sheet_name}' in {input_path.name}: {e}")
                     continue
 
+        summary["stages"] = {k: round(v, 4) for k, v in timings.items()}
         status = "modified" if any_changes else "unchanged"
         logger.info(f"✔ Saved: {output_path} ({status})")
         for s in summary["sheets"]:
             logger.info(f"  - [{s['sheet']}] {s['column_changes']} column name changes")
 
-        return summary
\ No newline at end of file
+        return summary
+
+    def close(self):
+        """Shut down the sheet worker pool, if any (it is recreated on next use)."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,360 @@
+import argparse
+import logging
+import os
+import signal
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from pipeline import WorkbookPipeline
+from merger import bundle_json_files
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "formateo_no_relacional"))
+from JsonCodec import get_codec, is_codec_file, strip_codec_suffix
+from utils import parse_filing_name, atomic_output
+from BatchJournal import BatchJournal
+from TimeSeriesStore import TimeSeriesStore
+
+# ----------------- Logging Setup -----------------
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+JOURNAL_NAME = "watch_journal.jsonl"  # in the output folder; lets a restarted daemon skip finished files
+
+Fingerprint = Tuple[int, int]  # (size, mtime_ns)
+
+
+# ----------------- Warm Workers -----------------
+_worker: Optional[WorkbookPipeline] = None
+
+
+def _init_worker(output_dir: str, keep_all_columns: bool, engine: str, codec: str):
+    """Build the pipeline once per worker process, so pandas, openpyxl and the stage modules stay loaded."""
+    global _worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C stops the daemon, which lets workers finish
+    import openpyxl  # noqa: F401  (imported lazily by pandas otherwise, on the first file)
+    _worker = WorkbookPipeline(Path(output_dir), keep_all_columns=keep_all_columns, engine=engine, codec=codec)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _process(path: str) -> Dict[str, Any]:
+    return _worker.process_file(Path(path))
+
+
+# ----------------- Folder Watcher -----------------
+class FolderWatcher:
+    """
+    Poll input folders with os.scandir and report workbooks that are new or changed.
+
+    A file is only handed out once its size and mtime have stayed the same for
+    `settle` seconds (across at least two polls): a copy or download in progress
+    keeps changing them, and half-written workbooks cannot be opened. Lock files
+    (~$...) and hidden files are ignored, and so are files still empty once settled
+    (until they change). `done` holds the fingerprint last handed out or ignored
+    per file, so an unchanged file is never processed twice.
+    """
+
+    def __init__(self, dirs: List[Path], settle: float = 2.0):
+        self.dirs = [Path(d) for d in dirs]
+        self.settle = settle
+        self.seen: Dict[Path, Tuple[Fingerprint, float]] = {}  # path → (fingerprint, when first seen with it)
+        self.done: Dict[Path, Fingerprint] = {}
+
+    def scan(self) -> Dict[Path, Fingerprint]:
+        found = {}
+        for d in self.dirs:
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        name = entry.name
+                        if name.startswith(("~$", ".")) or not name.lower().endswith(EXCEL_SUFFIXES):
+                            continue
+                        try:
+                            if not entry.is_file():
+                                continue
+                            st = entry.stat()
+                        except OSError:
+                            continue  # removed between listing and stat
+                        found[Path(entry.path)] = (st.st_size, st.st_mtime_ns)
+            except OSError as e:
+                logger.warning(f"Cannot scan {d}: {e}")
+        return found
+
+    def poll(self) -> List[Tuple[Path, Fingerprint, float]]:
+        """(path, fingerprint, wall time first seen) of the files that became ready since the last poll."""
+        now = time.time()
+        found = self.scan()
+        for path in list(self.seen):
+            if path not in found:
+                del self.seen[path]
+        ready = []
+        for path, fp in found.items():
+            if self.done.get(path) == fp:
+                continue
+            prev = self.seen.get(path)
+            if prev is None or prev[0] != fp:
+                self.seen[path] = (fp, now)  # new, or still being written
+            elif now - prev[1] >= self.settle:
+                self.done[path] = fp
+                del self.seen[path]
+                if fp[0] == 0:
+                    logger.warning(f"Ignoring {path.name}: still empty after {self.settle:g}s "
+                                   "(picked up again if it changes)")
+                    continue
+                ready.append((path, fp, prev[1]))
+        return sorted(ready)
+
+
+# ----------------- Watch Daemon -----------------
+class WatchDaemon:
+    """
+    Continuous flatten → clean → json for workbooks landing in the input folders.
+
+    Ready files go straight to a pool of worker processes that were started (and
+    had pandas, openpyxl and the stages imported) before the first file arrived;
+    each worker runs WorkbookPipeline.process_file, so outputs equal the batch
+    pipeline's. After every batch of finished files the derived data is brought up
+    to date incrementally: the bundles of the affected companies only (one per NIT,
+    see merger.py) and the time-series store (TimeSeriesStore.update reads only new
+    or changed JSON files). Results are journaled in the output folder.
+    """
+
+    def __init__(self, input_dirs: List[Path], output_dir: Path, workers: int = 2, interval: float = 1.0,
+                 settle: float = 2.0, keep_all_columns: bool = False, engine: str = "openpyxl",
+                 codec: str = "pretty", bundle_dir: Optional[Path] = None,
+                 timeseries: Optional[Path] = None, prior_months: int = 12, store_dir: Optional[Path] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.interval = interval
+        self.worker_args = (str(self.output_dir), keep_all_columns, engine, codec)
+
+        self.codec = get_codec(codec)
+        self.watcher = FolderWatcher(input_dirs, settle)
+        self.journal = BatchJournal(self.output_dir / JOURNAL_NAME, resume=True)
+        for entry in self.journal.entries.values():
+            if self.journal.succeeded(entry.get("summary")):  # failed files get one more try after a restart
+                fp = entry["fingerprint"]
+                self.watcher.done[Path(entry["input"])] = (fp["size"], fp["mtime_ns"])
+
+        self.bundle_dir = Path(bundle_dir) if bundle_dir else None
+        # Bundles reference the outputs stored once here instead of copying them (ContentStore.py)
+        self.store_dir = Path(store_dir) if store_dir else None
+        self.timeseries_path = Path(timeseries) if timeseries else None
+        self.store = TimeSeriesStore.load(self.timeseries_path, prior_months) if self.timeseries_path else None
+
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.inflight: Dict[Future, Tuple[Path, float]] = {}
+        self.latencies: List[float] = []
+        self.counts = {"ok": 0, "failed": 0}
+        self.crashed: Dict[Path, int] = {}  # times a file was in flight when a worker died
+        self.stop_event = threading.Event()
+
+    # -- workers --
+    def start(self):
+        """Start the worker processes; each one imports everything as soon as it is spawned."""
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=self.worker_args)
+        # One ping per worker makes the pool spawn all of them now, not when files arrive
+        for f in [self.pool.submit(_ping) for _ in range(self.workers)]:
+            f.result()
+        logger.info(f"{self.workers} worker process(es) started")
+
+    def _restart_pool(self):
+        logger.error("A worker process died; restarting the pool")
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    # -- one poll --
+    def step(self) -> List[Dict[str, Any]]:
+        """Hand ready files to the workers and collect the finished ones; returns their summaries."""
+        self.submit_ready()
+        return self.collect()
+
+    def submit_ready(self):
+        busy = {path for path, _ in self.inflight.values()}
+        for path, fp, seen_at in self.watcher.poll():
+            if path in busy:
+                # Changed while being converted: pick it up again once this run is done
+                del self.watcher.done[path]
+                continue
+            try:
+                future = self.pool.submit(_process, str(path))
+            except BrokenProcessPool:
+                self._restart_pool()
+                future = self.pool.submit(_process, str(path))
+            self.inflight[future] = (path, seen_at)
+
+    def collect(self) -> List[Dict[str, Any]]:
+        finished = []
+        broken = False
+        for future in [f for f in self.inflight if f.done()]:
+            path, seen_at = self.inflight.pop(future)
+            try:
+                summary = future.result()
+            except BrokenProcessPool as e:
+                broken = True
+                self.crashed[path] = self.crashed.get(path, 0) + 1
+                if self.crashed[path] == 1:
+                    # Maybe another file killed the worker: not journaled, converted again next poll
+                    self.watcher.done.pop(path, None)
+                    logger.warning(f"{path.name} was in flight when a worker died; retrying it")
+                    continue
+                summary = {"input": str(path), "output": None, "status": "failed", "error": str(e)}
+            except Exception as e:
+                summary = {"input": str(path), "output": None, "status": "failed", "error": str(e)}
+            summary["latency_s"] = round(time.time() - seen_at, 3)
+            finished.append(summary)
+            self._record(path, summary)
+        if broken:
+            self._restart_pool()
+        if finished:
+            self.update_derived(finished)
+        return finished
+
+    def _record(self, path: Path, summary: Dict[str, Any]):
+        self.counts["ok" if summary["status"] == "ok" else "failed"] += 1
+        if summary["status"] == "ok":
+            self.latencies.append(summary["latency_s"])
+            logger.info(f"✔ {path.name} → {Path(summary['output']).name} ({summary['latency_s']:.2f}s after landing)")
+        else:
+            logger.error(f"Failed to process {path.name}: {summary.get('error')}")
+        try:
+            self.journal.record(path, summary)
+        except OSError:
+            pass  # input removed meanwhile; nothing to skip on restart
+
+    # -- derived data --
+    def update_derived(self, finished: List[Dict[str, Any]]):
+        """Refresh the bundles of the companies touched by `finished` and the time-series store."""
+        nits = set()
+        for s in finished:
+            info = parse_filing_name(strip_codec_suffix(Path(s["output"]).name)) if s["output"] else None
+            if info:
+                nits.add(info["nit"])
+        if self.bundle_dir and nits:
+            for nit in sorted(nits):
+                try:
+                    self.write_bundle(nit)
+                except Exception as e:
+                    logger.error(f"Failed to update the bundle of {nit}: {e}")
+        if self.store is not None:
+            try:
+                counts = self.store.update(self.output_dir)
+                self.store.save(self.timeseries_path)
+                logger.info(f"Time series: {counts['added']} added, {counts['updated']} updated, "
+                            f"{counts['removed']} removed")
+            except Exception as e:
+                logger.error(f"Failed to update the time-series store: {e}")
+
+    def write_bundle(self, nit: str) -> Path:
+        """Rebuild <bundle_dir>/<NIT>_bundle<suffix> from that company's JSON outputs."""
+        files = sorted(p for p in self.output_dir.iterdir()
+                       if p.is_file() and p.name.startswith(f"{nit}_") and is_codec_file(p)
+                       and not p.name.endswith("_summary.json"))
+        self.bundle_dir.mkdir(parents=True, exist_ok=True)
+        path = self.bundle_dir / f"{nit}_bundle{self.codec.suffix}"
+        with atomic_output(path) as tmp:
+            bundle_json_files(files, output_path=tmp, codec=self.codec, store=self.store_dir)
+        return path
+
+    # -- running --
+    def run(self, once: bool = False):
+        """Poll until stopped (SIGINT/SIGTERM), or with once=True until the current files are done."""
+        self.start()
+        try:
+            while not self.stop_event.is_set():
+                self.step()
+                if once and not self.watcher.seen and not self.inflight:
+                    break
+                self.stop_event.wait(self.interval)
+        finally:
+            for future in list(self.inflight):
+                future.exception()  # let in-flight files finish so their outputs are complete
+            self.collect()
+            self.pool.shutdown()
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+
+# ----------------- CLI Interface -----------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="""
+        Watch-folder daemon: convert workbooks to JSON as soon as they land.
+        - Polls the input folders (os.scandir) and waits until a file's size and mtime hold still.
+        - New or changed workbooks go through flatten → clean → json in warm worker processes
+          (no intermediate Excel files; outputs equal pipeline.py's).
+        - Keeps per-company bundles and the time-series store up to date incrementally.
+        """
+    )
+    parser.add_argument("--input_dir", type=str, nargs="+", required=True, help="Folder(s) to watch.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Folder for the JSON outputs.")
+    parser.add_argument("--workers", type=int, default=2, help="Warm worker processes.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls.")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="Seconds a file's size/mtime must hold still before it is read.")
+    parser.add_argument("--keep_all_columns", action="store_true", help="Keep all columns even if fully blank.")
+    parser.add_argument("--engine", choices=["openpyxl", "stream"], default="openpyxl",
+                        help="Workbook reader; 'stream' parses the sheet XML directly (faster).")
+    parser.add_argument("--codec", type=str, default="pretty", help="Output codec (see formateo_no_relacional/JsonCodec.py).")
+    parser.add_argument("--bundle_dir", type=str,
+                        help="Keep one bundle per company here (<NIT>_bundle.json, see merger.py); "
+                             "use a folder outside --output_dir.")
+    parser.add_argument("--content_store", type=str,
+                        help="With --bundle_dir: keep each output once in this content store and "
+                             "write bundles of references to it (see formateo_no_relacional/ContentStore.py).")
+    parser.add_argument("--timeseries", type=str,
+                        help="Keep this time-series store up to date (see formateo_no_relacional/build_timeseries.py).")
+    parser.add_argument("--prior_months", type=int, default=12, help="Months between a period and its comparative.")
+    parser.add_argument("--once", action="store_true", help="Process the files present now, then exit.")
+
+    args = parser.parse_args()
+
+    input_dirs = [Path(d).resolve() for d in args.input_dir]
+    for d in input_dirs:
+        if not d.is_dir():
+            logger.error(f"Input directory not found: {d}")
+            sys.exit(1)
+
+    try:
+        daemon = WatchDaemon(input_dirs, Path(args.output_dir).resolve(), args.workers, args.interval,
+                             args.settle, args.keep_all_columns, args.engine, args.codec,
+                             Path(args.bundle_dir).resolve() if args.bundle_dir else None,
+                             Path(args.timeseries).resolve() if args.timeseries else None, args.prior_months,
+                             Path(args.content_store).resolve() if args.content_store else None)
+        signal.signal(signal.SIGTERM, daemon.stop)
+        logger.info(f"Watching {', '.join(str(d) for d in input_dirs)} (Ctrl+C to stop)")
+        try:
+            daemon.run(once=args.once)
+        except KeyboardInterrupt:
+            pass
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        sys.exit(1)
+
+    # Final summary
+    print("\n" + "=" * 60)
+    print("WATCH SUMMARY")
+    print("=" * 60)
+    print(f"✅ Converted: {daemon.counts['ok']}")
+    print(f"❌ Failed:    {daemon.counts['failed']}")
+    if daemon.latencies:
+        print(f"⏱  Landing → JSON: median {statistics.median(daemon.latencies):.2f}s, "
+              f"max {max(daemon.latencies):.2f}s")
+    print(f"📁 Output:    {daemon.output_dir}")
+
+
+if __name__ == "__main__":
+    main()